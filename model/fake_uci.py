@@ -0,0 +1,60 @@
+# Motor UCI falso, para testar o pool de motores sem o Stockfish instalado.
+# Fala o mínimo do protocolo (uci, isready, position, go, quit) e joga a
+# captura mais valiosa, ou o primeiro lance legal.
+#
+# Uso: XADREZ_ENGINE="python model/fake_uci.py" python model/xadrez.py
+import sys
+import chess
+
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
+
+def best_move(board):
+    best, best_value = None, -1
+    for move in board.legal_moves:
+        captured = board.piece_at(move.to_square)
+        if captured and PIECE_VALUES[captured.piece_type] > best_value:
+            best, best_value = move, PIECE_VALUES[captured.piece_type]
+    return best or next(iter(board.legal_moves), None)
+
+def set_position(args):
+    # position startpos|fen <fen> [moves m1 m2 ...]
+    if args[0] == 'startpos':
+        board = chess.Board()
+        rest = args[1:]
+    else:
+        end = args.index('moves') if 'moves' in args else len(args)
+        board = chess.Board(' '.join(args[1:end]))
+        rest = args[end:]
+    if rest and rest[0] == 'moves':
+        for uci in rest[1:]:
+            board.push_uci(uci)
+    return board
+
+def main():
+    board = chess.Board()
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        cmd = parts[0]
+        if cmd == 'uci':
+            print("id name FakeUCI")
+            print("id author Xadrez")
+            print("uciok")
+        elif cmd == 'isready':
+            print("readyok")
+        elif cmd == 'ucinewgame':
+            board = chess.Board()
+        elif cmd == 'position':
+            board = set_position(parts[1:])
+        elif cmd == 'go':
+            move = best_move(board)
+            if move:
+                print(f"info depth 1 score cp 0 pv {move.uci()}")
+            print(f"bestmove {move.uci() if move else '0000'}")
+        elif cmd == 'quit':
+            break
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,30 @@
 import pygame
 import chess
+import chess.engine
+import chess.polyglot
+import importlib
 import os
+import queue
+import shlex
 import sys
 import threading
 import time
-import threading
+
+# Módulos compartilhados com a versão em src/ (cache de análise, livro de
+# aberturas), importados só no primeiro uso: importar este módulo não mexe
+# no caminho de busca de quem o importa
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+def _src_module(name):
+    if SRC_DIR not in sys.path:
+        sys.path.append(SRC_DIR)
+    return importlib.import_module(name)
+
+def default_cache():
+    return _src_module('analysis_cache').default_cache()
+
+def default_book():
+    return _src_module('polyglot').default_book()
 
 # CONFIGURAÇÕES
 WIDTH, HEIGHT = 640, 640
@@ -20,6 +40,17 @@ COLORS = {
 }
 COLUMN_LETTERS = 'abcdefgh'
 
+# MOTOR UCI: comando (ex.: "stockfish" ou "python model/fake_uci.py"), número
+# de processos e limite por pedido
+ENGINE_COMMAND = os.environ.get('XADREZ_ENGINE', 'stockfish')
+ENGINE_POOL_SIZE = int(os.environ.get('XADREZ_ENGINE_POOL', '2'))
+HINT_TIME = 0.1
+HINT_DEPTH = 3
+# Análise contínua da dica: para nesta profundidade ou depois deste tempo
+HINT_MAX_DEPTH = 20
+HINT_ANALYSIS_TIME = 10.0
+MATE_SCORE = 100000
+
 # CARREGAMENTO DAS PEÇAS
 def load_piece_images():
     images = {}
@@ -90,8 +121,7 @@ def menu_loop():
         draw_menu(screen, selected_options)
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                quit_game()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mx, my = event.pos
                 # Modo de jogo
@@ -116,37 +146,314 @@ def menu_loop():
                     return selected_options
         clock.tick(FPS)
 
+# POOL DE MOTORES UCI
+class EnginePool:
+    # Mantém processos UCI vivos entre os pedidos: pedir um lance só pega um
+    # motor livre da fila, sem abrir processo. Motores que morrem são
+    # reiniciados, e uma thread verifica periodicamente os que estão parados.
+    def __init__(self, command=ENGINE_COMMAND, size=ENGINE_POOL_SIZE, limit=None, check_interval=5.0):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.size = size
+        self.limit = limit or chess.engine.Limit(time=HINT_TIME, depth=HINT_DEPTH)
+        self.idle = queue.Queue()
+        self.restarts = 0
+        self.requests = 0
+        self.closed = False
+        try:
+            for _ in range(size):
+                self.idle.put(self._spawn())
+        except Exception:
+            # Um motor que não abre não pode deixar os já abertos órfãos
+            while not self.idle.empty():
+                try:
+                    self.idle.get_nowait().close()
+                except Exception:
+                    pass
+            raise
+        self._stop = threading.Event()
+        self._checker = threading.Thread(target=self._check_loop, args=(check_interval,), daemon=True)
+        self._checker.start()
+
+    def _spawn(self):
+        return chess.engine.SimpleEngine.popen_uci(self.command)
+
+    def _restart(self, engine):
+        try:
+            engine.close()
+        except Exception:
+            pass
+        self.restarts += 1
+        return self._spawn()
+
+    def acquire(self, timeout=None):
+        # Tira um motor da fila; devolva com release()
+        engine = self.idle.get(timeout=timeout)
+        self.requests += 1
+        return engine
+
+    def release(self, engine, broken=False):
+        if broken:
+            try:
+                engine = self._restart(engine)
+            except Exception:
+                # O health_check reabre na próxima verificação
+                pass
+        self.idle.put(engine)
+
+    def play(self, board, limit=None, timeout=None):
+        # PlayResult (lance e info de profundidade/avaliação) para board;
+        # tenta de novo uma vez se o motor cair no meio
+        engine = self.acquire(timeout)
+        try:
+            try:
+                return engine.play(board, limit or self.limit, info=chess.engine.INFO_SCORE)
+            except chess.engine.EngineTerminatedError:
+                engine = self._restart(engine)
+                return engine.play(board, limit or self.limit, info=chess.engine.INFO_SCORE)
+        finally:
+            self.release(engine)
+
+    def health_check(self):
+        # Faz ping nos motores livres e reinicia os que não respondem
+        for _ in range(self.idle.qsize()):
+            try:
+                engine = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                engine.ping()
+            except Exception:
+                try:
+                    engine = self._restart(engine)
+                except Exception:
+                    # Não deu para reabrir agora; tenta na próxima verificação
+                    pass
+            self.idle.put(engine)
+
+    def _check_loop(self, interval):
+        while not self._stop.wait(interval):
+            self.health_check()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._stop.set()
+        for _ in range(self.size):
+            try:
+                engine = self.idle.get(timeout=1.0)
+            except queue.Empty:
+                break
+            try:
+                engine.quit()
+            except Exception:
+                pass
+
+_engine_pool = None
+_engine_error_time = None
+# A thread da IA e a do HintAnalyzer pedem o pool ao mesmo tempo: sem a trava
+# as duas criariam um, e os motores do que sobrasse nunca seriam fechados
+_engine_pool_lock = threading.Lock()
+ENGINE_RETRY_SECONDS = 30
+
+def get_engine_pool():
+    # Pool global, criado no primeiro uso. Se o motor não abrir, avisa uma vez
+    # e só tenta de novo depois de ENGINE_RETRY_SECONDS.
+    global _engine_pool, _engine_error_time
+    if _engine_pool is not None:
+        return _engine_pool
+    with _engine_pool_lock:
+        if _engine_pool is not None:
+            return _engine_pool
+        if _engine_error_time and time.time() - _engine_error_time < ENGINE_RETRY_SECONDS:
+            return None
+        try:
+            _engine_pool = EnginePool()
+        except Exception as e:
+            if _engine_error_time is None:
+                print(f"Motor UCI '{ENGINE_COMMAND}' indisponível ({e}); usando heurística de capturas")
+            _engine_error_time = time.time()
+            return None
+        return _engine_pool
+
+def close_engine_pool():
+    # As threads do python-chess não são daemon: feche o pool antes de sair
+    global _engine_pool
+    with _engine_pool_lock:
+        if _engine_pool is not None:
+            _engine_pool.close()
+            _engine_pool = None
+
+def quit_game():
+    close_engine_pool()
+    pygame.quit()
+    sys.exit()
+
 # ASSISTENTE VIRTUAL (DICA DE JOGADA)
-def get_ai_hint(board, depth=3):
-    try:
-        # Usa Stockfish se disponível, com profundidade configurável
-        import chess.engine
-        with chess.engine.SimpleEngine.popen_uci("stockfish") as engine:
-            result = engine.play(board, chess.engine.Limit(depth=depth))
+def capture_hint(board):
+    # Melhor captura (maior valor); senão o primeiro lance legal
+    piece_values = {
+        chess.PAWN: 1,
+        chess.KNIGHT: 3,
+        chess.BISHOP: 3,
+        chess.ROOK: 5,
+        chess.QUEEN: 9,
+        chess.KING: 0
+    }
+    best_capture = None
+    best_value = -1
+    for move in board.legal_moves:
+        if board.is_capture(move):
+            captured = board.piece_at(move.to_square)
+            if captured:
+                value = piece_values.get(captured.piece_type, 0)
+                if value > best_value:
+                    best_value = value
+                    best_capture = move
+    if best_capture:
+        return best_capture
+    return next(iter(board.legal_moves), None)
+
+def book_hint(board):
+    # Lance do livro de aberturas (src/polyglot.py), ponderado pelos pesos
+    book = default_book()
+    if book is None:
+        return None
+    def legal(uci):
+        # parse_uci também converte o roque do livro (rei toma torre) em e1g1
+        try:
+            return board.parse_uci(uci)
+        except ValueError:
+            return None
+    return book.choose(chess.polyglot.zobrist_hash(board), legal)
+
+def cached_hint(board, depth):
+    # Lance do cache de análise em disco, se analisado a pelo menos depth
+    cache = default_cache()
+    if cache is None:
+        return None, 0
+    entry = cache.get(chess.polyglot.zobrist_hash(board))
+    if entry is None or entry[0] < depth or entry[2] is None:
+        return None, 0
+    move = chess.Move.from_uci(entry[2])
+    return (move, entry[0]) if board.is_legal(move) else (None, 0)
+
+def store_hint(board, move, info):
+    # Guarda no cache o resultado de uma busca do motor que informou profundidade e avaliação
+    cache = default_cache()
+    depth = info.get('depth')
+    score = info.get('score')
+    if cache is None or move is None or not depth or score is None:
+        return
+    cache.put(chess.polyglot.zobrist_hash(board), depth,
+              score.relative.score(mate_score=MATE_SCORE), move.uci())
+
+def get_ai_hint(board, depth=HINT_DEPTH, time_limit=HINT_TIME):
+    # Livro de aberturas e cache em disco primeiro; senão o pool de motores
+    # UCI, com profundidade/tempo configuráveis
+    move = book_hint(board)
+    if move is not None:
+        return move
+    move, _ = cached_hint(board, depth)
+    if move is not None:
+        return move
+    pool = get_engine_pool()
+    if pool is not None:
+        try:
+            result = pool.play(board, chess.engine.Limit(time=time_limit, depth=depth))
+            store_hint(board, result.move, result.info)
             return result.move
-    except Exception:
-        # fallback: escolha a melhor captura (maior valor), senão o primeiro lance legal
-        piece_values = {
-            chess.PAWN: 1,
-            chess.KNIGHT: 3,
-            chess.BISHOP: 3,
-            chess.ROOK: 5,
-            chess.QUEEN: 9,
-            chess.KING: 0
-        }
-        best_capture = None
-        best_value = -1
-        for move in board.legal_moves:
-            if board.is_capture(move):
-                captured = board.piece_at(move.to_square)
-                if captured:
-                    value = piece_values.get(captured.piece_type, 0)
-                    if value > best_value:
-                        best_value = value
-                        best_capture = move
-        if best_capture:
-            return best_capture
-        return next(iter(board.legal_moves), None)
+        except Exception as e:
+            print(f"Erro no motor UCI ({e}); usando heurística de capturas")
+    return capture_hint(board)
+
+class HintAnalyzer:
+    # Análise contínua da posição do jogador numa thread. Só começa quando a
+    # posição muda (start), publica o melhor lance a cada profundidade nova
+    # e é cancelada assim que um lance é jogado.
+    def __init__(self, limit=None):
+        self.limit = limit or chess.engine.Limit(depth=HINT_MAX_DEPTH, time=HINT_ANALYSIS_TIME)
+        self.generation = 0
+        self.best = None       # (geração, lance, profundidade)
+        self.thread = None
+        self.analysis = None
+        self.lock = threading.Lock()
+
+    def start(self, board):
+        self.cancel()
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        self.thread = threading.Thread(target=self._run, args=(board.copy(), generation), daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        # Descarta a análise em andamento; a thread termina sozinha
+        with self.lock:
+            self.generation += 1
+            self.best = None
+            if self.analysis is not None:
+                try:
+                    self.analysis.stop()
+                except Exception:
+                    pass
+                self.analysis = None
+
+    def best_move(self):
+        best = self.best
+        if best is None or best[0] != self.generation:
+            return None
+        return best[1]
+
+    def _publish(self, generation, move, depth):
+        with self.lock:
+            if generation == self.generation:
+                self.best = (generation, move, depth)
+                return True
+            return False
+
+    def _run(self, board, generation):
+        # Resposta imediata pelo cache, livro ou heurística, refinada pelo motor se houver
+        move, depth = cached_hint(board, 1)
+        if not self._publish(generation, move or book_hint(board) or capture_hint(board), depth):
+            return
+        if depth >= HINT_MAX_DEPTH:
+            return
+        pool = get_engine_pool()
+        if pool is None:
+            return
+        try:
+            engine = pool.acquire(timeout=HINT_TIME)
+        except queue.Empty:
+            return
+        broken = False
+        analysis = None
+        try:
+            with self.lock:
+                if generation != self.generation:
+                    return
+                self.analysis = engine.analysis(board, self.limit)
+                analysis = self.analysis
+            last = None
+            for info in analysis:
+                pv = info.get('pv')
+                if pv and info.get('depth', 0) > depth:
+                    depth = info['depth']
+                    last = (pv[0], info)
+                    if not self._publish(generation, pv[0], depth):
+                        break
+            analysis.stop()
+            if last is not None:
+                store_hint(board, *last)
+        except chess.engine.EngineTerminatedError:
+            broken = True
+        except Exception as e:
+            print(f"Erro na análise do motor UCI ({e})")
+        finally:
+            with self.lock:
+                if analysis is not None and self.analysis is analysis:
+                    self.analysis = None
+            pool.release(engine, broken)
 
 # DESENHO DO TABULEIRO E PEÇAS
 def draw_board(screen, board, images, selected_sq, moves, board_colors, assist_moves=None, last_move=None, orientation='white'):
@@ -227,26 +534,23 @@ def main():
             last_move = move
         ai_thinking = False
 
-    def update_assist_moves():
-        nonlocal assist_moves
+    # Dica: analisada só quando a posição muda, refinada em segundo plano
+    analyzer = HintAnalyzer()
+    hint_ply = None
+
+    def on_position_changed():
         if options['assist'] and not board.is_game_over() and \
             ((board.turn and orientation=='white') or 
              (not board.turn and orientation=='black')):
-            # Dica: todas as casas de origem dos melhores lances
-            best_move = get_ai_hint(board)
-            if best_move:
-                assist_moves = [best_move]
-            else:
-                assist_moves = []
+            analyzer.start(board)
         else:
-            assist_moves = []
-
-    update_assist_moves()
+            analyzer.cancel()
 
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
+                analyzer.cancel()
+                quit_game()
             if event.type == pygame.MOUSEBUTTONDOWN and not ai_thinking and not board.is_game_over():
                 mx, my = event.pos
                 c = mx // SQ_SIZE
@@ -267,22 +571,23 @@ def main():
                         last_move = move_valid[0]
                         selected_sq = None
                         legal_moves = []
-                        update_assist_moves()
                         continue
                     else:
                         selected_sq = None
                         legal_moves = []
-                update_assist_moves()
         # IA joga automaticamente se for sua vez       
         if options['mode'] == 'vs_ai' and not ai_thinking and not board.is_game_over():
             if (board.turn and ai_side=='white') or (not board.turn and ai_side=='black'):
+                analyzer.cancel()
                 threading.Thread(target=ai_play).start()
                 time.sleep(0.15)
-                update_assist_moves()
           
-        # Assistência virtual (antes de clicar)
-        if options['assist']:
-            update_assist_moves()
+        # Assistência virtual (antes de clicar): nova análise a cada lance jogado
+        if len(board.move_stack) != hint_ply:
+            hint_ply = len(board.move_stack)
+            on_position_changed()
+        best_move = analyzer.best_move()
+        assist_moves = [best_move] if best_move else []
         # Desenhar tudo
         draw_board(screen, board, images, selected_sq, legal_moves, board_colors, assist_moves=assist_moves, last_move=last_move, orientation=orientation)
         # Mensagem de vitória
@@ -300,10 +605,12 @@ def main():
             while wait_menu:
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
-                        pygame.quit(); sys.exit()
+                        analyzer.cancel()
+                        quit_game()
                     if event.type == pygame.MOUSEBUTTONDOWN:
                         mx, my = event.pos
                         if WIDTH//2-90 <= mx <= WIDTH//2+90 and HEIGHT//2+30 <= my <= HEIGHT//2+80:
+                            analyzer.cancel()
                             return main()
                 time.sleep(0.05)
         pygame.display.flip()
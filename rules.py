@@ -0,0 +1,520 @@
+# Regras do xadrez de app.py sobre o tabuleiro de strings ("wK", "bP", "")
+# e os assistentes; sem pygame, para ferramentas e testes sem janela.
+import copy
+import os
+import random
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+def _polyglot():
+    # Livro de aberturas compartilhado com a versão em src/, importado só no
+    # primeiro uso: importar rules não mexe no caminho de busca de ninguém
+    if SRC_DIR not in sys.path:
+        sys.path.append(SRC_DIR)
+    import polyglot
+    return polyglot
+
+def initial_board():
+    return [
+        ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
+        ["bP"] * 8,
+        [""] * 8, [""] * 8, [""] * 8, [""] * 8,
+        ["wP"] * 8,
+        ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
+    ]
+
+def in_board(r, c): return 0 <= r < 8 and 0 <= c < 8
+
+def same_color(p1, p2):
+    if not p1 or not p2: return False
+    return (p1[0] == p2[0])
+
+def pawn_moves(board, row, col, piece, en_passant, _can_castle):
+    moves = []
+    direction = -1 if piece[0] == "w" else 1
+    start_row = 6 if piece[0] == "w" else 1
+    if in_board(row+direction, col) and board[row+direction][col] == "":
+        moves.append((row+direction, col))
+        if row == start_row and board[row+2*direction][col] == "":
+            moves.append((row+2*direction, col))
+    for dc in [-1, 1]:
+        nr, nc = row+direction, col+dc
+        if in_board(nr, nc) and board[nr][nc] and not same_color(piece, board[nr][nc]):
+            moves.append((nr, nc))
+    if en_passant:
+        ep_row, ep_col = en_passant
+        if abs(col-ep_col)==1 and row+direction==ep_row:
+            moves.append((ep_row, ep_col))
+    return moves
+
+def knight_moves(board, row, col, piece, *_):
+    moves = []
+    for dr, dc in [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)]:
+        nr, nc = row+dr, col+dc
+        if in_board(nr, nc) and (not board[nr][nc] or not same_color(piece, board[nr][nc])):
+            moves.append((nr, nc))
+    return moves
+
+def bishop_moves(board, row, col, piece, *_):
+    moves = []
+    for dr, dc in [(-1,-1),(-1,1),(1,-1),(1,1)]:
+        for i in range(1,8):
+            nr, nc = row+dr*i, col+dc*i
+            if not in_board(nr, nc): break
+            if not board[nr][nc]:
+                moves.append((nr, nc))
+            elif not same_color(piece, board[nr][nc]):
+                moves.append((nr, nc))
+                break
+            else: break
+    return moves
+
+def rook_moves(board, row, col, piece, *_):
+    moves = []
+    for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]:
+        for i in range(1,8):
+            nr, nc = row+dr*i, col+dc*i
+            if not in_board(nr, nc): break
+            if not board[nr][nc]:
+                moves.append((nr, nc))
+            elif not same_color(piece, board[nr][nc]):
+                moves.append((nr, nc))
+                break
+            else: break
+    return moves
+
+def queen_moves(board, row, col, piece, *args):
+    return bishop_moves(board, row, col, piece) + rook_moves(board, row, col, piece)
+
+def is_attacked(board, row, col, by_white, en_passant, can_castle):
+    for r in range(8):
+        for c in range(8):
+            p = board[r][c]
+            if p and ((p[0]=="w")==by_white):
+                moves = get_moves(board, r, c, en_passant, can_castle, ignore_castle=True)
+                if (row, col) in moves:
+                    return True
+    return False
+
+def king_moves(board, row, col, piece, en_passant, can_castle, ignore_castle=False):
+    moves = []
+    for dr in [-1,0,1]:
+        for dc in [-1,0,1]:
+            if dr==0 and dc==0: continue
+            nr, nc = row+dr, col+dc
+            if in_board(nr, nc) and (not board[nr][nc] or not same_color(piece, board[nr][nc])):
+                moves.append((nr, nc))
+    if not ignore_castle and can_castle:
+        side = piece[0]
+        if can_castle[side]["K"]:
+            if side=="w" and row==7 and col==4 and board[7][5]=="" and board[7][6]=="":
+                if not is_attacked(board, 7, 4, False, en_passant, can_castle) and \
+                   not is_attacked(board, 7, 5, False, en_passant, can_castle) and \
+                   not is_attacked(board, 7, 6, False, en_passant, can_castle):
+                    moves.append((7,6))
+            if side=="b" and row==0 and col==4 and board[0][5]=="" and board[0][6]=="":
+                if not is_attacked(board, 0, 4, True, en_passant, can_castle) and \
+                   not is_attacked(board, 0, 5, True, en_passant, can_castle) and \
+                   not is_attacked(board, 0, 6, True, en_passant, can_castle):
+                    moves.append((0,6))
+        if can_castle[side]["Q"]:
+            if side=="w" and row==7 and col==4 and board[7][3]=="" and board[7][2]=="" and board[7][1]=="":
+                if not is_attacked(board, 7, 4, False, en_passant, can_castle) and \
+                   not is_attacked(board, 7, 3, False, en_passant, can_castle) and \
+                   not is_attacked(board, 7, 2, False, en_passant, can_castle):
+                    moves.append((7,2))
+            if side=="b" and row==0 and col==4 and board[0][3]=="" and board[0][2]=="" and board[0][1]=="":
+                if not is_attacked(board, 0, 4, True, en_passant, can_castle) and \
+                   not is_attacked(board, 0, 3, True, en_passant, can_castle) and \
+                   not is_attacked(board, 0, 2, True, en_passant, can_castle):
+                    moves.append((0,2))
+    return moves
+
+def get_moves(board, row, col, en_passant, can_castle, ignore_castle=False):
+    piece = board[row][col]
+    if not piece: return []
+    if piece[1] == "P":
+        return pawn_moves(board, row, col, piece, en_passant, can_castle)
+    if piece[1] == "N":
+        return knight_moves(board, row, col, piece)
+    if piece[1] == "B":
+        return bishop_moves(board, row, col, piece)
+    if piece[1] == "R":
+        return rook_moves(board, row, col, piece)
+    if piece[1] == "Q":
+        return queen_moves(board, row, col, piece)
+    if piece[1] == "K":
+        return king_moves(board, row, col, piece, en_passant, can_castle, ignore_castle)
+    return []
+
+def is_in_check(board, white_turn, en_passant, can_castle):
+    king = "wK" if white_turn else "bK"
+    king_pos = None
+    for r in range(8):
+        for c in range(8):
+            if board[r][c]==king:
+                king_pos = (r, c)
+                break
+    if not king_pos:
+        return True
+    return is_attacked(board, king_pos[0], king_pos[1], not white_turn, en_passant, can_castle)
+
+def is_checkmate(board, white_turn, en_passant, can_castle):
+    king = find_king(board, white_turn)
+    if not king: return True
+    checks, _ = king_lines(board, king, white_turn)
+    return bool(checks) and not legal_moves(board, white_turn, en_passant, can_castle)
+
+def valid_move(board, sr, sc, dr, dc, white_turn, en_passant, can_castle):
+    piece = board[sr][sc]
+    if not piece or (piece[0]=="w")!=white_turn: return False
+    if (dr, dc) not in get_moves(board, sr, sc, en_passant, can_castle): return False
+    temp_board = [row[:] for row in board]
+    temp_enp = en_passant
+    temp_castle = copy.deepcopy(can_castle)
+    do_move(temp_board, sr, sc, dr, dc, piece, temp_enp, temp_castle)
+    if is_in_check(temp_board, white_turn, temp_enp, temp_castle): return False
+    return True
+
+def do_move(board, sr, sc, dr, dc, piece, en_passant, can_castle):
+    if piece[1]=="K" and abs(dc-sc)==2:
+        if dc==6:
+            board[dr][dc] = piece; board[sr][sc] = ""
+            board[dr][5] = board[dr][7]; board[dr][7] = ""
+        elif dc==2:
+            board[dr][dc] = piece; board[sr][sc] = ""
+            board[dr][3] = board[dr][0]; board[dr][0] = ""
+        can_castle[piece[0]]["K"] = False
+        can_castle[piece[0]]["Q"] = False
+        return
+    if piece[1]=="P" and en_passant and (dr, dc)==en_passant:
+        board[dr][dc] = piece; board[sr][sc] = ""
+        if piece[0]=="w": board[dr+1][dc] = ""
+        else: board[dr-1][dc] = ""
+        return
+    board[dr][dc] = piece; board[sr][sc] = ""
+    if piece[1]=="P" and (dr==0 or dr==7):
+        board[dr][dc] = piece[0]+"Q"
+    if piece[1]=="K":
+        can_castle[piece[0]]["K"] = False
+        can_castle[piece[0]]["Q"] = False
+    # Torre que sai do canto, ou é capturada nele, tira o roque daquele lado
+    for r, c in ((sr, sc), (dr, dc)):
+        if r==7 and c==0:
+            can_castle["w"]["Q"] = False
+        if r==7 and c==7:
+            can_castle["w"]["K"] = False
+        if r==0 and c==0:
+            can_castle["b"]["Q"] = False
+        if r==0 and c==7:
+            can_castle["b"]["K"] = False
+
+def get_en_passant(sr, sc, dr, dc, piece, board):
+    if piece[1]=="P" and abs(dr-sr)==2:
+        direction = -1 if piece[0]=="w" else 1
+        return (sr+direction, sc)
+    return None
+
+KNIGHT_STEPS = [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)]
+KING_STEPS = [(dr, dc) for dr in [-1,0,1] for dc in [-1,0,1] if dr or dc]
+SLIDER_DIRS = {"B": [(-1,-1),(-1,1),(1,-1),(1,1)], "R": [(-1,0),(1,0),(0,-1),(0,1)]}
+SLIDER_DIRS["Q"] = SLIDER_DIRS["B"] + SLIDER_DIRS["R"]
+
+def find_king(board, white_turn):
+    king = "wK" if white_turn else "bK"
+    for r in range(8):
+        for c in range(8):
+            if board[r][c] == king:
+                return (r, c)
+    return None
+
+def attack_map(board, by_white, skip=None):
+    # Casas atacadas pelas peças da cor. A casa skip conta como vazia: sem o
+    # rei no caminho, ele não "foge" na mesma linha do xeque
+    color = "w" if by_white else "b"
+    attacked = set()
+    for r in range(8):
+        for c in range(8):
+            p = board[r][c]
+            if not p or p[0] != color: continue
+            if p[1] == "P":
+                nr = r-1 if by_white else r+1
+                for nc in [c-1, c+1]:
+                    if in_board(nr, nc): attacked.add((nr, nc))
+            elif p[1] in "NK":
+                for dr, dc in (KNIGHT_STEPS if p[1] == "N" else KING_STEPS):
+                    if in_board(r+dr, c+dc): attacked.add((r+dr, c+dc))
+            else:
+                for dr, dc in SLIDER_DIRS[p[1]]:
+                    nr, nc = r+dr, c+dc
+                    while in_board(nr, nc):
+                        attacked.add((nr, nc))
+                        if board[nr][nc] and (nr, nc) != skip: break
+                        nr, nc = nr+dr, nc+dc
+    return attacked
+
+def king_lines(board, king, white_turn):
+    # Xeques e cravadas a partir do rei: checks é uma lista com as casas que
+    # resolvem cada xeque (capturar ou bloquear); pins leva cada peça cravada
+    # às casas da linha em que ela pode andar
+    kr, kc = king
+    own, enemy = ("w", "b") if white_turn else ("b", "w")
+    checks, pins = [], {}
+    pawn_row = kr-1 if white_turn else kr+1
+    for nc in [kc-1, kc+1]:
+        if in_board(pawn_row, nc) and board[pawn_row][nc] == enemy+"P":
+            checks.append({(pawn_row, nc)})
+    for dr, dc in KNIGHT_STEPS:
+        if in_board(kr+dr, kc+dc) and board[kr+dr][kc+dc] == enemy+"N":
+            checks.append({(kr+dr, kc+dc)})
+    for dr, dc in SLIDER_DIRS["Q"]:
+        sliders = "BQ" if dr and dc else "RQ"
+        line, pinned = set(), None
+        nr, nc = kr+dr, kc+dc
+        while in_board(nr, nc):
+            line.add((nr, nc))
+            p = board[nr][nc]
+            if p:
+                if p[0] == own:
+                    if pinned: break
+                    pinned = (nr, nc)
+                else:
+                    if p[1] in sliders:
+                        if pinned: pins[pinned] = line
+                        else: checks.append(line)
+                    break
+            nr, nc = nr+dr, nc+dc
+    return checks, pins
+
+def legal_moves(board, white_turn, en_passant, can_castle):
+    # Lances legais sem copiar o tabuleiro: o mapa de ataques do adversário é
+    # calculado uma vez e os xeques e cravadas filtram os lances de cada peça.
+    # En passant, que pode descobrir o rei na horizontal, ainda passa por
+    # valid_move.
+    king = find_king(board, white_turn)
+    if not king: return []
+    color = "w" if white_turn else "b"
+    attacked = attack_map(board, not white_turn, skip=king)
+    checks, pins = king_lines(board, king, white_turn)
+    moves = []
+    for r, c in [(r, c) for r in range(8) for c in range(8)]:
+        piece = board[r][c]
+        if not piece or piece[0] != color: continue
+        if piece[1] == "K":
+            for mr, mc in king_moves(board, r, c, piece, en_passant, can_castle, ignore_castle=True):
+                if (mr, mc) not in attacked:
+                    moves.append((r, c, mr, mc))
+            if not checks and can_castle and (r, c) == (7 if white_turn else 0, 4):
+                if can_castle[color]["K"] and board[r][5] == "" and board[r][6] == "" and \
+                   (r, 5) not in attacked and (r, 6) not in attacked:
+                    moves.append((r, c, r, 6))
+                if can_castle[color]["Q"] and board[r][3] == "" and board[r][2] == "" and board[r][1] == "" and \
+                   (r, 3) not in attacked and (r, 2) not in attacked:
+                    moves.append((r, c, r, 2))
+            continue
+        if len(checks) > 1: continue
+        for mr, mc in get_moves(board, r, c, en_passant, can_castle):
+            if piece[1] == "P" and (mr, mc) == en_passant and mc != c:
+                if valid_move(board, r, c, mr, mc, white_turn, en_passant, can_castle):
+                    moves.append((r, c, mr, mc))
+                continue
+            if checks and (mr, mc) not in checks[0]: continue
+            if (r, c) in pins and (mr, mc) not in pins[(r, c)]: continue
+            moves.append((r, c, mr, mc))
+    return moves
+
+def all_legal_moves(board, white_turn, en_passant, can_castle):
+    return legal_moves(board, white_turn, en_passant, can_castle)
+
+def insufficient_material(board):
+    # Só reis, rei e uma peça menor contra rei, ou bispos todos na mesma cor
+    minors = []
+    for r in range(8):
+        for c in range(8):
+            p = board[r][c]
+            if p and p[1] in "PRQ": return False
+            if p and p[1] in "NB": minors.append((p[1], (r+c) % 2))
+    if len(minors) <= 1: return True
+    return all(kind == "B" for kind, _ in minors) and len({color for _, color in minors}) == 1
+
+class GameStatus:
+    # Situação da partida, recalculada só quando um lance é feito: lances
+    # legais, xeque, mate, afogamento, material insuficiente e a contagem da
+    # regra dos 50 lances. O laço do jogo só lê estes campos.
+    def __init__(self, board, white_turn, en_passant, can_castle):
+        self.halfmove_clock = 0
+        self.refresh(board, white_turn, en_passant, can_castle)
+
+    def refresh(self, board, white_turn, en_passant, can_castle):
+        self.moves = legal_moves(board, white_turn, en_passant, can_castle)
+        king = find_king(board, white_turn)
+        self.in_check = not king or bool(king_lines(board, king, white_turn)[0])
+        self.checkmate = self.in_check and not self.moves
+        self.stalemate = not self.in_check and not self.moves
+        self.insufficient = insufficient_material(board)
+        self.winner = ('black' if white_turn else 'white') if self.checkmate else None
+        if self.stalemate:
+            self.draw = "afogamento"
+        elif self.insufficient:
+            self.draw = "material insuficiente"
+        elif self.halfmove_clock >= 100:
+            self.draw = "regra dos 50 lances"
+        else:
+            self.draw = None
+
+    @property
+    def over(self):
+        return self.winner is not None or self.draw is not None
+
+    def piece_moves(self, square):
+        # Lances legais da peça em square
+        return [m for m in self.moves if m[:2] == square]
+
+    def play(self, board, sr, sc, dr, dc, white_turn, en_passant, can_castle):
+        # Faz o lance e recalcula; devolve o novo alvo de en passant
+        piece = board[sr][sc]
+        capture = board[dr][dc] != "" or (piece[1] == "P" and (dr, dc) == en_passant)
+        do_move(board, sr, sc, dr, dc, piece, en_passant, can_castle)
+        en_passant = get_en_passant(sr, sc, dr, dc, piece, board)
+        self.halfmove_clock = 0 if piece[1] == "P" or capture else self.halfmove_clock + 1
+        self.refresh(board, not white_turn, en_passant, can_castle)
+        return en_passant
+
+def book_move(board, white_turn, en_passant, can_castle, moves):
+    # Lance do livro de aberturas, se a posição estiver nele
+    polyglot = _polyglot()
+    book = polyglot.default_book()
+    if book is None:
+        return None
+    castling = ''.join(flag.upper() if color == "w" else flag.lower()
+                       for color in "wb" for flag in "KQ" if can_castle[color][flag])
+    def legal(uci):
+        # Só promove a dama
+        if len(uci) > 4 and uci[4] != 'q':
+            return None
+        move = (8-int(uci[1]), "abcdefgh".index(uci[0]), 8-int(uci[3]), "abcdefgh".index(uci[2]))
+        return move if move in moves else None
+    return book.choose(polyglot.grid_key(board, white_turn, castling, en_passant), legal)
+
+PIECE_VALUES = {"P": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+
+def attackers(board, row, col, white, removed):
+    # Peças da cor que atacam (row, col), ignorando as casas em removed
+    # (já trocadas), o que revela as peças de longo alcance atrás delas
+    color = "w" if white else "b"
+    found = []
+    pawn_row = row + 1 if white else row - 1
+    for dc in [-1, 1]:
+        if in_board(pawn_row, col+dc) and board[pawn_row][col+dc] == color+"P" and (pawn_row, col+dc) not in removed:
+            found.append((pawn_row, col+dc))
+    for dr, dc in [(-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1)]:
+        nr, nc = row+dr, col+dc
+        if in_board(nr, nc) and board[nr][nc] == color+"N" and (nr, nc) not in removed:
+            found.append((nr, nc))
+    for dr in [-1,0,1]:
+        for dc in [-1,0,1]:
+            if not dr and not dc: continue
+            sliders = "BQ" if dr and dc else "RQ"
+            for i in range(1,8):
+                nr, nc = row+dr*i, col+dc*i
+                if not in_board(nr, nc): break
+                p = board[nr][nc]
+                if not p or (nr, nc) in removed: continue
+                if p[0] == color and (p[1] in sliders or (p[1] == "K" and i == 1)):
+                    found.append((nr, nc))
+                break
+    return found
+
+def see(board, sr, sc, dr, dc, en_passant):
+    # Troca estática: material ganho (centipeões) pela sequência de capturas
+    # em (dr, dc), cada lado retomando com a peça de menor valor
+    piece = board[sr][sc]
+    white = piece[0] == "w"
+    removed = {(sr, sc)}
+    if board[dr][dc]:
+        gain = PIECE_VALUES[board[dr][dc][1]]
+    elif piece[1] == "P" and (dr, dc) == en_passant:
+        gain = PIECE_VALUES["P"]
+        removed.add((dr+1, dc) if white else (dr-1, dc))
+    else:
+        gain = 0
+    on_square = PIECE_VALUES[piece[1]]
+    if piece[1] == "P" and dr in (0, 7):
+        gain += PIECE_VALUES["Q"] - PIECE_VALUES["P"]
+        on_square = PIECE_VALUES["Q"]
+    gains = [gain]
+    white = not white
+    while True:
+        found = attackers(board, dr, dc, white, removed)
+        if not found: break
+        # A de menor valor; o rei (valor 0) por último
+        r, c = min(found, key=lambda sq: PIECE_VALUES[board[sq[0]][sq[1]][1]] or 10000)
+        if board[r][c][1] == "K" and attackers(board, dr, dc, not white, removed | {(r, c)}):
+            break  # o rei não captura numa casa defendida
+        gains.append(on_square - gains[-1])
+        on_square = PIECE_VALUES[board[r][c][1]]
+        removed.add((r, c))
+        white = not white
+    # Cada lado pode parar de trocar quando continuar perde material
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+def best_captures(board, moves, en_passant):
+    # Capturas que não perdem material pela troca estática, só as de maior ganho
+    best, captures = 0, []
+    for sr, sc, dr, dc in moves:
+        if board[dr][dc] or (board[sr][sc][1] == "P" and (dr, dc) == en_passant):
+            gain = see(board, sr, sc, dr, dc, en_passant)
+            if gain > best:
+                best, captures = gain, []
+            if gain == best:
+                captures.append((sr, sc, dr, dc))
+    return captures
+
+def ai_move(board, white_turn, en_passant, can_castle, assistant, moves=None):
+    if moves is None:
+        moves = all_legal_moves(board, white_turn, en_passant, can_castle)
+    if not moves: return None
+    move = book_move(board, white_turn, en_passant, can_castle, moves)
+    if move:
+        return move
+    if assistant == "Desligado":
+        return random.choice(moves)
+    elif assistant == "Aleatório":
+        return random.choice(moves)
+    elif assistant == "Agressivo":
+        captures = best_captures(board, moves, en_passant)
+        if captures:
+            return random.choice(captures)
+        return random.choice(moves)
+    elif assistant == "Centralizador":
+        center = [(3,3),(3,4),(4,3),(4,4)]
+        center_moves = [m for m in moves if (m[2],m[3]) in center]
+        if center_moves:
+            return random.choice(center_moves)
+        return random.choice(moves)
+    return random.choice(moves)
+
+def assistant_move_suggestion(board, white_turn, en_passant, can_castle, assistant, moves=None):
+    if assistant == "Desligado": return []
+    if moves is None:
+        moves = all_legal_moves(board, white_turn, en_passant, can_castle)
+    if not moves: return []
+    if assistant == "Aleatório":
+        return [random.choice(moves)]
+    elif assistant == "Agressivo":
+        captures = best_captures(board, moves, en_passant)
+        if captures:
+            return [random.choice(captures)]
+        return [random.choice(moves)]
+    elif assistant == "Centralizador":
+        center = [(3,3),(3,4),(4,3),(4,4)]
+        center_moves = [m for m in moves if (m[2],m[3]) in center]
+        if center_moves:
+            return [random.choice(center_moves)]
+        return [random.choice(moves)]
+    # Clássico: destaque todas as jogadas possíveis
+    return moves
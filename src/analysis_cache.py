@@ -0,0 +1,159 @@
+# Persistent analysis cache: (depth, score, best move) per position, keyed by
+# the Polyglot Zobrist hash so ChessBoard.zobrist_key and python-chess'
+# chess.polyglot.zobrist_hash find the same entries.
+#
+# The file is a fixed-size, memory-mapped hash table:
+#   header  16 bytes: magic, version, bucket count, store clock
+#   buckets WAYS slots of SLOT.size bytes each
+# A slot holds key, score, depth, move (16-bit Polyglot encoding), a
+# checksum over those fields and a stamp (the store clock when it was last
+# written or hit). A new position goes into the first empty slot of its
+# bucket, else over the one with the oldest stamp, which keeps the file at
+# its size cap with LRU-style eviction.
+#
+# Several processes can share the file: writers take an exclusive flock
+# (plus a thread lock within one process) while they update a slot;
+# readers take no lock and drop any slot whose checksum does not match
+# (a write they raced with).
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from polyglot import encode_move, decode_move
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process write lock
+    fcntl = None
+
+MAGIC = b'XADC'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+# key, score, depth, move, checksum, stamp
+SLOT = struct.Struct('<QiHHII')
+CHECKED = struct.Struct('<QiHH')
+WAYS = 4
+DEFAULT_SIZE = 16 * 1024 * 1024
+DEFAULT_PATH = os.environ.get('XADREZ_ANALYSIS_CACHE',
+                              os.path.join(os.path.expanduser('~'), '.xadrez', 'analysis.cache'))
+
+def _checksum(key, score, depth, move):
+    return zlib.crc32(CHECKED.pack(key, score, depth, move)) or 1
+
+class AnalysisCache:
+    # get(key) -> (depth, score, uci) or None; put(key, depth, score, uci)
+    # keeps the deeper result. Scores are from the side to move, in centipawns.
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_SIZE, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.thread_lock = threading.Lock()
+        if readonly:
+            self.file = open(path, 'rb')
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+            self._lock()
+            try:
+                if os.fstat(self.file.fileno()).st_size < HEADER.size:
+                    buckets = max(1, (max_bytes - HEADER.size) // (WAYS * SLOT.size))
+                    self.file.truncate(HEADER.size + buckets * WAYS * SLOT.size)
+                    self.file.seek(0)
+                    self.file.write(HEADER.pack(MAGIC, VERSION, buckets, 0))
+                    self.file.flush()
+            finally:
+                self._unlock()
+        access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+        self.map = mmap.mmap(self.file.fileno(), 0, access=access)
+        magic, version, self.buckets, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not an analysis cache (version {VERSION})")
+
+    def _lock(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def _slots(self, key):
+        base = HEADER.size + (key % self.buckets) * WAYS * SLOT.size
+        return range(base, base + WAYS * SLOT.size, SLOT.size)
+
+    def _clock(self):
+        # Bump the store clock in the header; caller holds the lock
+        stamp = (HEADER.unpack_from(self.map, 0)[3] + 1) & 0xFFFFFFFF
+        struct.pack_into('<I', self.map, 12, stamp)
+        return stamp
+
+    def get(self, key):
+        for offset in self._slots(key):
+            slot_key, score, depth, move, check, _ = SLOT.unpack_from(self.map, offset)
+            if slot_key == key and check == _checksum(slot_key, score, depth, move):
+                self.hits += 1
+                if not self.readonly:
+                    # Refresh the stamp only; it is not covered by the checksum
+                    stamp = HEADER.unpack_from(self.map, 0)[3]
+                    struct.pack_into('<I', self.map, offset + 20, stamp)
+                return depth, score, decode_move(move)
+        self.misses += 1
+        return None
+
+    def put(self, key, depth, score, uci):
+        if self.readonly:
+            return
+        move = encode_move(uci)
+        score = max(-2**31, min(2**31 - 1, score))
+        self._lock()
+        try:
+            victim = None
+            for offset in self._slots(key):
+                slot_key, old_score, old_depth, old_move, check, stamp = SLOT.unpack_from(self.map, offset)
+                valid = check == _checksum(slot_key, old_score, old_depth, old_move)
+                if valid and slot_key == key:
+                    if old_depth > depth:
+                        return
+                    victim = offset
+                    break
+                if not valid:
+                    stamp = -1  # empty or torn: reuse first
+                if victim is None or stamp < victim_stamp:
+                    victim, victim_stamp = offset, stamp
+            SLOT.pack_into(self.map, victim, key, score, depth, move,
+                           _checksum(key, score, depth, move), self._clock())
+            self.stores += 1
+        finally:
+            self._unlock()
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+_default_cache = None
+
+def default_cache():
+    # Shared cache at DEFAULT_PATH, or None if it cannot be opened
+    global _default_cache
+    if _default_cache is None:
+        try:
+            _default_cache = AnalysisCache()
+        except (OSError, ValueError) as e:
+            print(f"Cache de análise indisponível ({e})")
+            _default_cache = False
+    return _default_cache or None
@@ -1,348 +1,1377 @@
 import copy
-import random
-from PIL import Image
-import pygame
-import os
+import re
+import time
+from array import array
+from zobrist import POLYGLOT_RANDOM
 
-piece_icons = {}
+# Square index = row*8 + col (row 0 is the top, black's back rank).
+# Bit n of a 64-bit int stands for square n.
+WHITE, BLACK = 0, 1
+COLOR_NAMES = 'wb'
+PIECE_KINDS = 'PNBRQK'
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PROMOTIONS = 'QRBN'
 
-def load_piece_icons():
-    # Initialize a hidden display to allow convert_alpha()
-    pygame.display.set_mode((1, 1), pygame.HIDDEN)
-    for color in ['w', 'b']:
-        for p in "KQRBNP":
-            img = pygame.image.load(os.path.join('assets', f'{color}{p}.png')).convert_alpha()
-            piece_icons[f'{color}{p}'] = pygame.transform.smoothscale(img, (80, 80))
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
 
-load_piece_icons()
+# Castling rights bits
+WK_CASTLE, WQ_CASTLE, BK_CASTLE, BQ_CASTLE = 1, 2, 4, 8
+CASTLING_ALL = 15
+
+def _step_table(deltas):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        bb = 0
+        for dr, dc in deltas:
+            nr, nc = row+dr, col+dc
+            if 0 <= nr < 8 and 0 <= nc < 8:
+                bb |= 1 << (nr*8+nc)
+        table.append(bb)
+    return table
+
+KNIGHT_ATTACKS = _step_table([(2,1),(2,-1),(-2,1),(-2,-1),(1,2),(1,-2),(-1,2),(-1,-2)])
+KING_ATTACKS = _step_table([(dr, dc) for dr in (-1,0,1) for dc in (-1,0,1) if dr or dc])
+# PAWN_ATTACKS[color][sq]: squares attacked by a pawn of that color standing on sq
+PAWN_ATTACKS = (_step_table([(-1,-1),(-1,1)]), _step_table([(1,-1),(1,1)]))
+
+def _ray(sq, dr, dc):
+    row, col = divmod(sq, 8)
+    squares = []
+    row, col = row+dr, col+dc
+    while 0 <= row < 8 and 0 <= col < 8:
+        squares.append(row*8+col)
+        row, col = row+dr, col+dc
+    return squares
+
+def _line_tables(directions):
+    # Sliding attacks along one line (rank, file or diagonal) only depend on the
+    # occupancy of the inner squares of that line, so every square gets a table
+    # keyed by the masked occupancy. The dict lookup takes the place of the
+    # magic multiplication used by C engines.
+    masks, tables = [], []
+    for sq in range(64):
+        rays = [_ray(sq, dr, dc) for dr, dc in directions]
+        mask = 0
+        for ray in rays:
+            for s in ray[:-1]:
+                mask |= 1 << s
+        table = {}
+        occ = 0
+        while True:
+            attacks = 0
+            for ray in rays:
+                for s in ray:
+                    attacks |= 1 << s
+                    if occ >> s & 1:
+                        break
+            table[occ] = attacks
+            occ = (occ - mask) & mask
+            if not occ:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+RANK_MASKS, RANK_ATTACKS = _line_tables([(0,1),(0,-1)])
+FILE_MASKS, FILE_ATTACKS = _line_tables([(1,0),(-1,0)])
+DIAG_MASKS, DIAG_ATTACKS = _line_tables([(1,1),(-1,-1)])
+ANTI_MASKS, ANTI_ATTACKS = _line_tables([(1,-1),(-1,1)])
+
+def rook_attacks(sq, occ):
+    return RANK_ATTACKS[sq][occ & RANK_MASKS[sq]] | FILE_ATTACKS[sq][occ & FILE_MASKS[sq]]
+
+def bishop_attacks(sq, occ):
+    return DIAG_ATTACKS[sq][occ & DIAG_MASKS[sq]] | ANTI_ATTACKS[sq][occ & ANTI_MASKS[sq]]
+
+# BETWEEN[a][b]: squares strictly between a and b when they share a line, else 0
+BETWEEN = [[0] * 64 for _ in range(64)]
+for _sq in range(64):
+    for _dr, _dc in [(dr, dc) for dr in (-1,0,1) for dc in (-1,0,1) if dr or dc]:
+        _between = 0
+        for _s in _ray(_sq, _dr, _dc):
+            BETWEEN[_sq][_s] = _between
+            _between |= 1 << _s
+del _sq, _dr, _dc, _between, _s
+
+FULL_BOARD = (1 << 64) - 1
+PROMOTION_RANKS = 0xFF | 0xFF << 56
+# a8 is light: squares where row + col is even
+LIGHT_SQUARES = sum(1 << sq for sq in range(64) if ((sq >> 3) + (sq & 7)) % 2 == 0)
+
+# Rights kept when a piece leaves or lands on a square (king and rook homes)
+CASTLING_KEEP = [CASTLING_ALL] * 64
+CASTLING_KEEP[60] &= ~(WK_CASTLE | WQ_CASTLE)
+CASTLING_KEEP[63] &= ~WK_CASTLE
+CASTLING_KEEP[56] &= ~WQ_CASTLE
+CASTLING_KEEP[4] &= ~(BK_CASTLE | BQ_CASTLE)
+CASTLING_KEEP[7] &= ~BK_CASTLE
+CASTLING_KEEP[0] &= ~BQ_CASTLE
+
+# Zobrist keys laid out for ChessBoard indices (Polyglot numbering, see zobrist.py)
+ZOBRIST_PIECE = [[POLYGLOT_RANDOM[64*(2*(code % 6) + (code < 6)) + 8*(7 - (sq >> 3)) + (sq & 7)]
+                  for sq in range(64)] for code in range(12)]
+ZOBRIST_CASTLING = [0] * 16
+for _rights in range(16):
+    for _i in range(4):
+        if _rights >> _i & 1:
+            ZOBRIST_CASTLING[_rights] ^= POLYGLOT_RANDOM[768+_i]
+del _rights, _i
+ZOBRIST_EP = POLYGLOT_RANDOM[772:780]
+ZOBRIST_WHITE_TO_MOVE = POLYGLOT_RANDOM[780]
+
+# Evaluation: material plus piece-square tables (centipawns). Tables are
+# written from white's point of view with row 0 (rank 8) first, so a white
+# piece on sq reads table[sq] and a black one reads table[sq ^ 56].
+PIECE_VALUES = [100, 320, 330, 500, 900, 0]
+PST = [
+    [  0,  0,  0,  0,  0,  0,  0,  0,
+      50, 50, 50, 50, 50, 50, 50, 50,
+      10, 10, 20, 30, 30, 20, 10, 10,
+       5,  5, 10, 25, 25, 10,  5,  5,
+       0,  0,  0, 20, 20,  0,  0,  0,
+       5, -5,-10,  0,  0,-10, -5,  5,
+       5, 10, 10,-20,-20, 10, 10,  5,
+       0,  0,  0,  0,  0,  0,  0,  0],
+    [-50,-40,-30,-30,-30,-30,-40,-50,
+     -40,-20,  0,  0,  0,  0,-20,-40,
+     -30,  0, 10, 15, 15, 10,  0,-30,
+     -30,  5, 15, 20, 20, 15,  5,-30,
+     -30,  0, 15, 20, 20, 15,  0,-30,
+     -30,  5, 10, 15, 15, 10,  5,-30,
+     -40,-20,  0,  5,  5,  0,-20,-40,
+     -50,-40,-30,-30,-30,-30,-40,-50],
+    [-20,-10,-10,-10,-10,-10,-10,-20,
+     -10,  0,  0,  0,  0,  0,  0,-10,
+     -10,  0,  5, 10, 10,  5,  0,-10,
+     -10,  5,  5, 10, 10,  5,  5,-10,
+     -10,  0, 10, 10, 10, 10,  0,-10,
+     -10, 10, 10, 10, 10, 10, 10,-10,
+     -10,  5,  0,  0,  0,  0,  5,-10,
+     -20,-10,-10,-10,-10,-10,-10,-20],
+    [  0,  0,  0,  0,  0,  0,  0,  0,
+       5, 10, 10, 10, 10, 10, 10,  5,
+      -5,  0,  0,  0,  0,  0,  0, -5,
+      -5,  0,  0,  0,  0,  0,  0, -5,
+      -5,  0,  0,  0,  0,  0,  0, -5,
+      -5,  0,  0,  0,  0,  0,  0, -5,
+      -5,  0,  0,  0,  0,  0,  0, -5,
+       0,  0,  0,  5,  5,  0,  0,  0],
+    [-20,-10,-10, -5, -5,-10,-10,-20,
+     -10,  0,  0,  0,  0,  0,  0,-10,
+     -10,  0,  5,  5,  5,  5,  0,-10,
+      -5,  0,  5,  5,  5,  5,  0, -5,
+       0,  0,  5,  5,  5,  5,  0, -5,
+     -10,  5,  5,  5,  5,  5,  0,-10,
+     -10,  0,  5,  0,  0,  0,  0,-10,
+     -20,-10,-10, -5, -5,-10,-10,-20],
+    # King, middlegame: stay behind the pawns
+    [-30,-40,-40,-50,-50,-40,-40,-30,
+     -30,-40,-40,-50,-50,-40,-40,-30,
+     -30,-40,-40,-50,-50,-40,-40,-30,
+     -30,-40,-40,-50,-50,-40,-40,-30,
+     -20,-30,-30,-40,-40,-30,-30,-20,
+     -10,-20,-20,-20,-20,-20,-20,-10,
+      20, 20,  0,  0,  0,  0, 20, 20,
+      20, 30, 10,  0,  0, 10, 30, 20],
+]
+# King, endgame: walk to the center
+KING_ENDGAME_PST = [
+    -50,-40,-30,-20,-20,-30,-40,-50,
+    -30,-20,-10,  0,  0,-10,-20,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 30, 40, 40, 30,-10,-30,
+    -30,-10, 20, 30, 30, 20,-10,-30,
+    -30,-30,  0,  0,  0,  0,-30,-30,
+    -50,-30,-30,-30,-30,-30,-30,-50]
+# Non-pawn material (both sides) at or below which kings use the endgame table
+ENDGAME_MATERIAL = 1300
+# PIECE_SQUARE[code][sq]: material + table value for everything but the king
+PIECE_SQUARE = [[PIECE_VALUES[code % 6] + PST[code % 6][sq if code < 6 else sq ^ 56] if code % 6 != KING else 0
+                 for sq in range(64)] for code in range(12)]
+
+# The board stores pieces as their code (color*6 + kind, the index into
+# ChessBoard.pieces) and moves as 16-bit ints:
+#   bits 0-5 from square, 6-11 to square, 12-14 promotion kind (0 = none),
+#   bit 15 castling
+# Move lists are array('H'). Piece and Move only wrap these at the API
+# boundary (piece_at, generate_legal_moves, search results...).
+PROMOTION_SHIFT = 12
+CASTLING_FLAG = 1 << 15
+# Promotion bits in generation order (PROMOTIONS)
+PROMOTION_CODES = [PIECE_KINDS.index(kind) << PROMOTION_SHIFT for kind in PROMOTIONS]
 
 class Piece:
+    # One shared, read-only instance per piece code (see PIECES)
+    __slots__ = ('color', 'kind', 'code')
+
     def __init__(self, color, kind):
         self.color = color
         self.kind = kind
-        self.has_moved = False
+        self.code = COLOR_NAMES.index(color)*6 + PIECE_KINDS.index(kind)
 
     def __str__(self):
         return f"{self.color}{self.kind}"
 
-class Move:
-    def __init__(self, from_row, from_col, to_row, to_col, promotion=None, is_castling=False):
-        self.from_row = from_row
-        self.from_col = from_col
-        self.to_row = to_row
-        self.to_col = to_col
-        self.promotion = promotion
-        self.is_castling = is_castling
+PIECES = [Piece(COLOR_NAMES[code // 6], PIECE_KINDS[code % 6]) for code in range(12)]
+
+class Move(int):
+    # A move code with named fields; equal to (and hashed like) the plain int
+    __slots__ = ()
+
+    def __new__(cls, from_row, from_col, to_row, to_col, promotion=None, is_castling=False):
+        code = from_row*8 + from_col | (to_row*8 + to_col) << 6
+        if promotion:
+            code |= PIECE_KINDS.index(promotion) << PROMOTION_SHIFT
+        if is_castling:
+            code |= CASTLING_FLAG
+        return int.__new__(cls, code)
+
+    @classmethod
+    def from_code(cls, code):
+        return int.__new__(cls, code)
+
+    def __reduce__(self):
+        # For pickle and copy: __new__ takes the fields, not the code
+        return (Move.from_code, (int(self),))
+
+    @property
+    def from_row(self):
+        return (self & 63) >> 3
+
+    @property
+    def from_col(self):
+        return self & 7
+
+    @property
+    def to_row(self):
+        return (self >> 6 & 63) >> 3
+
+    @property
+    def to_col(self):
+        return self >> 6 & 7
+
+    @property
+    def promotion(self):
+        # 'Q', 'R', 'B', 'N' or None
+        kind = self >> PROMOTION_SHIFT & 7
+        return PIECE_KINDS[kind] if kind else None
+
+    @property
+    def is_castling(self):
+        return bool(self & CASTLING_FLAG)
 
     def __repr__(self):
         return f"Move({self.from_row},{self.from_col}->{self.to_row},{self.to_col})"
 
+    def uci(self):
+        return move_uci(self)
+
+def move_uci(code):
+    frm, to, promotion = code & 63, code >> 6 & 63, code >> PROMOTION_SHIFT & 7
+    text = f"{'abcdefgh'[frm & 7]}{8 - (frm >> 3)}{'abcdefgh'[to & 7]}{8 - (to >> 3)}"
+    return text + PIECE_KINDS[promotion].lower() if promotion else text
+
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+
 class ChessBoard:
-    def __init__(self):
-        # 8x8 board
-        # row 0 is top, white at bottom
-        self.board = [[None for _ in range(8)] for _ in range(8)]
+    def __init__(self, fen=None):
+        self._clear()
+        if fen:
+            self.set_fen(fen)
+        else:
+            self._setup_board()
+            self.castling = CASTLING_ALL
+            self.zobrist_key = self.compute_zobrist()
+
+    def _clear(self):
+        # One bitboard per piece type and color, plus occupancy per color.
+        # self.squares is a 64-entry mailbox of piece codes (None when empty).
+        self.pieces = [0] * 12
+        self.occupancy = [0, 0]
+        self.squares = [None] * 64
+        # Per-color piece lists (sets of squares) and king squares, kept in sync by _put/_remove
+        self.piece_squares = [set(), set()]
+        self.king_square = [None, None]
+        # Incremental evaluation terms: material + piece-square score (kings
+        # excluded) and non-pawn material, per color
+        self.psq = [0, 0]
+        self.material = [0, 0]
         self.turn = 'w'
         self.history = []
-        self._setup_board()
-        self.wk_castle = self.bk_castle = self.wq_castle = self.bq_castle = True
-        self.en_passant = None
+        self.zobrist_key = 0
+        self.castling = 0
+        self.ep_square = None
         self.halfmove_clock = 0
         self.fullmove_number = 1
 
+    def set_fen(self, fen):
+        # Load a position from FEN (clocks are optional)
+        fields = fen.split()
+        self._clear()
+        for row, rank in enumerate(fields[0].split('/')):
+            col = 0
+            for ch in rank:
+                if ch.isdigit():
+                    col += int(ch)
+                else:
+                    self._put(row*8 + col, (0 if ch.isupper() else 6) + PIECE_KINDS.index(ch.upper()))
+                    col += 1
+        self.turn = fields[1]
+        for ch, bit in zip('KQkq', (WK_CASTLE, WQ_CASTLE, BK_CASTLE, BQ_CASTLE)):
+            if ch in fields[2]:
+                self.castling |= bit
+        if fields[3] != '-':
+            self.ep_square = (8 - int(fields[3][1]))*8 + 'abcdefgh'.index(fields[3][0])
+        if len(fields) > 5:
+            self.halfmove_clock = int(fields[4])
+            self.fullmove_number = int(fields[5])
+        self.zobrist_key = self.compute_zobrist()
+
+    def fen(self):
+        # Position as FEN; like set_fen's input, the en passant square is
+        # given after every double pawn push
+        rows = []
+        for row in range(8):
+            text, empty = '', 0
+            for piece in self.squares[row*8:row*8 + 8]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += PIECE_KINDS[piece % 6] if piece < 6 else PIECE_KINDS[piece % 6].lower()
+            rows.append(text + str(empty) if empty else text)
+        castling = ''.join(ch for ch, bit in zip('KQkq', (WK_CASTLE, WQ_CASTLE, BK_CASTLE, BQ_CASTLE))
+                           if self.castling & bit) or '-'
+        ep = '-'
+        if self.ep_square is not None:
+            ep = 'abcdefgh'[self.ep_square & 7] + str(8 - (self.ep_square >> 3))
+        return f"{'/'.join(rows)} {self.turn} {castling} {ep} {self.halfmove_clock} {self.fullmove_number}"
+
+    def copy(self):
+        # Independent snapshot (history included) for searching in another thread
+        return copy.deepcopy(self)
+
     def _setup_board(self):
         # Place pieces
         for i in range(8):
-            self.board[1][i] = Piece('b', 'P')
-            self.board[6][i] = Piece('w', 'P')
-        setup = ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
-        for i, k in enumerate(setup):
-            self.board[0][i] = Piece('b', k)
-            self.board[7][i] = Piece('w', k)
+            self._put(8+i, 6 + PAWN)
+            self._put(48+i, PAWN)
+        setup = [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK]
+        for i, kind in enumerate(setup):
+            self._put(i, 6 + kind)
+            self._put(56+i, kind)
+
+    def _put(self, sq, piece):
+        bit = 1 << sq
+        color = piece // 6
+        kind = piece % 6
+        self.squares[sq] = piece
+        self.pieces[piece] |= bit
+        self.occupancy[color] |= bit
+        self.piece_squares[color].add(sq)
+        self.zobrist_key ^= ZOBRIST_PIECE[piece][sq]
+        self.psq[color] += PIECE_SQUARE[piece][sq]
+        if kind == KING:
+            self.king_square[color] = sq
+        elif kind != PAWN:
+            self.material[color] += PIECE_VALUES[kind]
+
+    def _remove(self, sq):
+        piece = self.squares[sq]
+        mask = ~(1 << sq)
+        color = piece // 6
+        kind = piece % 6
+        self.squares[sq] = None
+        self.pieces[piece] &= mask
+        self.occupancy[color] &= mask
+        self.piece_squares[color].discard(sq)
+        self.zobrist_key ^= ZOBRIST_PIECE[piece][sq]
+        self.psq[color] -= PIECE_SQUARE[piece][sq]
+        if kind != PAWN and kind != KING:
+            self.material[color] -= PIECE_VALUES[kind]
+        return piece
+
+    def compute_zobrist(self):
+        # Full recomputation; push/pop keep self.zobrist_key up to date incrementally
+        key = 0
+        for sq, piece in enumerate(self.squares):
+            if piece is not None:
+                key ^= ZOBRIST_PIECE[piece][sq]
+        key ^= ZOBRIST_CASTLING[self.castling] ^ self._ep_zobrist()
+        if self.turn == 'w':
+            key ^= ZOBRIST_WHITE_TO_MOVE
+        return key
+
+    def _ep_zobrist(self):
+        # Like Polyglot, the en passant file only counts when the side to move
+        # has a pawn next to the pawn that just advanced two squares
+        ep = self.ep_square
+        if ep is None:
+            return 0
+        color = COLOR_NAMES.index(self.turn)
+        if PAWN_ATTACKS[1-color][ep] & self.pieces[color*6 + PAWN]:
+            return ZOBRIST_EP[ep & 7]
+        return 0
+
+    def can_capture_en_passant(self):
+        # True when an en passant capture is legal. ep_square is set after
+        # every double push, so on its own it says nothing about the position.
+        ep = self.ep_square
+        if ep is None:
+            return False
+        color = COLOR_NAMES.index(self.turn)
+        pawns = PAWN_ATTACKS[1-color][ep] & self.pieces[color*6 + PAWN]
+        while pawns:
+            low = pawns & -pawns
+            for code in self.iter_move_codes(low.bit_length() - 1):
+                if code >> 6 & 63 == ep:
+                    return True
+            pawns ^= low
+        return False
+
+    # En passant target as (row, col), backed by ep_square
+    @property
+    def en_passant(self):
+        if self.ep_square is None:
+            return None
+        return divmod(self.ep_square, 8)
+
+    @en_passant.setter
+    def en_passant(self, value):
+        self.ep_square = None if value is None else value[0]*8 + value[1]
 
     def piece_at(self, row, col):
-        return self.board[row][col]
+        piece = self.squares[row*8 + col]
+        return None if piece is None else PIECES[piece]
 
     def get_legal_moves(self, row, col):
-        piece = self.piece_at(row, col)
-        if not piece or piece.color != self.turn:
+        piece = self.squares[row*8 + col]
+        if piece is None or COLOR_NAMES[piece // 6] != self.turn:
             return []
-        moves = []
-        if piece.kind == 'P':
-            moves += self._pawn_moves(row, col)
-        elif piece.kind == 'N':
-            moves += self._knight_moves(row, col)
-        elif piece.kind == 'B':
-            moves += self._bishop_moves(row, col)
-        elif piece.kind == 'R':
-            moves += self._rook_moves(row, col)
-        elif piece.kind == 'Q':
-            moves += self._queen_moves(row, col)
-        elif piece.kind == 'K':
-            moves += self._king_moves(row, col)
-        # Remove moves that leave king in check
-        legal = []
-        for m in moves:
-            board_copy = copy.deepcopy(self)
-            board_copy.push(m)
-            if not board_copy.in_check(self.turn):
-                legal.append(m)
-        return legal
+        return list(self.iter_legal_moves(row*8 + col))
 
     def get_all_legal_moves_for(self, col, row):
         # For UI: get all legal moves for a piece
         return self.get_legal_moves(row, col)
 
-    def _pawn_moves(self, row, col):
-        moves = []
-        piece = self.piece_at(row, col)
-        dir = -1 if piece.color == 'w' else 1
-        # Move 1 forward
-        if self._on_board(row+dir, col) and not self.piece_at(row+dir, col):
-            # Promotion
-            if (piece.color == 'w' and row+dir == 0) or (piece.color == 'b' and row+dir == 7):
-                moves.append(Move(row, col, row+dir, col, promotion='Q'))
+    def generate_legal_moves(self):
+        return list(self.iter_legal_moves())
+
+    def generate_captures(self):
+        # Legal captures (en passant included) and promotions
+        return list(self.iter_legal_moves(captures_only=True))
+
+    def iter_legal_moves(self, only_sq=None, captures_only=False):
+        # iter_move_codes wrapped in Move objects
+        for code in self.iter_move_codes(only_sq, captures_only):
+            yield Move.from_code(code)
+
+    def move_codes(self, only_sq=None, captures_only=False):
+        # Legal move codes as an array('H'), for the search and other hot loops
+        return array('H', self.iter_move_codes(only_sq, captures_only))
+
+    def parse_san(self, san):
+        # Legal move for a SAN string such as 'Nbd7', 'exd5', 'e8=Q+' or 'O-O', else None
+        san = san.rstrip('+#!?').replace('0', 'O')
+        if san in ('O-O', 'O-O-O'):
+            for code in self.iter_move_codes(self.king_square[COLOR_NAMES.index(self.turn)]):
+                if code & CASTLING_FLAG and (code >> 6 & 7 == 6) == (san == 'O-O'):
+                    return Move.from_code(code)
+            return None
+        match = SAN_PATTERN.match(san)
+        if not match:
+            return None
+        kind, from_file, from_rank, to_square, promotion = match.groups()
+        kind = PIECE_KINDS.index(kind or 'P')
+        to = (8 - int(to_square[1]))*8 + 'abcdefgh'.index(to_square[0])
+        promotion = PIECE_KINDS.index(promotion) if promotion else 0
+        # Only pieces of that kind which reach the square are generated:
+        # pawns on the file they move from, other pieces attacking it
+        color = COLOR_NAMES.index(self.turn)
+        candidates = self.pieces[color*6 + kind]
+        if kind == PAWN:
+            candidates &= FILE_A << ('abcdefgh'.index(from_file) if from_file else to & 7)
+        elif kind == KNIGHT:
+            candidates &= KNIGHT_ATTACKS[to]
+        elif kind == KING:
+            candidates &= KING_ATTACKS[to]
+        else:
+            occ = self.occupancy[0] | self.occupancy[1]
+            reach = 0
+            if kind != ROOK:
+                reach |= bishop_attacks(to, occ)
+            if kind != BISHOP:
+                reach |= rook_attacks(to, occ)
+            candidates &= reach
+        if from_file and kind != PAWN:
+            candidates &= FILE_A << 'abcdefgh'.index(from_file)
+        if from_rank:
+            candidates &= 0xFF << 8*(8 - int(from_rank))
+        found = None
+        while candidates:
+            lsb = candidates & -candidates
+            for code in self.iter_move_codes(lsb.bit_length() - 1):
+                if code >> 6 & 63 == to and code >> PROMOTION_SHIFT & 7 == promotion:
+                    if found is not None:
+                        return None  # ambiguous
+                    found = code
+            candidates ^= lsb
+        return None if found is None else Move.from_code(found)
+
+    def san(self, move):
+        # SAN for a legal move, e.g. 'Nbd7', 'exd5', 'e8=Q+', 'O-O' or 'Qh4#'
+        frm = move & 63
+        to = move >> 6 & 63
+        promotion = move >> PROMOTION_SHIFT & 7
+        squares = self.squares
+        kind = squares[frm] % 6
+        square = 'abcdefgh'[to & 7] + str(8 - (to >> 3))
+        if move & CASTLING_FLAG and kind == KING:
+            text = 'O-O' if to > frm else 'O-O-O'
+        elif kind == PAWN:
+            text = square
+            if (frm ^ to) & 7:
+                text = 'abcdefgh'[frm & 7] + 'x' + square
+            if promotion:
+                text += '=' + PIECE_KINDS[promotion]
+        else:
+            # Disambiguate by file, else rank, else both
+            others = [code & 63 for code in self.iter_move_codes()
+                      if code >> 6 & 63 == to and code & 63 != frm and squares[code & 63] % 6 == kind]
+            text = PIECE_KINDS[kind]
+            if others:
+                if all((other ^ frm) & 7 for other in others):
+                    text += 'abcdefgh'[frm & 7]
+                elif all(other >> 3 != frm >> 3 for other in others):
+                    text += str(8 - (frm >> 3))
+                else:
+                    text += 'abcdefgh'[frm & 7] + str(8 - (frm >> 3))
+            if squares[to] is not None:
+                text += 'x'
+            text += square
+        self.push(move)
+        if self.in_check(self.turn):
+            text += '#' if self.is_game_over() else '+'
+        self.pop()
+        return text
+
+    def parse_uci(self, uci):
+        # Legal move matching a UCI string such as 'e2e4' or 'e7e8q', else None
+        for code in self.iter_move_codes():
+            if move_uci(code) == uci:
+                return Move.from_code(code)
+        return None
+
+    def iter_move_codes(self, only_sq=None, captures_only=False):
+        # Legal move codes for the side to move (optionally just the piece on
+        # only_sq, or just captures and promotions). Checkers and pins are
+        # computed once, so moves come out already legal and callers that only
+        # need one move can stop early. The board must be back in the same
+        # position whenever the generator is resumed.
+        color = COLOR_NAMES.index(self.turn)
+        them = 1 - color
+        own = self.occupancy[color]
+        occ = own | self.occupancy[them]
+        wanted = self.occupancy[them] if captures_only else FULL_BOARD
+        king_sq = self.king_square[color]
+        checkers, pins = self._checkers_and_pins(color)
+        if checkers & (checkers - 1):
+            evasions = 0  # double check: only the king can move
+        elif checkers:
+            evasions = checkers | BETWEEN[king_sq][checkers.bit_length()-1]
+        else:
+            evasions = FULL_BOARD
+        squares = list(self.piece_squares[color]) if only_sq is None else [only_sq]
+        for sq in squares:
+            kind = self.squares[sq] % 6
+            if kind == KING:
+                # The king may not step onto an attacked square (sliders see through it)
+                targets = KING_ATTACKS[sq] & ~own & wanted
+                occ_without_king = occ ^ (1 << sq)
+                while targets:
+                    lsb = targets & -targets
+                    to = lsb.bit_length() - 1
+                    if not self.attackers_to(to, them, occ_without_king):
+                        yield sq | to << 6
+                    targets ^= lsb
+                if not checkers and not captures_only:
+                    yield from self._castling_moves(sq, color)
+                continue
+            if not evasions:
+                continue
+            mask = ~own & evasions & pins.get(sq, FULL_BOARD)
+            if kind == PAWN:
+                yield from self._pawn_moves(sq, color, mask & (wanted | PROMOTION_RANKS))
+                continue
+            if kind == KNIGHT:
+                targets = KNIGHT_ATTACKS[sq]
+            elif kind == BISHOP:
+                targets = bishop_attacks(sq, occ)
+            elif kind == ROOK:
+                targets = rook_attacks(sq, occ)
             else:
-                moves.append(Move(row, col, row+dir, col))
-            # Move 2 forward
-            if ((piece.color == 'w' and row == 6) or (piece.color == 'b' and row == 1)) and not self.piece_at(row+2*dir, col):
-                moves.append(Move(row, col, row+2*dir, col))
-        # Capture
-        for dc in [-1, 1]:
-            nr, nc = row+dir, col+dc
-            if self._on_board(nr, nc):
-                target = self.piece_at(nr, nc)
-                if target and target.color != piece.color:
-                    if (piece.color == 'w' and nr == 0) or (piece.color == 'b' and nr == 7):
-                        moves.append(Move(row, col, nr, nc, promotion='Q'))
-                    else:
-                        moves.append(Move(row, col, nr, nc))
-        # En passant
-        if self.en_passant:
-            er, ec = self.en_passant
-            if abs(ec - col) == 1 and er == row+dir:
-                moves.append(Move(row, col, er, ec))
-        return moves
+                targets = rook_attacks(sq, occ) | bishop_attacks(sq, occ)
+            targets &= mask & wanted
+            while targets:
+                lsb = targets & -targets
+                yield sq | (lsb.bit_length()-1) << 6
+                targets ^= lsb
 
-    def _knight_moves(self, row, col):
-        moves = []
-        deltas = [(2,1),(2,-1),(-2,1),(-2,-1),(1,2),(1,-2),(-1,2),(-1,-2)]
-        piece = self.piece_at(row, col)
-        for dr, dc in deltas:
-            nr, nc = row+dr, col+dc
-            if self._on_board(nr, nc):
-                target = self.piece_at(nr, nc)
-                if not target or target.color != piece.color:
-                    moves.append(Move(row, col, nr, nc))
-        return moves
+    def _checkers_and_pins(self, color):
+        # Enemy pieces giving check, and {pinned square: squares it may move to}
+        king_sq = self.king_square[color]
+        if king_sq is None:
+            return 0, {}
+        them = 1 - color
+        pieces = self.pieces
+        base = them * 6
+        occ = self.occupancy[0] | self.occupancy[1]
+        own = self.occupancy[color]
+        queens = pieces[base+QUEEN]
+        checkers = self.attackers_to(king_sq, them, occ)
+        pins = {}
+        snipers = ((rook_attacks(king_sq, 0) & (pieces[base+ROOK] | queens))
+                   | (bishop_attacks(king_sq, 0) & (pieces[base+BISHOP] | queens)))
+        while snipers:
+            lsb = snipers & -snipers
+            line = BETWEEN[king_sq][lsb.bit_length()-1]
+            blockers = line & occ
+            if blockers & own and not blockers & (blockers - 1):
+                pins[blockers.bit_length()-1] = line | lsb
+            snipers ^= lsb
+        return checkers, pins
 
-    def _bishop_moves(self, row, col):
+    def _pawn_moves(self, sq, color, mask):
         moves = []
-        for dr, dc in [(-1,-1),(-1,1),(1,-1),(1,1)]:
-            moves += self._slide_moves(row, col, dr, dc)
+        enemy = self.occupancy[1-color]
+        occ = self.occupancy[color] | enemy
+        if color == WHITE:
+            step, start_row, last_row = -8, 6, 0
+        else:
+            step, start_row, last_row = 8, 1, 7
+        targets = 0
+        one = sq + step
+        # Move 1 forward, and 2 from the starting row
+        if not occ >> one & 1:
+            targets |= 1 << one
+            if sq >> 3 == start_row and not occ >> (one+step) & 1:
+                targets |= 1 << (one+step)
+        # Captures
+        attacks = PAWN_ATTACKS[color][sq]
+        targets |= attacks & enemy
+        targets &= mask
+        while targets:
+            lsb = targets & -targets
+            to = lsb.bit_length() - 1
+            if to >> 3 == last_row:
+                # Promotion
+                for promotion in PROMOTION_CODES:
+                    moves.append(sq | to << 6 | promotion)
+            else:
+                moves.append(sq | to << 6)
+            targets ^= lsb
+        # En passant removes two pieces from the board, so just try it
+        if self.ep_square is not None and attacks >> self.ep_square & 1:
+            move = sq | self.ep_square << 6
+            self.push(move)
+            if not self.in_check(COLOR_NAMES[color]):
+                moves.append(move)
+            self.pop()
         return moves
 
-    def _rook_moves(self, row, col):
+    def _castling_moves(self, sq, color):
+        # Squares between king and rook empty, king not passing through check
+        # (the caller has already checked the king isn't in check)
         moves = []
-        for dr, dc in [(-1,0),(1,0),(0,-1),(0,1)]:
-            moves += self._slide_moves(row, col, dr, dc)
+        if color == WHITE:
+            home, king_side, queen_side = 60, WK_CASTLE, WQ_CASTLE
+        else:
+            home, king_side, queen_side = 4, BK_CASTLE, BQ_CASTLE
+        if sq == home and self.castling & (king_side | queen_side):
+            occ = self.occupancy[0] | self.occupancy[1]
+            enemy = 1 - color
+            if (self.castling & king_side and not occ & (0b11 << (home+1))
+                    and not self.is_attacked(home+1, enemy) and not self.is_attacked(home+2, enemy)):
+                moves.append(home | (home+2) << 6 | CASTLING_FLAG)
+            if (self.castling & queen_side and not occ & (0b111 << (home-3))
+                    and not self.is_attacked(home-1, enemy) and not self.is_attacked(home-2, enemy)):
+                moves.append(home | (home-2) << 6 | CASTLING_FLAG)
         return moves
 
-    def _queen_moves(self, row, col):
-        return self._rook_moves(row, col)+self._bishop_moves(row, col)
+    def attacks_by(self, color):
+        # Union of all squares attacked by the pieces of color
+        base = color * 6
+        occ = self.occupancy[0] | self.occupancy[1]
+        pawns = self.pieces[base+PAWN]
+        if color == WHITE:
+            attacked = ((pawns & ~FILE_A) >> 9) | ((pawns & ~FILE_H) >> 7)
+        else:
+            attacked = ((pawns & ~FILE_A) << 7) | ((pawns & ~FILE_H) << 9)
+        attacked &= (1 << 64) - 1
+        for kind, table in ((KNIGHT, KNIGHT_ATTACKS), (KING, KING_ATTACKS)):
+            bb = self.pieces[base+kind]
+            while bb:
+                lsb = bb & -bb
+                attacked |= table[lsb.bit_length()-1]
+                bb ^= lsb
+        bb = self.pieces[base+BISHOP] | self.pieces[base+QUEEN]
+        while bb:
+            lsb = bb & -bb
+            attacked |= bishop_attacks(lsb.bit_length()-1, occ)
+            bb ^= lsb
+        bb = self.pieces[base+ROOK] | self.pieces[base+QUEEN]
+        while bb:
+            lsb = bb & -bb
+            attacked |= rook_attacks(lsb.bit_length()-1, occ)
+            bb ^= lsb
+        return attacked
 
-    def _king_moves(self, row, col):
-        moves = []
-        piece = self.piece_at(row, col)
-        for dr in [-1,0,1]:
-            for dc in [-1,0,1]:
-                if dr==0 and dc==0: continue
-                nr, nc = row+dr, col+dc
-                if self._on_board(nr, nc):
-                    target = self.piece_at(nr, nc)
-                    if not target or target.color != piece.color:
-                        moves.append(Move(row, col, nr, nc))
-        # Castling
-        if piece.color == 'w' and row == 7 and col == 4:
-            if self.wk_castle and all(self.piece_at(7, c) is None for c in [5,6]):
-                if not self.in_check('w') and not self.square_attacked(7,5,'b') and not self.square_attacked(7,6,'b'):
-                    moves.append(Move(7,4,7,6,is_castling=True))
-            if self.wq_castle and all(self.piece_at(7, c) is None for c in [1,2,3]):
-                if not self.in_check('w') and not self.square_attacked(7,2,'b') and not self.square_attacked(7,3,'b'):
-                    moves.append(Move(7,4,7,2,is_castling=True))
-        if piece.color == 'b' and row == 0 and col == 4:
-            if self.bk_castle and all(self.piece_at(0, c) is None for c in [5,6]):
-                if not self.in_check('b') and not self.square_attacked(0,5,'w') and not self.square_attacked(0,6,'w'):
-                    moves.append(Move(0,4,0,6,is_castling=True))
-            if self.bq_castle and all(self.piece_at(0, c) is None for c in [1,2,3]):
-                if not self.in_check('b') and not self.square_attacked(0,2,'w') and not self.square_attacked(0,3,'w'):
-                    moves.append(Move(0,4,0,2,is_castling=True))
-        return moves
+    def attackers_to(self, sq, color, occ=None):
+        # Reverse lookup: cast piece patterns outward from sq and intersect
+        # them with the attacker's bitboards
+        pieces = self.pieces
+        base = color * 6
+        if occ is None:
+            occ = self.occupancy[0] | self.occupancy[1]
+        queens = pieces[base+QUEEN]
+        return ((PAWN_ATTACKS[1-color][sq] & pieces[base+PAWN])
+                | (KNIGHT_ATTACKS[sq] & pieces[base+KNIGHT])
+                | (KING_ATTACKS[sq] & pieces[base+KING])
+                | (bishop_attacks(sq, occ) & (pieces[base+BISHOP] | queens))
+                | (rook_attacks(sq, occ) & (pieces[base+ROOK] | queens)))
 
-    def _slide_moves(self, row, col, dr, dc):
-        moves = []
-        piece = self.piece_at(row, col)
-        nr, nc = row+dr, col+dc
-        while self._on_board(nr, nc):
-            target = self.piece_at(nr, nc)
-            if not target:
-                moves.append(Move(row, col, nr, nc))
-            else:
-                if target.color != piece.color:
-                    moves.append(Move(row, col, nr, nc))
-                break
-            nr += dr
-            nc += dc
-        return moves
+    def is_attacked(self, sq, color):
+        # Same as attackers_to but stops at the first hit, cheapest patterns first
+        pieces = self.pieces
+        base = color * 6
+        if KNIGHT_ATTACKS[sq] & pieces[base+KNIGHT]:
+            return True
+        if PAWN_ATTACKS[1-color][sq] & pieces[base+PAWN]:
+            return True
+        if KING_ATTACKS[sq] & pieces[base+KING]:
+            return True
+        occ = self.occupancy[0] | self.occupancy[1]
+        queens = pieces[base+QUEEN]
+        if bishop_attacks(sq, occ) & (pieces[base+BISHOP] | queens):
+            return True
+        return bool(rook_attacks(sq, occ) & (pieces[base+ROOK] | queens))
 
-    def _on_board(self, row, col):
-        return 0 <= row < 8 and 0 <= col < 8
+    def see(self, move):
+        # Static exchange evaluation: material won (centipawns) by the capture
+        # sequence move starts on its target square, each side recapturing
+        # with its least valuable attacker. Removing a capturer from the
+        # occupancy uncovers the sliders behind it (x-rays).
+        frm = move & 63
+        to = move >> 6 & 63
+        pieces = self.pieces
+        kind = self.squares[frm] % 6
+        color = self.squares[frm] // 6
+        victim = self.squares[to]
+        occ = (self.occupancy[0] | self.occupancy[1]) ^ (1 << frm)
+        if victim is not None:
+            gain = PIECE_VALUES[victim % 6]
+        elif kind == PAWN and to == self.ep_square:
+            gain = PIECE_VALUES[PAWN]
+            occ ^= 1 << (to + (8 if color == WHITE else -8))
+        else:
+            gain = 0
+        on_square = PIECE_VALUES[kind]
+        if move >> PROMOTION_SHIFT & 7:
+            promoted = PIECE_VALUES[move >> PROMOTION_SHIFT & 7]
+            gain += promoted - PIECE_VALUES[PAWN]
+            on_square = promoted
+        gains = [gain]
+        side = 1 - color
+        while True:
+            attackers = self.attackers_to(to, side, occ) & occ
+            if not attackers:
+                break
+            for kind in range(6):
+                bits = attackers & pieces[side*6 + kind]
+                if bits:
+                    break
+            if kind == KING and self.attackers_to(to, 1 - side, occ) & occ:
+                break  # the king cannot capture onto a defended square
+            gains.append(on_square - gains[-1])
+            on_square = PIECE_VALUES[kind]
+            occ ^= bits & -bits
+            side = 1 - side
+        # Either side may stop capturing when continuing loses material
+        while len(gains) > 1:
+            last = gains.pop()
+            gains[-1] = -max(-gains[-1], last)
+        return gains[0]
 
     def in_check(self, color):
-        # Find king
-        for row in range(8):
-            for col in range(8):
-                p = self.piece_at(row, col)
-                if p and p.color == color and p.kind == 'K':
-                    king_row, king_col = row, col
-        opp = 'b' if color == 'w' else 'w'
-        return self.square_attacked(king_row, king_col, opp)
+        c = COLOR_NAMES.index(color)
+        king_sq = self.king_square[c]
+        if king_sq is None:
+            return False
+        return self.is_attacked(king_sq, 1-c)
 
     def square_attacked(self, row, col, attacker_color):
-        # For each piece of attacker_color, check if can move to (row, col)
-        for r in range(8):
-            for c in range(8):
-                p = self.piece_at(r, c)
-                if p and p.color == attacker_color:
-                    for m in self._pseudo_moves(r, c):
-                        if (m.to_row, m.to_col) == (row, col):
-                            return True
-        return False
-
-    def _pseudo_moves(self, row, col):
-        # Moves without check validation, for attack detection
-        piece = self.piece_at(row, col)
-        if not piece:
-            return []
-        if piece.kind == 'P':
-            moves = []
-            dir = -1 if piece.color == 'w' else 1
-            for dc in [-1, 1]:
-                nr, nc = row+dir, col+dc
-                if self._on_board(nr, nc):
-                    moves.append(Move(row, col, nr, nc))
-            return moves
-        elif piece.kind == 'N':
-            return self._knight_moves(row, col)
-        elif piece.kind == 'B':
-            return self._bishop_moves(row, col)
-        elif piece.kind == 'R':
-            return self._rook_moves(row, col)
-        elif piece.kind == 'Q':
-            return self._queen_moves(row, col)
-        elif piece.kind == 'K':
-            moves = []
-            for dr in [-1,0,1]:
-                for dc in [-1,0,1]:
-                    if dr==0 and dc==0: continue
-                    nr, nc = row+dr, col+dc
-                    if self._on_board(nr, nc):
-                        moves.append(Move(row, col, nr, nc))
-            return moves
-        return []
+        return self.is_attacked(row*8 + col, COLOR_NAMES.index(attacker_color))
 
     def push(self, move):
-        piece = self.piece_at(move.from_row, move.from_col)
-        self.history.append((copy.deepcopy(self.board), self.turn, self.wk_castle, self.wq_castle, self.bk_castle, self.bq_castle, self.en_passant))
-        # Castling
-        if move.is_castling and piece.kind == 'K':
-            if move.to_col == 6:
-                # king-side
-                self.board[move.to_row][4] = None
-                self.board[move.to_row][6] = piece
-                self.board[move.to_row][7], self.board[move.to_row][5] = None, self.board[move.to_row][7]
-            elif move.to_col == 2:
-                # queen-side
-                self.board[move.to_row][4] = None
-                self.board[move.to_row][2] = piece
-                self.board[move.to_row][0], self.board[move.to_row][3] = None, self.board[move.to_row][0]
-            piece.has_moved = True
-            if piece.color == 'w':
-                self.wk_castle = self.wq_castle = False
+        # move is a Move or a plain move code
+        frm = move & 63
+        to = move >> 6 & 63
+        piece = self.squares[frm]
+        kind = piece % 6
+        captured = None
+        cap_sq = to
+        key = self.zobrist_key
+        # Take out the old castling/en passant keys; pieces are hashed by _put/_remove
+        self.zobrist_key ^= ZOBRIST_CASTLING[self.castling] ^ self._ep_zobrist()
+        self._remove(frm)
+        if move & CASTLING_FLAG and kind == KING:
+            # Move the rook too: h-file rook for king-side, a-file rook for queen-side
+            if to > frm:
+                self._put(frm+1, self._remove(frm+3))
             else:
-                self.bk_castle = self.bq_castle = False
-        else:
+                self._put(frm-1, self._remove(frm-4))
+        elif kind == PAWN and to == self.ep_square:
+            # En passant
+            cap_sq = to+8 if piece < 6 else to-8
+            captured = self._remove(cap_sq)
+        elif self.squares[to] is not None:
+            captured = self._remove(to)
+        # Undo record: everything push changes that can't be recomputed from the move
+        self.history.append((move, piece, captured, cap_sq, self.castling, self.ep_square,
+                             self.halfmove_clock, key))
+        promotion = move >> PROMOTION_SHIFT & 7
+        if kind == PAWN and promotion and (to >> 3 == 0 or to >> 3 == 7):
             # Pawn promotion
-            if piece.kind == 'P' and move.promotion and (move.to_row == 0 or move.to_row == 7):
-                self.board[move.from_row][move.from_col] = None
-                self.board[move.to_row][move.to_col] = Piece(piece.color, move.promotion)
-            else:
-                self.board[move.from_row][move.from_col] = None
-                # En passant
-                if piece.kind == 'P' and self.en_passant and (move.to_row, move.to_col) == self.en_passant:
-                    dir = -1 if piece.color == 'w' else 1
-                    self.board[move.to_row-dir][move.to_col] = None
-                self.board[move.to_row][move.to_col] = piece
-            piece.has_moved = True
-            # Update castling rights
-            if piece.kind == 'K':
-                if piece.color == 'w': self.wk_castle = self.wq_castle = False
-                else: self.bk_castle = self.bq_castle = False
-            if piece.kind == 'R':
-                if move.from_row == 7 and move.from_col == 0: self.wq_castle = False
-                if move.from_row == 7 and move.from_col == 7: self.wk_castle = False
-                if move.from_row == 0 and move.from_col == 0: self.bq_castle = False
-                if move.from_row == 0 and move.from_col == 7: self.bk_castle = False
+            self._put(to, piece - PAWN + promotion)
+        else:
+            self._put(to, piece)
+        # Update castling rights
+        self.castling &= CASTLING_KEEP[frm] & CASTLING_KEEP[to]
         # Update en passant
-        if piece.kind == 'P' and abs(move.to_row - move.from_row) == 2:
-            self.en_passant = ((move.from_row + move.to_row)//2, move.from_col)
+        if kind == PAWN and abs(to - frm) == 16:
+            self.ep_square = (frm + to) // 2
+        else:
+            self.ep_square = None
+        if kind == PAWN or captured is not None:
+            self.halfmove_clock = 0
         else:
-            self.en_passant = None
+            self.halfmove_clock += 1
+        if self.turn == 'b':
+            self.fullmove_number += 1
         self.turn = 'b' if self.turn == 'w' else 'w'
+        self.zobrist_key ^= ZOBRIST_CASTLING[self.castling] ^ self._ep_zobrist() ^ ZOBRIST_WHITE_TO_MOVE
+
+    def pop(self):
+        # Unmake the last pushed move and return it
+        move, piece, captured, cap_sq, castling, ep_square, halfmove_clock, key = self.history.pop()
+        frm = move & 63
+        to = move >> 6 & 63
+        self._remove(to)
+        self._put(frm, piece)
+        if move & CASTLING_FLAG and piece % 6 == KING:
+            if to > frm:
+                self._put(frm+3, self._remove(frm+1))
+            else:
+                self._put(frm-4, self._remove(frm-1))
+        if captured is not None:
+            self._put(cap_sq, captured)
+        self.castling = castling
+        self.ep_square = ep_square
+        self.halfmove_clock = halfmove_clock
+        self.turn = 'b' if self.turn == 'w' else 'w'
+        if self.turn == 'b':
+            self.fullmove_number -= 1
+        self.zobrist_key = key
+        return move
+
+    def is_repetition(self):
+        # True if the position already occurred since the last capture or pawn move
+        key = self.zobrist_key
+        history = self.history
+        for i in range(2, min(self.halfmove_clock, len(history)) + 1, 2):
+            if history[-i][7] == key:
+                return True
+        return False
+
+    def evaluate(self):
+        # Static evaluation in centipawns from the side to move's point of view
+        score = self.psq[0] - self.psq[1]
+        king_table = PST[KING]
+        if self.material[0] + self.material[1] <= ENDGAME_MATERIAL:
+            king_table = KING_ENDGAME_PST
+        if self.king_square[0] is not None:
+            score += king_table[self.king_square[0]]
+        if self.king_square[1] is not None:
+            score -= king_table[self.king_square[1] ^ 56]
+        return score if self.turn == 'w' else -score
 
     def is_game_over(self):
-        for r in range(8):
-            for c in range(8):
-                p = self.piece_at(r, c)
-                if p and p.color == self.turn and self.get_legal_moves(r, c):
-                    return False
-        if self.in_check(self.turn):
-            return True
+        # Stops at the first legal move
+        for _ in self.iter_legal_moves():
+            return False
         return True
 
+    def is_insufficient_material(self):
+        # Bare kings, a single minor piece, or bishops all on one square colour
+        pieces = self.pieces
+        for kind in (PAWN, ROOK, QUEEN):
+            if pieces[kind] or pieces[6 + kind]:
+                return False
+        knights = pieces[KNIGHT] | pieces[6 + KNIGHT]
+        bishops = pieces[BISHOP] | pieces[6 + BISHOP]
+        if bin(knights | bishops).count('1') <= 1:
+            return True
+        return not knights and (not bishops & LIGHT_SQUARES or not bishops & ~LIGHT_SQUARES)
+
     def get_winner(self):
         if self.in_check(self.turn):
             return 'Brancas' if self.turn == 'b' else 'Pretas'
         else:
             return 'Empate'
 
+# Transposition table entry bounds
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+# An entry's data packs into one 64-bit word: score + TT_SCORE_OFFSET (bits
+# 0-31), depth (32-39), bound (40-41), move code (42-57, 0 = none) and the
+# search generation (58-63). A valid word is never 0.
+TT_SCORE_OFFSET = 1 << 31
+
+def tt_pack(depth, score, bound, move, generation):
+    return ((score + TT_SCORE_OFFSET) | min(depth, 0xFF) << 32 | bound << 40
+            | (move or 0) << 42 | generation << 58)
+
+def tt_unpack(data):
+    # (depth, score, bound, move code or None)
+    return (data >> 32 & 0xFF, (data & 0xFFFFFFFF) - TT_SCORE_OFFSET, data >> 40 & 3,
+            data >> 42 & 0xFFFF or None)
+
+class TranspositionTable:
+    # Fixed-size table indexed by the low bits of the Zobrist key. A slot is
+    # replaced when it is empty, left over from an older search, or holds a
+    # shallower (or equally deep) result; otherwise the deeper entry is kept.
+    # Slots are two array('Q') words, key and packed data: 16 bytes each.
+    def __init__(self, size_bits=20):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def new_search(self):
+        # Entries from earlier searches become replaceable
+        self.generation = (self.generation + 1) & 63
+
+    def probe(self, key):
+        # Returns (depth, score, bound, move) or None
+        index = key & self.mask
+        data = self.data[index]
+        if data and self.keys[index] == key:
+            self.hits += 1
+            return tt_unpack(data)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, bound, move=None):
+        index = key & self.mask
+        old = self.data[index]
+        if old:
+            if self.keys[index] != key:
+                if old >> 58 == self.generation and old >> 32 & 0xFF > depth:
+                    self.collisions += 1
+                    return
+            elif move is None:
+                # Same position: keep the best move we already had
+                move = old >> 42 & 0xFFFF
+        self.keys[index] = key
+        self.data[index] = tt_pack(depth, score, bound, move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self):
+        used = self.size - self.data.count(0)
+        return {'size': self.size, 'used': used, 'hits': self.hits, 'misses': self.misses,
+                'stores': self.stores, 'collisions': self.collisions, 'hit_rate': self.hit_rate()}
+
+MATE_SCORE = 100000
+# Scores beyond this are mates (search or tablebase), stored relative to the node in the TT
+MATE_BOUND = MATE_SCORE - 1024
+INFINITY = 10**9
+# Move ordering buckets
+ORDER_TT_MOVE = 1 << 30
+ORDER_CAPTURE = 1 << 24
+ORDER_KILLER = 1 << 20
+ORDER_LOSING_CAPTURE = -(1 << 20)
+# Quiescence: skip captures that cannot raise the score to alpha even with this margin
+DELTA_MARGIN = 200
+
+class SearchAborted(Exception):
+    pass
+
 class ChessAI:
-    def __init__(self, color):
+    # Negamax alpha-beta with iterative deepening under a time/node budget.
+    # Leaves are resolved by a quiescence search over captures that do not
+    # lose material by static exchange (SEE). Moves are ordered TT move first,
+    # then winning and even captures by MVV-LVA, killers, the history
+    # heuristic and losing captures last. choose_move plays from an OpeningBook first; with
+    # an AnalysisCache it answers from it when the stored result is at least
+    # cache_depth plies deep, and stores what it finds otherwise. With a
+    # Tablebase, endings it covers are played from the tables at the root and
+    # scored exactly at inner nodes. With a parallel_search.SearchPool, helper
+    # processes search the same root through a shared transposition table.
+    def __init__(self, color, time_limit=0.2, max_depth=32, node_limit=None, cache=None, cache_depth=4,
+                 book=None, book_mode='weighted', tablebase=None, pool=None):
         self.color = color
+        self.pool = pool
+        self.parallel = False
+        self.tablebase = tablebase
+        self.book = book
+        self.book_mode = book_mode
+        self.cache = cache
+        self.cache_depth = cache_depth
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.node_limit = node_limit
+        self.tt = pool.table if pool is not None else TranspositionTable()
+        self.history = [[0] * 64 for _ in range(12)]
+        self.killers = [[None, None] for _ in range(128)]
+        self.nodes = 0
+        self.depth_reached = 0
+        self.stop_requested = False
+
+    def stop(self):
+        # Ask a running search (e.g. in a worker thread) to return as soon as
+        # possible. search() does not clear the request, so a stop sent before
+        # the search starts still counts; the caller clears stop_requested
+        # before starting the next one (AIWorker.start in main.py).
+        self.stop_requested = True
 
     def choose_move(self, board):
-        # MiniMax 1-ply with capture priority
-        moves = []
-        for r in range(8):
-            for c in range(8):
-                p = board.piece_at(r, c)
-                if p and p.color == self.color:
-                    moves += board.get_legal_moves(r, c)
+        if board.turn != self.color:
+            return None
+        if self.book is not None:
+            move = self.book.choose(board.zobrist_key, board.parse_uci, self.book_mode)
+            if move:
+                return move
+        if self.cache is not None:
+            entry = self.cache.get(board.zobrist_key)
+            if entry and entry[0] >= self.cache_depth:
+                move = board.parse_uci(entry[2])
+                if move:
+                    return move
+        move, score = self.search(board)
+        if self.cache is not None and move is not None and self.depth_reached:
+            self.cache.put(board.zobrist_key, self.depth_reached, score, move.uci())
+        return move
+
+    def choose_best_move(self, board, row, col, moves=None):
+        # For virtual assist: best move for the piece at (row, col), shallow search
+        if moves is None:
+            moves = board.get_legal_moves(row, col)
         if not moves:
             return None
-        # Prefer captures
-        capture_moves = [m for m in moves if board.piece_at(m.to_row, m.to_col)]
-        if capture_moves:
-            return random.choice(capture_moves)
-        return random.choice(moves)
-
-    def choose_best_move(self, board, row, col):
-        # For virtual assist: Suggest best move for piece at (row, col)
-        moves = board.get_legal_moves(row, col)
+        move, _ = self.search(board, moves, max_depth=2)
+        return move
+
+    def search(self, board, root_moves=None, time_limit=None, max_depth=None, node_limit=None):
+        # Returns (best move, score) for the side to move. The search itself
+        # works on move codes; only the result is wrapped in a Move.
+        moves = board.move_codes() if root_moves is None else list(root_moves)
         if not moves:
+            return None, 0
+        self.nodes = 0
+        self.depth_reached = 0
+        if self.tablebase is not None:
+            found = self._tablebase_root(board, moves)
+            if found is not None:
+                return Move.from_code(found[0]), found[1]
+        time_limit = self.time_limit if time_limit is None else time_limit
+        max_depth = self.max_depth if max_depth is None else max_depth
+        self.node_limit_now = self.node_limit if node_limit is None else node_limit
+        start = time.perf_counter()
+        self.deadline = start + time_limit if time_limit else None
+        # Helpers only join full searches (not choose_best_move's single piece)
+        self.parallel = self.pool is not None and root_moves is None
+        if self.parallel:
+            self.pool.start(board, time_limit, max_depth)
+        self.tt.new_search()
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for row in self.history:
+            for sq in range(64):
+                row[sq] >>= 2
+        root_ply = len(board.history)
+        best_move, best_score = self._order_moves(board, moves, None, 0)[0], 0
+        try:
+            for depth in range(1, max_depth + 1):
+                try:
+                    best_move, best_score = self._search_root(board, moves, depth, best_move)
+                except SearchAborted:
+                    while len(board.history) > root_ply:
+                        board.pop()
+                    if self.root_best is not None:
+                        # Part of this iteration finished, starting with the previous best
+                        best_move, best_score = self.root_best
+                    break
+                self.depth_reached = depth
+                if abs(best_score) >= MATE_BOUND:
+                    break
+                # The next iteration would most likely not finish in time
+                if self.deadline and time.perf_counter() - start > time_limit / 2:
+                    break
+        finally:
+            # The helpers search until this searcher is done, whatever ended it
+            if self.parallel:
+                self.pool.stop()
+        if self.parallel:
+            self.parallel = False
+            best_move, best_score, self.depth_reached = self.pool.collect(board, best_move, best_score,
+                                                                          self.depth_reached)
+        return Move.from_code(best_move), best_score
+
+    def _tablebase_score(self, board, ply):
+        # Exact score from the tables, or None if they do not cover the position
+        if len(board.piece_squares[0]) + len(board.piece_squares[1]) > self.tablebase.max_pieces:
             return None
-        # Prefer captures
-        capture_moves = [m for m in moves if board.piece_at(m.to_row, m.to_col)]
-        if capture_moves:
-            return capture_moves[0]
-        return moves[0]
\ No newline at end of file
+        found = self.tablebase.probe(board)
+        if found is None:
+            return None
+        wdl, plies = found
+        return wdl * (MATE_SCORE - ply - plies) if wdl else 0
+
+    def _tablebase_root(self, board, moves):
+        # Best move by the tables: fastest win, else a draw, else the slowest
+        # loss. None when some move leads outside the tables.
+        best = None
+        for move in moves:
+            board.push(move)
+            score = self._tablebase_score(board, 1)
+            board.pop()
+            if score is None:
+                return None
+            if best is None or -score > best[1]:
+                best = (move, -score)
+        return best
+
+    def _search_root(self, board, moves, depth, previous_best):
+        self.root_best = None
+        alpha = -INFINITY
+        ordered = self._order_moves(board, moves, previous_best, 0)
+        for move in ordered:
+            board.push(move)
+            score = -self._negamax(board, depth - 1, -INFINITY, -alpha, 1)
+            board.pop()
+            if score > alpha:
+                alpha = score
+                self.root_best = (move, score)
+        self.tt.store(board.zobrist_key, depth, alpha, TT_EXACT, self.root_best[0])
+        return self.root_best
+
+    def _check_limits(self):
+        if self.stop_requested:
+            raise SearchAborted()
+        if self.deadline and time.perf_counter() > self.deadline:
+            raise SearchAborted()
+        if self.node_limit_now and self.nodes >= self.node_limit_now:
+            raise SearchAborted()
+
+    def _negamax(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if not self.nodes & 63:
+            self._check_limits()
+        if board.halfmove_clock >= 100 or board.is_repetition():
+            return 0
+        if self.tablebase is not None:
+            score = self._tablebase_score(board, ply)
+            if score is not None:
+                return score
+        key = board.zobrist_key
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry:
+            tt_depth, tt_score, bound, tt_move = entry
+            if tt_depth >= depth:
+                # Mate scores are stored relative to the node
+                if tt_score > MATE_BOUND:
+                    tt_score -= ply
+                elif tt_score < -MATE_BOUND:
+                    tt_score += ply
+                if (bound == TT_EXACT or (bound == TT_LOWER and tt_score >= beta)
+                        or (bound == TT_UPPER and tt_score <= alpha)):
+                    return tt_score
+        if depth <= 0:
+            return self._quiesce(board, alpha, beta, ply)
+        moves = board.move_codes()
+        if not moves:
+            return -MATE_SCORE + ply if board.in_check(board.turn) else 0
+        alpha_orig = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in self._order_moves(board, moves, tt_move, ply):
+            board.push(move)
+            score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        to = move >> 6 & 63
+                        if board.squares[to] is None and not move >> PROMOTION_SHIFT & 7:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[board.squares[move & 63]][to] += depth * depth
+                        break
+        if best_score <= alpha_orig:
+            bound = TT_UPPER
+        elif best_score >= beta:
+            bound = TT_LOWER
+        else:
+            bound = TT_EXACT
+        stored = best_score
+        if stored > MATE_BOUND:
+            stored += ply
+        elif stored < -MATE_BOUND:
+            stored -= ply
+        self.tt.store(key, depth, stored, bound, best_move)
+        return best_score
+
+    def _quiesce(self, board, alpha, beta, ply):
+        # Captures only until the position is quiet, so the static evaluation
+        # is never taken in the middle of an exchange. In check every evasion
+        # is searched, since standing pat is not an option there.
+        self.nodes += 1
+        if not self.nodes & 63:
+            self._check_limits()
+        if ply >= len(self.killers) - 1:
+            return board.evaluate()
+        if board.in_check(board.turn):
+            moves = board.move_codes()
+            if not moves:
+                return -MATE_SCORE + ply
+            best_score = -INFINITY
+        else:
+            best_score = board.evaluate()
+            if best_score >= beta:
+                return best_score
+            alpha = max(alpha, best_score)
+            moves = []
+            squares = board.squares
+            for move in board.iter_move_codes(captures_only=True):
+                promotion = move >> PROMOTION_SHIFT & 7
+                if promotion and promotion != QUEEN:
+                    continue
+                victim = squares[move >> 6 & 63]
+                gain = PIECE_VALUES[victim % 6] if victim is not None else PIECE_VALUES[PAWN]
+                if promotion:
+                    gain += PIECE_VALUES[QUEEN] - PIECE_VALUES[PAWN]
+                # Delta pruning, then drop exchanges that lose material
+                if best_score + gain + DELTA_MARGIN <= alpha or board.see(move) < 0:
+                    continue
+                moves.append(move)
+        for move in self._order_moves(board, moves, None, ply):
+            board.push(move)
+            score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _order_moves(self, board, moves, tt_move, ply):
+        squares = board.squares
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        scored = []
+        for move in moves:
+            to = move >> 6 & 63
+            attacker = squares[move & 63]
+            victim = squares[to]
+            promotion = move >> PROMOTION_SHIFT & 7
+            if move == tt_move:
+                score = ORDER_TT_MOVE
+            elif victim is not None or promotion or (to == board.ep_square and attacker % 6 == PAWN):
+                # MVV-LVA: most valuable victim first, then least valuable attacker
+                victim_kind = victim % 6 if victim is not None else PAWN
+                score = ORDER_CAPTURE + victim_kind*10 + (5 - attacker % 6)
+                if promotion:
+                    score += PIECE_VALUES[promotion]
+                elif victim_kind < attacker % 6 and board.see(move) < 0:
+                    # Loses material: after the quiet moves
+                    score = ORDER_LOSING_CAPTURE + victim_kind*10 + (5 - attacker % 6)
+            elif move == killers[0]:
+                score = ORDER_KILLER + 1
+            elif move == killers[1]:
+                score = ORDER_KILLER
+            else:
+                score = self.history[attacker][to]
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+class MoveCache:
+    # Legal moves and assist suggestions per (position, square) for the hover
+    # assist. Everything is dropped once the board's Zobrist key changes (a
+    # push or pop), so hovering a piece costs one dict lookup after the first frame.
+    def __init__(self):
+        self.key = None
+        self.moves = {}
+        self.suggestions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self, board):
+        if board.zobrist_key != self.key:
+            self.key = board.zobrist_key
+            self.moves.clear()
+            self.suggestions.clear()
+
+    def legal_moves(self, board, row, col):
+        self._sync(board)
+        moves = self.moves.get((row, col))
+        if moves is None:
+            self.misses += 1
+            moves = self.moves[(row, col)] = board.get_legal_moves(row, col)
+        else:
+            self.hits += 1
+        return moves
+
+    def suggestion(self, board, row, col):
+        # (True, move) if the suggestion for the square is known, else (False, None).
+        # Suggestions are searched elsewhere (main.py does it off the UI thread)
+        # and handed back with add_suggestion.
+        self._sync(board)
+        if (row, col) in self.suggestions:
+            self.hits += 1
+            return True, self.suggestions[(row, col)]
+        self.misses += 1
+        return False, None
+
+    def add_suggestion(self, key, row, col, move):
+        # Dropped if the board has moved on from the position with this key
+        if key == self.key:
+            self.suggestions[(row, col)] = move
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,155 @@
+# Position index for the game explorer: what was played from a position in
+# a PGN collection, and how those games ended.
+#
+# The index is a file of 26-byte big-endian records (key, move, games,
+# white wins, draws, black wins) sorted by key and move. Keys are Polyglot
+# Zobrist hashes (ChessBoard.zobrist_key), so transpositions share their
+# records; moves are ChessBoard move codes. Explorer memory-maps the file and
+# binary-searches it like polyglot.OpeningBook, so a lookup touches a few
+# records whatever the size of the index.
+#
+# Building never holds the whole collection: index_games counts (key, move)
+# pairs in a dict, writes it out as a sorted run file whenever it grows past
+# RUN_ENTRIES pairs, and merge_runs streams the runs (from any number of
+# workers, see tools/explorer.py) into the final file with heapq.merge.
+import heapq
+import mmap
+import os
+import struct
+
+RECORD = struct.Struct('>QHIIII')
+KEY = struct.Struct('>Q')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.environ.get('XADREZ_EXPLORER', os.path.join(ROOT, 'assets', 'explorer.bin'))
+MAX_PLY = 40
+RUN_ENTRIES = 1 << 20
+# Result -> column of the counts (games, white, draws, black); '*' only counts the game
+RESULT_COLUMNS = {'1-0': 1, '1/2-1/2': 2, '0-1': 3}
+
+def index_games(games, run_prefix, max_ply=MAX_PLY, run_entries=RUN_ENTRIES):
+    # Counts the first max_ply moves (0 = all) of (headers, SAN moves, result)
+    # games, e.g. pgn.read_games, into sorted runs <run_prefix>-NNNN.run.
+    # Returns (games read, run paths).
+    from pgn import game_board
+    # (key << 16 | move) -> [games, white, draws, black]; the int sorts like (key, move)
+    stats = {}
+    runs = []
+    count = 0
+    for headers, sans, result in games:
+        count += 1
+        column = RESULT_COLUMNS.get(result)
+        board = game_board(headers)
+        for san in sans[:max_ply] if max_ply else sans:
+            move = board.parse_san(san)
+            if move is None:
+                break
+            pair = board.zobrist_key << 16 | move
+            entry = stats.get(pair)
+            if entry is None:
+                entry = stats[pair] = [0, 0, 0, 0]
+            entry[0] += 1
+            if column:
+                entry[column] += 1
+            board.push(move)
+        if len(stats) >= run_entries:
+            runs.append(write_run(f"{run_prefix}-{len(runs):04d}.run", stats))
+            stats = {}
+    if stats:
+        runs.append(write_run(f"{run_prefix}-{len(runs):04d}.run", stats))
+    return count, runs
+
+def write_run(path, stats):
+    with open(path, 'wb') as f:
+        for pair in sorted(stats):
+            f.write(RECORD.pack(pair >> 16, pair & 0xFFFF, *stats[pair]))
+    return path
+
+def read_run(path, block=4096):
+    # Records of a run or index file, block records at a time
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block * RECORD.size)
+            if not data:
+                break
+            yield from RECORD.iter_unpack(data)
+
+def merge_runs(runs, path, min_count=1):
+    # Writes the index from sorted runs, adding up records of the same
+    # (key, move) and dropping moves played fewer than min_count times.
+    # Returns the number of records.
+    written = 0
+    with open(path + '.tmp', 'wb') as out:
+        current = None
+        for record in heapq.merge(*(read_run(run) for run in runs)):
+            if current and current[0] == record[0] and current[1] == record[1]:
+                for i in range(2, 6):
+                    current[i] += record[i]
+                continue
+            if current and current[2] >= min_count:
+                out.write(RECORD.pack(*current))
+                written += 1
+            current = list(record)
+        if current and current[2] >= min_count:
+            out.write(RECORD.pack(*current))
+            written += 1
+    os.replace(path + '.tmp', path)
+    return written
+
+class Explorer:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // RECORD.size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def _first(self, key):
+        # Index of the first record with this key or a greater one
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(self.map, mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self, key):
+        # [(move code, games, white, draws, black)] for the position, most played first
+        found = []
+        i = self._first(key) if self.count else 0
+        while i < self.count:
+            record = RECORD.unpack_from(self.map, i * RECORD.size)
+            if record[0] != key:
+                break
+            found.append(record[1:])
+            i += 1
+        found.sort(key=lambda e: -e[1])
+        return found
+
+    def moves(self, board):
+        # [(Move, games, white, draws, black)] for the legal moves of board
+        from chess_logic import Move
+        entries = self.entries(board.zobrist_key)
+        if not entries:
+            return []
+        legal = set(board.move_codes())
+        return [(Move.from_code(code), *counts) for code, *counts in entries if code in legal]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+_default_explorer = None
+
+def default_explorer():
+    # Index at DEFAULT_PATH, or None if there is none
+    global _default_explorer
+    if _default_explorer is None:
+        try:
+            _default_explorer = Explorer()
+        except OSError:
+            _default_explorer = False
+    return _default_explorer or None
@@ -1,17 +1,122 @@
 import pygame
 import sys
-from chess_logic import ChessBoard, ChessAI, Move, piece_icons
-from ui import draw_board, draw_menu, draw_possible_moves, draw_suggestion, draw_end_screen, COLOR_THEMES
-
-pygame.init()
-pygame.display.set_caption("Xadrez Completo Python")
+import threading
+from chess_logic import ChessBoard, ChessAI, MoveCache
+from analysis_cache import default_cache
+from explorer import default_explorer
+from parallel_search import default_pool
+from polyglot import default_book
+from tablebase import default_tablebase
+from ui import BoardRenderer, draw_menu, draw_end_screen
 
 WIDTH, HEIGHT = 700, 700
-SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
-CLOCK = pygame.time.Clock()
+# Janela e relógio só existem depois de main(): os processos auxiliares da
+# busca (spawn no Windows e macOS) importam este módulo e não devem abrir janela
+SCREEN = None
+CLOCK = None
 FPS = 60
+# Tempo de busca da IA por lance (segundos); a margem mantém a resposta abaixo de 200 ms
+AI_MOVE_TIME = 0.18
+# Troca de thread mais frequente durante o jogo, para a janela não esperar a
+# busca da IA liberar o GIL
+SWITCH_INTERVAL = 0.001
+
+class AIWorker:
+    # Calcula o lance da IA numa thread, sobre uma cópia do tabuleiro, para a
+    # janela continuar desenhando e respondendo enquanto a busca roda
+    def __init__(self, ai):
+        self.ai = ai
+        self.thread = None
+        self.result = None
+        self.position = None
+
+    def idle(self):
+        return self.thread is None
+
+    def thinking(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, board):
+        self.position = (board.zobrist_key, len(board.history))
+        self.result = None
+        # Limpa o pedido de parada aqui, antes da thread: um cancel() que chegue
+        # antes de a busca começar não pode ser apagado por ela
+        self.ai.stop_requested = False
+        self.thread = threading.Thread(target=self._think, args=(board.copy(),), daemon=True)
+        self.thread.start()
+
+    def _think(self, snapshot):
+        self.result = self.ai.choose_move(snapshot)
+
+    def cancel(self):
+        # Interrompe a busca e descarta o resultado
+        if self.thread is not None:
+            self.ai.stop()
+            self.thread.join()
+            self.thread = None
+
+    def take_result(self, board):
+        # Lance pronto, se a posição não mudou desde o início da busca
+        if self.thread is None or self.thread.is_alive():
+            return None
+        self.thread = None
+        if self.position != (board.zobrist_key, len(board.history)):
+            return None
+        return self.result
+
+class SuggestionWorker:
+    # Busca a sugestão do assistente numa thread: mesmo rasa, ela leva dezenas
+    # de milissegundos e travaria a janela a cada peça nova sob o mouse. Até
+    # ficar pronta, nenhuma sugestão aparece
+    def __init__(self, ai, move_cache):
+        self.ai = ai
+        self.move_cache = move_cache
+        self.thread = None
+        self.request = None
+        self.result = None
+
+    def suggestion(self, board, row, col):
+        # Sugestão para a peça em (row, col), ou None enquanto é calculada
+        if self.thread is not None and not self.thread.is_alive():
+            self.thread = None
+            self.move_cache.add_suggestion(*self.request, self.result)
+        known, move = self.move_cache.suggestion(board, row, col)
+        if known:
+            return move
+        if self.thread is None:
+            moves = self.move_cache.legal_moves(board, row, col)
+            self.request = (board.zobrist_key, row, col)
+            self.result = None
+            self.ai.stop_requested = False
+            self.thread = threading.Thread(target=self._think, args=(board.copy(), row, col, moves), daemon=True)
+            self.thread.start()
+        return None
+
+    def _think(self, snapshot, row, col, moves):
+        self.result = self.ai.choose_best_move(snapshot, row, col, moves)
+
+    def cancel(self):
+        if self.thread is not None:
+            self.ai.stop()
+            self.thread.join()
+            self.thread = None
 
 def main():
+    # O intervalo de troca vale para o processo todo: muda só enquanto o jogo
+    # roda e volta ao valor anterior na saída
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    try:
+        game_loop()
+    finally:
+        sys.setswitchinterval(old_interval)
+
+def game_loop():
+    global SCREEN, CLOCK
+    pygame.init()
+    pygame.display.set_caption("Xadrez Completo Python")
+    SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
+    CLOCK = pygame.time.Clock()
     # Menu inicial
     while True:
         player_color, vs_ai, color_theme, assist_mode = draw_menu(SCREEN, WIDTH, HEIGHT)
@@ -20,7 +125,24 @@ def main():
             sys.exit()
 
         board = ChessBoard()
-        ai = ChessAI('b' if player_color == 'w' else 'w') if vs_ai else None
+        # Aberturas saem do livro, finais com poucas peças das tablebases e
+        # posições já analisadas (nesta ou em outras sessões) do cache em disco.
+        # Com XADREZ_SEARCH_WORKERS > 1, processos auxiliares buscam junto (Lazy SMP)
+        ai = ChessAI('b' if player_color == 'w' else 'w', time_limit=AI_MOVE_TIME, cache=default_cache(),
+                     book=default_book(), tablebase=default_tablebase(), pool=default_pool()) if vs_ai else None
+        assistant = ChessAI(player_color)
+        worker = AIWorker(ai) if ai else None
+        # Lances legais e sugestões por casa, válidos até a posição mudar
+        move_cache = MoveCache()
+        suggester = SuggestionWorker(assistant, move_cache)
+        # Desenha só as casas e camadas que mudaram a cada quadro
+        renderer = BoardRenderer(SCREEN, WIDTH, HEIGHT, color_theme)
+        # Explorador: lances jogados na posição segundo o índice de partidas
+        # (tools/explorer.py); aparece se o índice existir, tecla E liga/desliga
+        explorer = default_explorer()
+        show_explorer = explorer is not None
+        explorer_key = None
+        explorer_entries = None
         running = True
         selected = None
         possible_moves = []
@@ -35,22 +157,26 @@ def main():
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    if worker:
+                        worker.cancel()
+                    suggester.cancel()
                     pygame.quit()
                     sys.exit()
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    if worker:
+                        worker.cancel()
+                    suggester.cancel()
                     running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_e and explorer:
+                    show_explorer = not show_explorer
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     x, y = pygame.mouse.get_pos()
                     row, col = screen_to_board(x, y, WIDTH, HEIGHT)
                     if row is not None and col is not None and board.turn == player_color:
-                        # Assistente antes do clique
-                        if virtual_assist:
-                            moves = board.get_all_legal_moves_for(col, row)
-                            draw_possible_moves(SCREEN, moves, WIDTH, HEIGHT, color_theme)
                         # Seleção de peça
                         if board.piece_at(row, col) and board.piece_at(row, col).color == player_color:
                             selected = (row, col)
-                            possible_moves = board.get_legal_moves(row, col)
+                            possible_moves = move_cache.legal_moves(board, row, col)
                             dragging = True
                             drag_offset = (x - col * (WIDTH // 8), y - row * (HEIGHT // 8))
                             drag_piece = board.piece_at(row, col)
@@ -68,15 +194,6 @@ def main():
                             if board.is_game_over():
                                 winner = board.get_winner()
                                 running = False
-                            else:
-                                if vs_ai:
-                                    # Movimento IA
-                                    ai_move = ai.choose_move(board)
-                                    if ai_move:
-                                        board.push(ai_move)
-                                        if board.is_game_over():
-                                            winner = board.get_winner()
-                                            running = False
                         else:
                             dragging = False
                             drag_piece = None
@@ -85,18 +202,35 @@ def main():
                 elif event.type == pygame.MOUSEMOTION:
                     pass
 
-            SCREEN.fill((0, 0, 0))
-            draw_board(SCREEN, board, WIDTH, HEIGHT, color_theme, selected, possible_moves, dragging, drag_piece, drag_offset)
+            # Vez da IA: a busca roda em segundo plano e o lance é aplicado quando fica pronto
+            if worker and running and board.turn == ai.color:
+                if worker.idle():
+                    worker.start(board)
+                else:
+                    ai_move = worker.take_result(board)
+                    if ai_move:
+                        board.push(ai_move)
+                        if board.is_game_over():
+                            winner = board.get_winner()
+                            running = False
+
+            # Assistente virtual: lances e sugestão para a peça sob o mouse
+            hint_moves = []
+            suggestion = None
             if virtual_assist and not dragging and board.turn == player_color:
                 mousex, mousey = pygame.mouse.get_pos()
                 mrow, mcol = screen_to_board(mousex, mousey, WIDTH, HEIGHT)
                 if mrow is not None and mcol is not None and board.piece_at(mrow, mcol) and board.piece_at(mrow, mcol).color == player_color:
-                    moves = board.get_legal_moves(mrow, mcol)
-                    draw_possible_moves(SCREEN, moves, WIDTH, HEIGHT, color_theme)
-                    suggestion = ChessAI(player_color).choose_best_move(board, mrow, mcol)
-                    if suggestion:
-                        draw_suggestion(SCREEN, suggestion, WIDTH, HEIGHT)
-            pygame.display.flip()
+                    hint_moves = move_cache.legal_moves(board, mrow, mcol)
+                    suggestion = suggester.suggestion(board, mrow, mcol)
+            # Consulta ao índice só quando a posição muda
+            if show_explorer and explorer_key != board.zobrist_key:
+                explorer_key = board.zobrist_key
+                explorer_entries = [(board.san(move), *counts) for move, *counts in explorer.moves(board)]
+            rects = renderer.render(board, selected, possible_moves, dragging, drag_piece, drag_offset,
+                                    hint_moves, suggestion, worker is not None and worker.thinking(),
+                                    explorer_entries if show_explorer else None)
+            pygame.display.update(rects)
             CLOCK.tick(FPS)
 
         # Tela final
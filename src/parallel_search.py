@@ -0,0 +1,233 @@
+# Lazy SMP: helper processes search the same root position as ChessAI and
+# share its transposition table, so each one finds the others' results in
+# the table and the search as a whole goes deeper in the same time. Threads
+# would not help here: the search is pure Python and holds the GIL.
+#
+# The table lives in a multiprocessing.shared_memory block and is written
+# without locks. An entry is two 64-bit words, key ^ data and data; a probe
+# recomputes the key from both words, so an entry torn by two processes
+# writing at once no longer matches its key and is dropped as a miss.
+# data is packed like chess_logic.TranspositionTable's (tt_pack).
+#
+# Header words: the generation of the current search, the id of the search
+# being dispatched and the id of the last search told to stop. Only the
+# caller's searcher ends a search: helpers have no clock of their own and
+# keep filling the table until it sets the stop word, then report.
+import atexit
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import time
+from multiprocessing import shared_memory
+
+from chess_logic import ChessAI, SearchAborted, tt_pack, tt_unpack
+
+HEADER_WORDS = 8
+GENERATION, SEARCH_ID, STOP = 0, 1, 2
+# Opt-in: no helpers unless XADREZ_SEARCH_WORKERS asks for them (0 = one
+# per core). The pool has not shown a gain over a single searcher yet.
+WORKERS = int(os.environ.get('XADREZ_SEARCH_WORKERS', 1)) or os.cpu_count() or 1
+# Seconds collect() waits for the helpers' reports after the stop
+COLLECT_TIMEOUT = 2.0
+# A helper gives up on its own this long after the caller's time limit, in
+# case the stop never comes
+HELPER_MARGIN = 1.0
+
+class SharedTranspositionTable:
+    # Same interface as chess_logic.TranspositionTable. Pass name to attach
+    # to a table another process created.
+    def __init__(self, size_bits=20, name=None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=8 * (HEADER_WORDS + 2 * (1 << size_bits)))
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        self.words = self.shm.buf.cast('Q')
+        self.size = (len(self.words) - HEADER_WORDS) // 2
+        self.mask = self.size - 1
+        self.generation = self.words[GENERATION]
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def clear(self):
+        words = self.words
+        for i in range(HEADER_WORDS, len(words)):
+            words[i] = 0
+
+    def new_search(self):
+        # The generation is advanced by SearchPool.start for every searcher
+        self.generation = self.words[GENERATION]
+
+    def probe(self, key):
+        # Returns (depth, score, bound, move) or None
+        index = HEADER_WORDS + 2 * (key & self.mask)
+        data = self.words[index + 1]
+        if data and self.words[index] ^ data == key:
+            self.hits += 1
+            return tt_unpack(data)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, bound, move=None):
+        words = self.words
+        index = HEADER_WORDS + 2 * (key & self.mask)
+        old = words[index + 1]
+        if old:
+            if words[index] ^ old != key:
+                if old >> 58 == self.generation and old >> 32 & 0xFF > depth:
+                    self.collisions += 1
+                    return
+            elif move is None:
+                # Same position: keep the best move we already had
+                move = old >> 42 & 0xFFFF
+        data = tt_pack(depth, score, bound, move, self.generation)
+        words[index] = key ^ data
+        words[index + 1] = data
+        self.stores += 1
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self):
+        used = sum(1 for i in range(self.size) if self.words[HEADER_WORDS + 2*i + 1])
+        return {'size': self.size, 'used': used, 'hits': self.hits, 'misses': self.misses,
+                'stores': self.stores, 'collisions': self.collisions, 'hit_rate': self.hit_rate()}
+
+    def close(self):
+        self.words.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class _HelperAI(ChessAI):
+    # Helpers with an odd index search one ply deeper per iteration, so the
+    # searchers spread over two depths and fill the table for each other
+    def __init__(self, table, index, tablebase):
+        super().__init__('w', tablebase=tablebase)
+        self.tt = table
+        self.offset = index % 2
+        self.search_id = 0
+        self.backstop = None
+
+    def _search_root(self, board, moves, depth, previous_best):
+        return super()._search_root(board, moves, depth + self.offset, previous_best)
+
+    def _check_limits(self):
+        if self.tt.words[STOP] == self.search_id:
+            raise SearchAborted()
+        if self.backstop and time.perf_counter() > self.backstop:
+            raise SearchAborted()
+        super()._check_limits()
+
+def _helper(name, index, tasks, results):
+    from tablebase import default_tablebase
+    # Forked after pygame.init, which turns SIGTERM into a window event;
+    # terminate() at exit has to kill the helper
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    table = SharedTranspositionTable(name=name)
+    ai = _HelperAI(table, index, default_tablebase())
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        search_id, position, time_limit, max_depth = task
+        board = pickle.loads(position)
+        ai.search_id = search_id
+        # No clock or node limit of its own: only the stop word (or the
+        # backstop past the caller's clock) ends the search
+        ai.backstop = time.perf_counter() + time_limit + HELPER_MARGIN if time_limit else None
+        move, score = ai.search(board, time_limit=0, max_depth=max(1, max_depth - ai.offset), node_limit=0)
+        depth = ai.depth_reached + ai.offset if ai.depth_reached else 0
+        results.put((search_id, index, depth, move.uci() if move else None, score, ai.nodes))
+    table.close()
+
+class SearchPool:
+    # workers - 1 helper processes; the ChessAI given the pool is the last
+    # searcher. start() hands them the root, stop() ends their search and
+    # collect() returns the deepest result.
+    def __init__(self, workers=WORKERS, size_bits=20):
+        self.table = SharedTranspositionTable(size_bits)
+        self.results = multiprocessing.Queue()
+        # (index, process, task queue) per live helper
+        self.helpers = []
+        self.search_id = 0
+        self.nodes = 0
+        for index in range(1, workers):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_helper, args=(self.table.name, index, tasks, self.results),
+                                              daemon=True)
+            process.start()
+            self.helpers.append((index, process, tasks))
+
+    @property
+    def workers(self):
+        return len(self.helpers) + 1
+
+    def start(self, board, time_limit, max_depth):
+        words = self.table.words
+        words[GENERATION] = (words[GENERATION] + 1) & 63
+        self.search_id += 1
+        words[SEARCH_ID] = self.search_id
+        # Pickled now: the queue sends from a background thread while the
+        # caller is already searching (and changing) the board
+        position = pickle.dumps(board)
+        for _, _, tasks in self.helpers:
+            tasks.put((self.search_id, position, time_limit, max_depth))
+
+    def stop(self):
+        self.table.words[STOP] = self.search_id
+
+    def collect(self, board, move, score, depth):
+        # (move, score, depth) of the deepest search, the caller's on a tie.
+        # A helper that died or does not report within COLLECT_TIMEOUT is
+        # left out, so the caller's own result is always there to fall back on.
+        self.stop()
+        best = (depth, 1, move, score)
+        self.nodes = 0
+        pending = {index for index, _, _ in self.helpers}
+        deadline = time.perf_counter() + COLLECT_TIMEOUT
+        while pending and time.perf_counter() < deadline:
+            try:
+                search_id, index, depth, uci, score, nodes = self.results.get(timeout=0.1)
+            except queue.Empty:
+                for helper in list(self.helpers):
+                    if not helper[1].is_alive():
+                        self.helpers.remove(helper)
+                        pending.discard(helper[0])
+                continue
+            if search_id != self.search_id:
+                continue  # left over from a search that timed out
+            pending.discard(index)
+            self.nodes += nodes
+            found = board.parse_uci(uci) if uci else None
+            if found is not None and (depth, 0) > best[:2]:
+                best = (depth, 0, found, score)
+        return best[2], best[3], best[0]
+
+    def close(self):
+        for _, _, tasks in self.helpers:
+            tasks.put(None)
+        for _, process, _ in self.helpers:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        self.helpers = []
+        self.table.close()
+
+_default_pool = None
+
+def default_pool():
+    # Pool with WORKERS searchers, or None unless XADREZ_SEARCH_WORKERS asks
+    # for more than one
+    global _default_pool
+    if _default_pool is None and WORKERS > 1:
+        _default_pool = SearchPool()
+        atexit.register(_default_pool.close)
+    return _default_pool
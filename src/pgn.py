@@ -0,0 +1,173 @@
+# Streaming PGN and FEN input/output for ChessBoard.
+#
+# read_games yields (headers, SAN moves, result) per game, one line at a
+# time, so large files are never loaded whole. Comments, variations, NAGs
+# and move numbers are skipped. read_moves and read_positions resolve the
+# SAN on ChessBoard (from the FEN tag when a game has one); format_game
+# writes a game back. For several processes, split_pgn cuts a file into
+# byte ranges at game starts and read_range streams the lines of one, so
+# each worker reads its own part of the file:
+#   for start, end in split_pgn(path):
+#       ... read_moves(read_range(path, start, end)) in a worker
+import os
+import re
+
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+ESCAPE_PATTERN = re.compile(r'\\(["\\])')
+TOKEN_PATTERN = re.compile(r'\{[^}]*\}?|;.*|\$\d+|\(|\)|\d+\.+|[^\s{}();]+')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+def read_games(stream):
+    headers, moves, depth, in_comment = {}, [], 0, False
+    for line in stream:
+        line = line.strip()
+        if in_comment:
+            # Inside a {...} comment that spans lines
+            if '}' not in line:
+                continue
+            line = line[line.index('}') + 1:]
+            in_comment = False
+        tag = TAG_PATTERN.match(line)
+        if tag:
+            if moves:
+                yield headers, moves, headers.get('Result', '*')
+                headers, moves = {}, []
+            headers[tag.group(1)] = ESCAPE_PATTERN.sub(r'\1', tag.group(2))
+            continue
+        for token in TOKEN_PATTERN.findall(line):
+            if token.startswith('{'):
+                in_comment = not token.endswith('}')
+            elif token == '(':
+                depth += 1
+            elif token == ')':
+                depth = max(0, depth - 1)
+            elif depth or token[0] in ';$' or token[0].isdigit() and token.endswith('.'):
+                continue
+            elif token in RESULTS:
+                headers.setdefault('Result', token)
+                yield headers, moves, headers['Result']
+                headers, moves, depth = {}, [], 0
+            else:
+                moves.append(token)
+    if moves:
+        yield headers, moves, headers.get('Result', '*')
+
+def game_board(headers):
+    # Starting position of a game: its FEN tag, else the initial position
+    from chess_logic import ChessBoard
+    return ChessBoard(headers['FEN']) if 'FEN' in headers else ChessBoard()
+
+def read_moves(stream):
+    # (headers, Move list, result) per game; a game ends at its first
+    # illegal or unreadable move
+    for headers, sans, result in read_games(stream):
+        board = game_board(headers)
+        moves = []
+        for san in sans:
+            move = board.parse_san(san)
+            if move is None:
+                break
+            moves.append(move)
+            board.push(move)
+        yield headers, moves, result
+
+def read_positions(stream):
+    # (headers, board, move, result) before every move of every game. The
+    # board is the game's own and is pushed after the yield: copy it to keep it.
+    for headers, sans, result in read_games(stream):
+        board = game_board(headers)
+        for san in sans:
+            move = board.parse_san(san)
+            if move is None:
+                break
+            yield headers, board, move, result
+            board.push(move)
+
+def read_fens(stream):
+    # One board per FEN line (blank lines and '#' comments skipped); the
+    # same board is loaded again for every line
+    from chess_logic import ChessBoard
+    board = ChessBoard()
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            board.set_fen(line)
+            yield board
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+def format_game(headers, sans, result):
+    # PGN text of a game: headers as (tag, value) pairs or a dict, movetext
+    # wrapped at 80 columns. A game from a FEN (odd ply first) needs its
+    # FEN and SetUp tags in headers.
+    if isinstance(headers, dict):
+        headers = headers.items()
+    headers = list(headers)
+    lines = [f'[{tag} "{escape(str(value))}"]' for tag, value in headers]
+    fen = dict(headers).get('FEN')
+    number, black = 1, False
+    if fen:
+        fields = fen.split()
+        black = fields[1] == 'b'
+        number = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for ply, san in enumerate(sans):
+        if not black:
+            tokens.append(f"{number}.")
+        elif ply == 0:
+            tokens.append(f"{number}...")
+        tokens.append(san)
+        if black:
+            number += 1
+        black = not black
+    tokens.append(result)
+    line = ''
+    text = []
+    for token in tokens:
+        if len(line) + len(token) + 1 > 80:
+            text.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    text.append(line)
+    return '\n'.join(lines) + '\n\n' + '\n'.join(text) + '\n\n'
+
+CHUNK_BYTES = 1 << 22
+
+def split_pgn(path, chunk_bytes=CHUNK_BYTES):
+    # (start, end) byte ranges of about chunk_bytes covering the file, each
+    # cut where a game starts: a tag line right after a blank line
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            end = start + chunk_bytes
+            if end < size:
+                f.seek(end)
+                f.readline()  # rest of the line the cut fell in
+                blank = False
+                while True:
+                    end = f.tell()
+                    line = f.readline()
+                    if not line:
+                        end = size
+                        break
+                    if blank and line.startswith(b'['):
+                        break
+                    blank = not line.strip()
+            ranges.append((start, min(end, size)))
+            start = end
+    return ranges
+
+def read_range(path, start, end):
+    # Lines (str) of path from byte start to byte end, as ranges from split_pgn
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while start < end:
+            line = f.readline()
+            if not line:
+                break
+            start += len(line)
+            yield line.decode('utf-8', 'replace')
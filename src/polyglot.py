@@ -0,0 +1,183 @@
+# Polyglot opening books (.bin): 16-byte big-endian entries (key, move,
+# weight, learn) sorted by key. OpeningBook memory-maps the file and
+# binary-searches it, so a lookup reads a handful of entries and never the
+# whole book. Keys are Polyglot Zobrist hashes: ChessBoard.zobrist_key,
+# chess.polyglot.zobrist_hash or grid_key() for app.py's string boards.
+import mmap
+import os
+import random
+import struct
+
+from zobrist import POLYGLOT_RANDOM
+
+ENTRY = struct.Struct('>QHHI')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATH = os.environ.get('XADREZ_BOOK', os.path.join(ROOT, 'assets', 'book.bin'))
+
+# Moves in 16 bits: to file, to rank, from file, from rank (3 bits each,
+# rank 0 = rank 1), then the promotion. Castling is stored as king takes
+# own rook (e1h1, e1a1, e8h8, e8a8).
+PROMOTION_CODES = ' nbrq'
+CASTLING_UCI = {'e1h1': 'e1g1', 'e1a1': 'e1c1', 'e8h8': 'e8g8', 'e8a8': 'e8c8'}
+KING_TAKES_ROOK = {v: k for k, v in CASTLING_UCI.items()}
+
+def encode_move(uci):
+    if not uci:
+        return 0
+    files = 'abcdefgh'
+    code = (files.index(uci[2]) | (int(uci[3]) - 1) << 3
+            | files.index(uci[0]) << 6 | (int(uci[1]) - 1) << 9)
+    if len(uci) > 4:
+        code |= PROMOTION_CODES.index(uci[4]) << 12
+    return code
+
+def decode_move(code):
+    if not code:
+        return None
+    files = 'abcdefgh'
+    uci = (files[code >> 6 & 7] + str((code >> 9 & 7) + 1)
+           + files[code & 7] + str((code >> 3 & 7) + 1))
+    promotion = code >> 12 & 7
+    return uci + PROMOTION_CODES[promotion] if promotion else uci
+
+def grid_key(grid, white_turn, castling, en_passant):
+    # Polyglot key for app.py's board: grid[row][col] like 'wP' or '' (row 0 =
+    # rank 8), castling like 'KQkq', en_passant the target (row, col) or None
+    key = 0
+    for row in range(8):
+        for col in range(8):
+            piece = grid[row][col]
+            if piece:
+                kind = 'PNBRQK'.index(piece[1])
+                key ^= POLYGLOT_RANDOM[64*(2*kind + (piece[0] == 'w')) + 8*(7 - row) + col]
+    # Rights only count with king and rook still at home
+    for i, (flag, row, rook_col, color) in enumerate((('K', 7, 7, 'w'), ('Q', 7, 0, 'w'),
+                                                     ('k', 0, 7, 'b'), ('q', 0, 0, 'b'))):
+        if flag in castling and grid[row][4] == color + 'K' and grid[row][rook_col] == color + 'R':
+            key ^= POLYGLOT_RANDOM[768 + i]
+    if en_passant:
+        # Only when a pawn of the side to move can capture there
+        row, col = en_passant
+        pawn_row, pawn = (row + 1, 'wP') if white_turn else (row - 1, 'bP')
+        if any(0 <= c < 8 and grid[pawn_row][c] == pawn for c in (col - 1, col + 1)):
+            key ^= POLYGLOT_RANDOM[772 + col]
+    if white_turn:
+        key ^= POLYGLOT_RANDOM[780]
+    return key
+
+class OpeningBook:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // ENTRY.size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def _first(self, key):
+        # Index of the first entry with this key or a greater one
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ENTRY.unpack_from(self.map, mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def moves(self, key):
+        # [(uci, weight)] for the position, as stored (castling is king takes rook)
+        found = []
+        i = self._first(key) if self.count else 0
+        while i < self.count:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.map, i * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((decode_move(move), weight))
+            i += 1
+        return found
+
+    def choose(self, key, legal, mode='weighted', rng=random):
+        # Book move for the position, or None. legal(uci) returns the matching
+        # legal move or None; a king-takes-rook move falls back to castling.
+        # mode: 'weighted' (random in proportion to weight) or 'best'.
+        candidates = []
+        for uci, weight in self.moves(key):
+            move = legal(uci)
+            if move is None and uci in CASTLING_UCI:
+                move = legal(CASTLING_UCI[uci])
+            if move is not None and weight:
+                candidates.append((move, weight))
+        if not candidates:
+            return None
+        if mode == 'best':
+            return max(candidates, key=lambda c: c[1])[0]
+        return rng.choices([c[0] for c in candidates], [c[1] for c in candidates])[0]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+_default_book = None
+
+def default_book():
+    # Book at DEFAULT_PATH, or None if there is none
+    global _default_book
+    if _default_book is None:
+        try:
+            _default_book = OpeningBook()
+        except OSError:
+            _default_book = False
+    return _default_book or None
+
+def book_stats(games, max_ply=20):
+    # {(key, move): [points, count]} from (headers, SAN moves, result) games,
+    # e.g. pgn.read_games. A move scores 2 per win and 1 per draw for the
+    # side that played it. Games from a FEN tag start from that position.
+    from pgn import game_board
+    stats = {}
+    for headers, moves, result in games:
+        board = game_board(headers)
+        for san in moves[:max_ply]:
+            move = board.parse_san(san)
+            if move is None:
+                break
+            uci = move.uci()
+            if move.is_castling:
+                uci = KING_TAKES_ROOK.get(uci, uci)
+            white = board.turn == 'w'
+            points = {'1-0': 2 if white else 0, '0-1': 0 if white else 2, '1/2-1/2': 1}.get(result, 0)
+            entry = stats.setdefault((board.zobrist_key, encode_move(uci)), [0, 0])
+            entry[0] += points
+            entry[1] += 1
+            board.push(move)
+    return stats
+
+def merge_stats(stats, other):
+    # Adds the book_stats of another part of the games into stats
+    for key, (points, count) in other.items():
+        entry = stats.setdefault(key, [0, 0])
+        entry[0] += points
+        entry[1] += count
+    return stats
+
+def build_book(games, max_ply=20, min_count=1):
+    # Book entries from (headers, SAN moves, result) games
+    return book_entries(book_stats(games, max_ply), min_count)
+
+def book_entries(stats, min_count=1):
+    # Sorted (key, move, weight) entries from book_stats
+    entries = [(key, move, points) for (key, move), (points, count) in stats.items()
+               if points and count >= min_count]
+    # Weights are 16 bits: scale down if the most played move does not fit
+    top = max((points for _, _, points in entries), default=0)
+    if top > 0xFFFF:
+        entries = [(key, move, max(1, points * 0xFFFF // top)) for key, move, points in entries]
+    entries.sort(key=lambda e: (e[0], -e[2]))
+    return entries
+
+def write_book(path, entries):
+    with open(path, 'wb') as f:
+        for key, move, weight in entries:
+            f.write(ENTRY.pack(key, move, weight, 0))
@@ -0,0 +1,173 @@
+# Endgame tablebases: distance to mate for every position with few pieces
+# (up to 4 with the default build), generated offline by tools/build_tablebases.py
+# with retrograde analysis and probed here without NumPy.
+#
+# One file per material balance, named like KQKR.xtb. The stronger side is
+# always stored as white; the other colouring is probed by flipping the
+# board. A position's index is built from
+#   side to move, then one square per piece in table order: white king,
+#   other white pieces in QRBNP order, black king, other black pieces.
+# Squares are row*8 + col as in ChessBoard. The white king is kept on files
+# a-d (the whole board is mirrored otherwise), so its digit has 32 values.
+# Values are signed (1 or 2 bytes): 0 draw, d+1 when the side to move mates
+# in d plies, -(d+1) when it is mated in d plies, the minimum for illegal.
+# The values are stored in zlib-compressed blocks after a block offset table.
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b'XTB1'
+# magic, table name, pieces, value width, block size, value count, block count
+HEADER = struct.Struct('<4s8sBB2xIQI')
+BLOCK_SIZE = 1 << 16
+ORDER = 'KQRBNP'
+ILLEGAL = {1: -128, 2: -32768}
+EXTENSION = '.xtb'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DIR = os.environ.get('XADREZ_TABLEBASES', os.path.join(ROOT, 'tablebases'))
+
+def sort_kinds(kinds):
+    return ''.join(sorted(kinds, key=ORDER.index))
+
+def _strength(kinds):
+    return (len(kinds), [-ORDER.index(k) for k in kinds])
+
+def canonical(white, black):
+    # (table name, flipped): flipped when black is the stronger side
+    white, black = sort_kinds(white), sort_kinds(black)
+    if _strength(black) > _strength(white):
+        return black + white, True
+    return white + black, False
+
+def split_name(name):
+    # 'KQKR' -> ('KQ', 'KR')
+    second = name.index('K', 1)
+    return name[:second], name[second:]
+
+def table_size(pieces):
+    return 2 * 32 * 64 ** (pieces - 1)
+
+def position_index(stm, squares):
+    # stm 0 white / 1 black; squares in table order, white king on files a-d
+    index = stm * 32 + (squares[0] >> 3) * 4 + (squares[0] & 7)
+    for sq in squares[1:]:
+        index = index * 64 + sq
+    return index
+
+def decode_value(value):
+    # (wdl, plies) from the side to move: wdl 1 win, 0 draw, -1 loss
+    if value > 0:
+        return 1, value - 1
+    if value < 0:
+        return -1, -value - 1
+    return 0, 0
+
+class Table:
+    def __init__(self, path, cache_blocks=64):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, name, self.pieces, self.width, self.block_size, self.count, self.blocks = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a tablebase file")
+        self.name = name.rstrip(b'\0').decode()
+        self.illegal = ILLEGAL[self.width]
+        self.cache = {}
+        self.cache_blocks = cache_blocks
+
+    def _block(self, block):
+        data = self.cache.get(block)
+        if data is None:
+            start, end = struct.unpack_from('<QQ', self.map, HEADER.size + 8 * block)
+            data = zlib.decompress(self.map[start:end])
+            if len(self.cache) >= self.cache_blocks:
+                del self.cache[next(iter(self.cache))]
+            self.cache[block] = data
+        return data
+
+    def value(self, index):
+        # Raw value at index (see the header comment), or None if illegal
+        data = self._block(index // self.block_size)
+        offset = index % self.block_size
+        if self.width == 1:
+            value = data[offset]
+            value = value - 256 if value > 127 else value
+        else:
+            value = struct.unpack_from('<h', data, 2 * offset)[0]
+        return None if value == self.illegal else value
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+class Tablebase:
+    # probe(board) -> (wdl, plies) for the side to move, or None when the
+    # position is not covered (too many pieces, castling rights, en passant)
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.paths = {}
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if filename.endswith(EXTENSION):
+                    self.paths[filename[:-len(EXTENSION)]] = os.path.join(directory, filename)
+        self.tables = {}
+        self.max_pieces = max((len(name) for name in self.paths), default=0)
+        self.hits = 0
+
+    def _table(self, name):
+        table = self.tables.get(name)
+        if table is None and name in self.paths:
+            table = self.tables[name] = Table(self.paths[name])
+        return table
+
+    def probe_pieces(self, pieces, stm):
+        # pieces: [(color, kind, square)] with color 0 white / 1 black,
+        # kind in 'KQRBNP', square row*8 + col; stm 0 white / 1 black
+        white = ''.join(kind for color, kind, _ in pieces if color == 0)
+        black = ''.join(kind for color, kind, _ in pieces if color == 1)
+        name, flipped = canonical(white, black)
+        table = self._table(name)
+        if table is None:
+            return None
+        if flipped:
+            pieces = [(1 - color, kind, sq ^ 56) for color, kind, sq in pieces]
+            stm = 1 - stm
+        ordered = sorted(pieces, key=lambda p: (p[0], ORDER.index(p[1])))
+        squares = [sq for _, _, sq in ordered]
+        if squares[0] & 7 > 3:
+            squares = [sq ^ 7 for sq in squares]
+        value = table.value(position_index(stm, squares))
+        if value is None:
+            return None
+        self.hits += 1
+        return decode_value(value)
+
+    def probe(self, board):
+        # The tables know neither castling nor en passant; a double push that
+        # left no legal capture is the same position as without it
+        if board.castling or board.can_capture_en_passant():
+            return None
+        pieces = []
+        for code, bits in enumerate(board.pieces):
+            while bits:
+                low = bits & -bits
+                pieces.append((code // 6, 'PNBRQK'[code % 6], low.bit_length() - 1))
+                bits ^= low
+        if len(pieces) > self.max_pieces:
+            return None
+        return self.probe_pieces(pieces, 0 if board.turn == 'w' else 1)
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+_default_tablebase = None
+
+def default_tablebase():
+    # Tables in DEFAULT_DIR, or None if there are none
+    global _default_tablebase
+    if _default_tablebase is None:
+        _default_tablebase = Tablebase()
+    return _default_tablebase if _default_tablebase.paths else None
@@ -0,0 +1,128 @@
+# Training data for move / result prediction models (numpy, tensorflow,
+# scikit-learn), one record per position:
+#   planes  uint8[17, 8, 8]  12 piece planes (white PNBRQK, black pnbrqk),
+#                            side to move (all ones for white), castling
+#                            rights K, Q, k, q (all ones when available)
+#   mask    uint8[512]       legal moves as from*64 + to bits (np.packbits);
+#                            promotions share their pawn move's bit
+#   move    int16            move played, from*64 + to
+#   result  int8             game result for the side to move: 1, 0 or -1
+# Squares are row*8 + col as in ChessBoard (row 0 = rank 8).
+#
+# ChunkWriter streams records into .npy memmaps of up to CHUNK_SIZE
+# positions per array, so an export never holds more than the record being
+# written in memory; read them back with load_chunks.
+import glob
+import os
+
+import numpy as np
+
+from chess_logic import WK_CASTLE, WQ_CASTLE, BK_CASTLE, BQ_CASTLE
+
+PLANES = 17
+MASK_BYTES = 64 * 64 // 8
+CHUNK_SIZE = 1 << 16
+ARRAYS = {
+    'planes': (np.uint8, (PLANES, 8, 8)),
+    'mask': (np.uint8, (MASK_BYTES,)),
+    'move': (np.int16, ()),
+    'result': (np.int8, ()),
+}
+CASTLING_PLANES = [(WK_CASTLE, 13), (WQ_CASTLE, 14), (BK_CASTLE, 15), (BQ_CASTLE, 16)]
+RESULTS = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
+
+def encode_planes(board, out):
+    # Fills out (uint8[17, 8, 8], zeroed) with the position
+    bits = np.array(board.pieces, dtype='<u8').view(np.uint8)
+    out[:12] = np.unpackbits(bits, bitorder='little').reshape(12, 8, 8)
+    if board.turn == 'w':
+        out[12] = 1
+    for flag, plane in CASTLING_PLANES:
+        if board.castling & flag:
+            out[plane] = 1
+
+def encode_mask(board, out):
+    # Fills out (uint8[512]) with the legal move bits
+    flags = np.zeros(64 * 64, dtype=np.uint8)
+    codes = np.frombuffer(board.move_codes(), dtype=np.uint16)
+    flags[(codes & 63) * 64 + (codes >> 6 & 63)] = 1
+    out[:] = np.packbits(flags)
+
+def move_index(move):
+    # from*64 + to of a Move or move code
+    return (move & 63) * 64 + (move >> 6 & 63)
+
+def game_positions(board, moves, result):
+    # (board, move, result for the side to move) before each move of a
+    # game; moves are Move objects or SAN strings, result like '1-0'
+    score = RESULTS[result]
+    for move in moves:
+        if isinstance(move, str):
+            move = board.parse_san(move)
+            if move is None:
+                return
+        yield board, move, score if board.turn == 'w' else -score
+        board.push(move)
+
+class ChunkWriter:
+    # Appends records to <directory>/<prefix>-NNNNN-<array>.npy, starting a
+    # new chunk every CHUNK_SIZE positions. close() trims the last chunk.
+    def __init__(self, directory, prefix, chunk_size=CHUNK_SIZE):
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.chunk = 0
+        self.arrays = None
+        self.used = 0
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, chunk, name):
+        return os.path.join(self.directory, f"{self.prefix}-{chunk:05d}-{name}.npy")
+
+    def _open(self):
+        self.arrays = {name: np.lib.format.open_memmap(self._path(self.chunk, name), mode='w+', dtype=dtype,
+                                                       shape=(self.chunk_size,) + shape)
+                       for name, (dtype, shape) in ARRAYS.items()}
+        self.used = 0
+
+    def _finish(self):
+        # Flush the chunk; a partly filled one is rewritten at its real length
+        arrays, self.arrays = self.arrays, None
+        for name in list(arrays):
+            array = arrays.pop(name)
+            if self.used < self.chunk_size:
+                path = self._path(self.chunk, name)
+                trimmed = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=array.dtype,
+                                                    shape=(self.used,) + array.shape[1:])
+                trimmed[:] = array[:self.used]
+                trimmed.flush()
+                # Both maps closed before the swap (Windows refuses otherwise)
+                del trimmed, array
+                os.replace(path + '.tmp', path)
+            else:
+                array.flush()
+        self.chunk += 1
+
+    def add(self, board, move, result):
+        if self.arrays is None:
+            self._open()
+        i = self.used
+        encode_planes(board, self.arrays['planes'][i])
+        encode_mask(board, self.arrays['mask'][i])
+        self.arrays['move'][i] = move_index(move)
+        self.arrays['result'][i] = result
+        self.used += 1
+        self.count += 1
+        if self.used == self.chunk_size:
+            self._finish()
+
+    def close(self):
+        if self.arrays is not None:
+            self._finish()
+
+def load_chunks(directory):
+    # {array name: memmap} per chunk, in file name order
+    for path in sorted(glob.glob(os.path.join(directory, '*-planes.npy'))):
+        base = path[:-len('planes.npy')]
+        yield {name: np.load(base + name + '.npy', mmap_mode='r') for name in ARRAYS}
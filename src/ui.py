@@ -1,6 +1,7 @@
 import pygame
 import os
-from chess_logic import piece_icons
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 COLOR_THEMES = [
     ((238,238,210),(118,150,86)),  # padrão
@@ -10,59 +11,101 @@ COLOR_THEMES = [
     ((200,230,255),(60,180,240)),  # azul
 ]
 
-def draw_board(screen, board, w, h, color_theme, selected, possible_moves, dragging, drag_piece, drag_offset):
+# Ícones das peças, carregados no primeiro desenho (a janela já existe)
+piece_icons = {}
+
+def load_piece_icons():
+    for color in ['w', 'b']:
+        for p in "KQRBNP":
+            img = pygame.image.load(os.path.join(ROOT, 'assets', f'{color}{p}.png')).convert_alpha()
+            piece_icons[f'{color}{p}'] = pygame.transform.smoothscale(img, (80, 80))
+
+# Ícones já escalados para o tamanho da casa; o cache só é refeito quando o tamanho muda
+_sprite_cache = {}
+_sprite_size = None
+_font_cache = {}
+
+def get_sprite(name, size):
+    global _sprite_size
+    if size != _sprite_size:
+        _sprite_cache.clear()
+        _sprite_size = size
+    sprite = _sprite_cache.get(name)
+    if sprite is None:
+        if not piece_icons:
+            load_piece_icons()
+        sprite = _sprite_cache[name] = pygame.transform.smoothscale(piece_icons[name], (size, size))
+    return sprite
+
+def get_font(size, bold=False):
+    font = _font_cache.get((size, bold))
+    if font is None:
+        font = _font_cache[(size, bold)] = pygame.font.SysFont("Arial", size, bold)
+    return font
+
+def board_geometry(w, h):
+    # Tamanho do tabuleiro, da casa e deslocamento para centralizar
     size = min(w, h)
-    sq = size//8
-    offx = (w-size)//2
-    offy = (h-size)//2
+    return size, size//8, (w-size)//2, (h-size)//2
+
+def draw_square(screen, board, row, col, w, h, color_theme, selected=None, hidden=None, dot=False):
+    # Uma casa completa: cor, destaque de seleção, peça e marcador de lance possível
+    size, sq, offx, offy = board_geometry(w, h)
     light, dark = COLOR_THEMES[color_theme]
-    font = pygame.font.SysFont("Arial", sq//5, True)
-    # Draw squares
-    for row in range(8):
-        for col in range(8):
-            rect = pygame.Rect(offx+col*sq, offy+row*sq, sq, sq)
-            color = light if (row+col)%2==0 else dark
-            pygame.draw.rect(screen, color, rect)
-            # Highlight selection
-            if selected == (row, col):
-                pygame.draw.rect(screen, (255,255,0,128), rect, 4)
-            # Draw possible moves
-    # Draw pieces
+    rect = pygame.Rect(offx+col*sq, offy+row*sq, sq, sq)
+    pygame.draw.rect(screen, light if (row+col)%2==0 else dark, rect)
+    # Highlight selection
+    if selected == (row, col):
+        pygame.draw.rect(screen, (255,255,0,128), rect, 4)
+    p = board.piece_at(row, col)
+    if p and (row, col) != hidden:
+        screen.blit(get_sprite(f"{p.color}{p.kind}", sq), rect.topleft)
+    if dot:
+        pygame.draw.circle(screen, (0,255,0,180), rect.center, sq//5)
+    return rect
+
+def draw_labels(screen, w, h):
+    # Row numbers (1-8) and col letters (a-h)
+    size, sq, offx, offy = board_geometry(w, h)
+    font = get_font(sq//5, True)
+    rects = []
+    for i in range(8):
+        label = font.render(str(8-i), True, (0,0,0))
+        rects.append(screen.blit(label, (offx-18, offy+i*sq+sq//2-10)))
+        label = font.render(chr(ord('a')+i), True, (0,0,0))
+        rects.append(screen.blit(label, (offx+i*sq+sq//2-8, offy+size+2)))
+    return rects
+
+def draw_board(screen, board, w, h, color_theme, selected, possible_moves, dragging, drag_piece, drag_offset):
+    size, sq, offx, offy = board_geometry(w, h)
+    hidden = selected if dragging else None
     for row in range(8):
         for col in range(8):
-            p = board.piece_at(row, col)
-            if p and (not dragging or (row,col) != selected):
-                icon = piece_icons[f"{p.color}{p.kind}"]
-                screen.blit(pygame.transform.smoothscale(icon, (sq, sq)), (offx+col*sq, offy+row*sq))
+            draw_square(screen, board, row, col, w, h, color_theme, selected, hidden)
     # Draw dragging piece
     if dragging and drag_piece:
         x, y = pygame.mouse.get_pos()
-        icon = piece_icons[f"{drag_piece.color}{drag_piece.kind}"]
-        screen.blit(pygame.transform.smoothscale(icon, (sq, sq)), (x-drag_offset[0], y-drag_offset[1]))
-    # Draw row/col numbers
-    for i in range(8):
-        # Row numbers (1-8)
-        label = font.render(str(8-i), True, (0,0,0))
-        screen.blit(label, (offx-18, offy+i*sq+sq//2-10))
-        # Col letters (a-h)
-        label = font.render(chr(ord('a')+i), True, (0,0,0))
-        screen.blit(label, (offx+i*sq+sq//2-8, offy+size+2))
+        screen.blit(get_sprite(f"{drag_piece.color}{drag_piece.kind}", sq), (x-drag_offset[0], y-drag_offset[1]))
+    draw_labels(screen, w, h)
 
 def draw_possible_moves(screen, moves, w, h, color_theme):
-    size = min(w, h)
-    sq = size//8
-    offx = (w-size)//2
-    offy = (h-size)//2
+    size, sq, offx, offy = board_geometry(w, h)
     for m in moves:
         x = offx + m.to_col*sq + sq//2
         y = offy + m.to_row*sq + sq//2
         pygame.draw.circle(screen, (0,255,0,180), (x, y), sq//5)
 
+def suggestion_rect(move, w, h):
+    size, sq, offx, offy = board_geometry(w, h)
+    fx = offx + move.from_col*sq + sq//2
+    fy = offy + move.from_row*sq + sq//2
+    tx = offx + move.to_col*sq + sq//2
+    ty = offy + move.to_row*sq + sq//2
+    pad = max(8, sq//8 + 2)
+    return pygame.Rect(min(fx, tx) - pad, min(fy, ty) - pad, abs(tx-fx) + 2*pad, abs(ty-fy) + 2*pad)
+
 def draw_suggestion(screen, move, w, h):
-    size = min(w, h)
-    sq = size//8
-    offx = (w-size)//2
-    offy = (h-size)//2
+    size, sq, offx, offy = board_geometry(w, h)
     fx = offx + move.from_col*sq + sq//2
     fy = offy + move.from_row*sq + sq//2
     tx = offx + move.to_col*sq + sq//2
@@ -70,10 +113,154 @@ def draw_suggestion(screen, move, w, h):
     pygame.draw.line(screen, (255,0,0), (fx,fy), (tx,ty), 7)
     # Arrowhead
     pygame.draw.circle(screen, (255,0,0), (tx, ty), sq//8)
+    return suggestion_rect(move, w, h)
+
+def thinking_rect(w, h):
+    return pygame.Rect(w - 190, 6, 180, get_font(22, True).get_linesize() + 8)
+
+def draw_thinking(screen, w, h):
+    # Indicador "IA pensando..." com reticências animadas
+    font = get_font(22, True)
+    dots = "." * (pygame.time.get_ticks() // 300 % 4)
+    txt = font.render(f"IA pensando{dots}", True, (255,255,255))
+    box = thinking_rect(w, h)
+    pygame.draw.rect(screen, (40,40,40), box)
+    screen.blit(txt, (box.x + 8, box.y + 4))
+    return box
+
+# Lances do explorador mostrados no painel
+EXPLORER_LINES = 5
+
+def explorer_rect(entries, w, h):
+    font = get_font(18)
+    height = font.get_linesize() * (1 + min(len(entries), EXPLORER_LINES)) + 8
+    return pygame.Rect(w - 250, h - height - 6, 240, height)
+
+def draw_explorer(screen, entries, w, h):
+    # Painel "o que foi jogado aqui": (SAN, partidas, brancas, empates, pretas) por lance
+    font = get_font(18)
+    box = explorer_rect(entries, w, h)
+    pygame.draw.rect(screen, (40,40,40), box)
+    total = sum(e[1] for e in entries)
+    lines = [f"Explorador: {total} partida(s)" if entries else "Explorador: posição nova"]
+    for san, games, white, draws, black in entries[:EXPLORER_LINES]:
+        lines.append(f"{san:7} {games:6}  {100*white//games:3}/{100*draws//games:3}/{100*black//games:3}%")
+    y = box.y + 4
+    for line in lines:
+        screen.blit(font.render(line, True, (255,255,255)), (box.x + 8, y))
+        y += font.get_linesize()
+    return box
+
+class BoardRenderer:
+    # Redesenha só o que mudou desde o quadro anterior: casas cuja peça ou
+    # destaque mudou e as áreas sob a peça arrastada, a seta de sugestão, o
+    # painel do explorador e o indicador da IA. render() devolve os retângulos para pygame.display.update.
+    def __init__(self, screen, w, h, color_theme):
+        self.screen = screen
+        self.color_theme = color_theme
+        self.resize(w, h)
+
+    def resize(self, w, h):
+        self.w, self.h = w, h
+        self.invalidate()
+
+    def invalidate(self):
+        # Próximo quadro redesenha a tela inteira (início, redimensionamento, outra tela por cima)
+        self.squares = [None] * 64
+        self.overlays = {}
+        self.full = True
+
+    def _squares_under(self, rect):
+        size, sq, offx, offy = board_geometry(self.w, self.h)
+        board_rect = pygame.Rect(offx, offy, sq*8, sq*8)
+        clip = rect.clip(board_rect)
+        if not clip.width or not clip.height:
+            return set()
+        c0, c1 = (clip.left-offx)//sq, (clip.right-1-offx)//sq
+        r0, r1 = (clip.top-offy)//sq, (clip.bottom-1-offy)//sq
+        return {r*8 + c for r in range(r0, r1+1) for c in range(c0, c1+1)}
+
+    def render(self, board, selected, possible_moves, dragging, drag_piece, drag_offset,
+               hint_moves=(), suggestion=None, thinking=False, explorer=None):
+        w, h = self.w, self.h
+        size, sq, offx, offy = board_geometry(w, h)
+        screen = self.screen
+        rects = []
+        if self.full:
+            screen.fill((0, 0, 0))
+            self.label_rects = draw_labels(screen, w, h)
+            rects.append(screen.get_rect())
+        hidden = selected if dragging else None
+        dots = {(m.to_row, m.to_col) for m in possible_moves}
+        dots.update((m.to_row, m.to_col) for m in hint_moves)
+
+        # Camadas por cima das casas: (assinatura, retângulo)
+        overlays = {}
+        if suggestion:
+            key = (suggestion.from_row, suggestion.from_col, suggestion.to_row, suggestion.to_col)
+            overlays['suggestion'] = (key, suggestion_rect(suggestion, w, h))
+        if dragging and drag_piece:
+            x, y = pygame.mouse.get_pos()
+            rect = pygame.Rect(x-drag_offset[0], y-drag_offset[1], sq, sq)
+            overlays['drag'] = ((str(drag_piece), rect.topleft), rect)
+        if explorer is not None:
+            overlays['explorer'] = (tuple(explorer), explorer_rect(explorer, w, h))
+        if thinking:
+            overlays['thinking'] = (pygame.time.get_ticks() // 300 % 4, thinking_rect(w, h))
+
+        # Casas cujo conteúdo mudou
+        dirty = set()
+        for i in range(64):
+            row, col = divmod(i, 8)
+            p = board.piece_at(row, col)
+            sig = (str(p) if p and (row, col) != hidden else None, selected == (row, col), (row, col) in dots)
+            if sig != self.squares[i]:
+                self.squares[i] = sig
+                dirty.add(i)
+        # Camadas que mudaram: limpa a área antiga e redesenha o que estiver embaixo
+        changed = set()
+        for name in set(self.overlays) | set(overlays):
+            old, new = self.overlays.get(name), overlays.get(name)
+            if old == new:
+                continue
+            changed.add(name)
+            if old:
+                screen.fill((0, 0, 0), old[1])
+                dirty |= self._squares_under(old[1])
+                if old[1].collidelist(self.label_rects) != -1:
+                    self.label_rects = draw_labels(screen, w, h)
+                    rects.extend(self.label_rects)
+                rects.append(old[1])
+            if new:
+                dirty |= self._squares_under(new[1])
+
+        for i in dirty:
+            row, col = divmod(i, 8)
+            rects.append(draw_square(screen, board, row, col, w, h, self.color_theme,
+                                     selected, hidden, self.squares[i][2]))
+
+        # Camadas na ordem: seta, explorador, peça arrastada, indicador
+        for name in ('suggestion', 'explorer', 'drag', 'thinking'):
+            entry = overlays.get(name)
+            if not entry or not (self.full or name in changed or self._squares_under(entry[1]) & dirty):
+                continue
+            if name == 'suggestion':
+                draw_suggestion(screen, suggestion, w, h)
+            elif name == 'explorer':
+                draw_explorer(screen, explorer, w, h)
+            elif name == 'drag':
+                screen.blit(get_sprite(str(drag_piece), sq), entry[1].topleft)
+            else:
+                draw_thinking(screen, w, h)
+            rects.append(entry[1])
+
+        self.overlays = overlays
+        self.full = False
+        return rects
 
 def draw_menu(screen, w, h):
-    menu_font = pygame.font.SysFont("Arial", 40, True)
-    small_font = pygame.font.SysFont("Arial", 24, False)
+    menu_font = get_font(40, True)
+    small_font = get_font(24)
     clock = pygame.time.Clock()
     color_theme = 0
     player_color = 'w'
@@ -129,7 +316,7 @@ def draw_menu(screen, w, h):
         clock.tick(30)
 
 def draw_end_screen(screen, w, h, winner):
-    font = pygame.font.SysFont("Arial", 50, True)
+    font = get_font(50, True)
     txt = font.render(f"Vencedor: {winner}", True, (0,255,0))
     screen.blit(txt, (w//2-txt.get_width()//2, h//2-txt.get_height()//2))
     pygame.display.flip()
\ No newline at end of file
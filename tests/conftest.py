@@ -0,0 +1,9 @@
+# The modules live in src/, the app.py rules at the root and the perft
+# positions in tools/; none of them is an installed package
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, 'tools'), os.path.join(ROOT, 'src'), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
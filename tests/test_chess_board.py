@@ -0,0 +1,50 @@
+# Bitboard ChessBoard: perft against the published counts, and push/pop
+# leaving every piece of state as it was
+import pytest
+
+from chess_logic import ChessBoard, Move
+from perft import POSITIONS
+
+DEPTH = 3
+
+def perft(board, depth):
+    if depth == 1:
+        return len(board.move_codes())
+    nodes = 0
+    for move in board.move_codes():
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+def state(board):
+    return (list(board.pieces), list(board.occupancy), list(board.squares), board.turn, board.castling,
+            board.ep_square, board.halfmove_clock, board.fullmove_number, board.zobrist_key,
+            list(board.psq), list(board.material), list(board.king_square))
+
+@pytest.mark.parametrize('name, fen, expected', POSITIONS)
+def test_perft(name, fen, expected):
+    board = ChessBoard(fen)
+    for depth in range(1, DEPTH + 1):
+        assert perft(board, depth) == expected[depth - 1], (name, depth)
+
+def test_start_position():
+    board = ChessBoard()
+    assert board.fen() == 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+    assert str(board.piece_at(7, 4)) == 'wK'
+    assert board.piece_at(4, 4) is None
+    assert {(m.to_row, m.to_col) for m in board.get_legal_moves(6, 4)} == {(5, 4), (4, 4)}
+    assert board.get_legal_moves(1, 4) == []  # not black's turn
+
+@pytest.mark.parametrize('name, fen, expected', POSITIONS)
+def test_push_pop_restores(name, fen, expected):
+    board = ChessBoard(fen)
+    before = state(board)
+    for move in board.move_codes():
+        board.push(move)
+        for reply in board.move_codes():
+            board.push(reply)
+            board.pop()
+        board.pop()
+        assert state(board) == before, Move.from_code(move).uci()
+    assert board.fen() == ChessBoard(board.fen()).fen()
@@ -0,0 +1,60 @@
+# The pin- and check-aware generator: pins, evasions, en passant edge cases
+# and game end, and the moves python-chess finds (when installed)
+import pytest
+
+from chess_logic import ChessBoard
+from perft import POSITIONS
+
+def targets(board, row, col):
+    return {(m.to_row, m.to_col) for m in board.get_legal_moves(row, col)}
+
+def test_pinned_pieces_stay_on_the_ray():
+    # Bishop d2 pinned by a5 slides along the diagonal; a knight there
+    # cannot move; a rook pinned on the file slides along the file
+    board = ChessBoard('4k3/8/8/b7/8/8/3B4/4K3 w - - 0 1')
+    assert targets(board, 6, 3) == {(5, 2), (4, 1), (3, 0)}
+    board = ChessBoard('4k3/8/8/b7/8/8/3N4/4K3 w - - 0 1')
+    assert targets(board, 6, 3) == set()
+    board = ChessBoard('4k3/4r3/8/8/8/8/4R3/4K3 w - - 0 1')
+    assert targets(board, 6, 4) == {(5, 4), (4, 4), (3, 4), (2, 4), (1, 4)}
+
+def test_evasions():
+    # Single check by a rook: capture it, block or step aside
+    board = ChessBoard('4k3/8/8/8/8/8/1N6/r3K3 w - - 0 1')
+    assert {m.uci() for m in board.generate_legal_moves()} == {'b2d1', 'e1d2', 'e1e2', 'e1f2'}
+    # Double check: only the king moves
+    board = ChessBoard('4k3/8/8/8/1b6/8/3N4/r3K3 w - - 0 1')
+    assert {m.uci()[:2] for m in board.generate_legal_moves()} == {'e1'}
+
+def test_en_passant_discovered_check():
+    # Taking en passant would open the fifth rank to the rook
+    board = ChessBoard('8/8/8/KPp4r/8/8/8/4k3 w - c6 0 1')
+    assert 'b5c6' not in {m.uci() for m in board.generate_legal_moves()}
+    assert not board.can_capture_en_passant()
+    board = ChessBoard('8/8/8/1Pp5/8/8/8/K3k3 w - c6 0 1')
+    assert 'b5c6' in {m.uci() for m in board.generate_legal_moves()}
+    assert board.can_capture_en_passant()
+
+def test_game_over():
+    mate = ChessBoard('rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3')
+    assert mate.is_game_over() and mate.get_winner() == 'Pretas'
+    stalemate = ChessBoard('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1')
+    assert stalemate.is_game_over() and stalemate.get_winner() == 'Empate'
+    assert not ChessBoard().is_game_over()
+
+@pytest.mark.parametrize('name, fen', [(name, fen) for name, fen, _ in POSITIONS])
+def test_matches_python_chess(name, fen):
+    chess = pytest.importorskip('chess')
+
+    def walk(board, reference, depth):
+        assert {m.uci() for m in board.generate_legal_moves()} == \
+            {m.uci() for m in reference.legal_moves}, reference.fen()
+        if depth > 1:
+            for move in board.generate_legal_moves():
+                board.push(move)
+                reference.push_uci(move.uci())
+                walk(board, reference, depth - 1)
+                reference.pop()
+                board.pop()
+
+    walk(ChessBoard(fen), chess.Board(fen), 2)
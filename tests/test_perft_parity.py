@@ -0,0 +1,52 @@
+# rules.all_legal_moves (app.py's attack map path) against ChessBoard, node
+# by node, and the one intended difference with the old valid_move filter
+import pytest
+
+import rules
+from chess_logic import ChessBoard
+from perft import PARITY_DIFFERENCES, POSITIONS, app_setup
+
+DEPTH = 3
+
+def app_moves(board):
+    return set(rules.all_legal_moves(*app_setup(board.fen())))
+
+def board_moves(board):
+    # (row, col, row, col) per legal move; app.py only promotes to a queen,
+    # so the promotions to one square count once
+    return {(code >> 3 & 7, code & 7, code >> 9 & 7, code >> 6 & 7) for code in board.move_codes()}
+
+def old_filter_moves(board):
+    # Every get_moves pseudo move through valid_move, as app.py did before
+    grid, white_turn, en_passant, can_castle = app_setup(board.fen())
+    moves = set()
+    for r in range(8):
+        for c in range(8):
+            piece = grid[r][c]
+            if piece and (piece[0] == 'w') == white_turn:
+                for mr, mc in rules.get_moves(grid, r, c, en_passant, can_castle):
+                    if rules.valid_move(grid, r, c, mr, mc, white_turn, en_passant, can_castle):
+                        moves.add((r, c, mr, mc))
+    return moves
+
+def walk(board, depth):
+    assert app_moves(board) == board_moves(board), board.fen()
+    if depth > 1:
+        for code in board.move_codes():
+            board.push(code)
+            walk(board, depth - 1)
+            board.pop()
+
+@pytest.mark.parametrize('name, fen', [(name, fen) for name, fen, _ in POSITIONS])
+def test_fast_path_matches_chess_board(name, fen):
+    walk(ChessBoard(fen), DEPTH)
+
+@pytest.mark.parametrize('name, fen, fast_only, old_only', PARITY_DIFFERENCES)
+def test_known_differences_with_old_filter(name, fen, fast_only, old_only):
+    board = ChessBoard(fen)
+    fast = app_moves(board)
+    old = old_filter_moves(board)
+    assert sorted(fast - old) == sorted(fast_only)
+    assert sorted(old - fast) == sorted(old_only)
+    # The fast path is the one that agrees with ChessBoard
+    assert fast == board_moves(board)
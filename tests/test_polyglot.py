@@ -0,0 +1,68 @@
+# Polyglot keys for app.py's string board, move encoding and the
+# memory-mapped book
+import random
+
+import pytest
+
+import rules
+from chess_logic import ChessBoard
+from polyglot import OpeningBook, build_book, decode_move, encode_move, grid_key, write_book
+from test_zobrist import POLYGLOT_KEYS
+
+def play(ucis):
+    # app.py's position after the moves: grid, white to move, castling, en passant
+    grid = rules.initial_board()
+    can_castle = {"w": {"K": True, "Q": True}, "b": {"K": True, "Q": True}}
+    en_passant = None
+    white_turn = True
+    for uci in ucis.split():
+        sr, sc, dr, dc = 8 - int(uci[1]), 'abcdefgh'.index(uci[0]), 8 - int(uci[3]), 'abcdefgh'.index(uci[2])
+        piece = grid[sr][sc]
+        rules.do_move(grid, sr, sc, dr, dc, piece, en_passant, can_castle)
+        en_passant = rules.get_en_passant(sr, sc, dr, dc, piece, grid)
+        white_turn = not white_turn
+    castling = ''.join(flag if color == 'w' else flag.lower()
+                       for color in 'wb' for flag in 'KQ' if can_castle[color][flag])
+    return grid, white_turn, castling, en_passant
+
+@pytest.mark.parametrize('moves, key', POLYGLOT_KEYS)
+def test_grid_key(moves, key):
+    assert grid_key(*play(moves)) == key
+
+@pytest.mark.parametrize('uci', ['e2e4', 'g8f6', 'e1h1', 'e8a8', 'a7a8q', 'h2h1n'])
+def test_move_encoding(uci):
+    assert decode_move(encode_move(uci)) == uci
+
+def test_move_layout():
+    # to file, to rank, from file, from rank, promotion; 0 is no move
+    assert encode_move('e2e4') == 4 | 3 << 3 | 4 << 6 | 1 << 9
+    assert encode_move('a7a8q') == 0 | 7 << 3 | 0 << 6 | 6 << 9 | 4 << 12
+    assert decode_move(0) is None
+
+def test_book(tmp_path):
+    games = [({}, ['e4', 'e5', 'Nf3'], '1-0'), ({}, ['e4', 'c5'], '0-1'),
+             ({}, ['d4', 'd5'], '1/2-1/2'), ({}, ['e4', 'e5'], '1-0')]
+    path = str(tmp_path / 'book.bin')
+    write_book(path, build_book(games))
+    book = OpeningBook(path)
+    start = ChessBoard()
+    # e4 won twice and lost once for white (2 points a win), d4 was drawn
+    assert book.moves(start.zobrist_key) == [('e2e4', 4), ('d2d4', 1)]
+    assert book.choose(start.zobrist_key, start.parse_uci, mode='best') == start.parse_uci('e2e4')
+    picks = {book.choose(start.zobrist_key, start.parse_uci, rng=random.Random(seed)).uci() for seed in range(50)}
+    assert picks == {'e2e4', 'd2d4'}
+    board = ChessBoard()
+    board.push(board.parse_uci('e2e4'))
+    # After e4 black scored with c5 only
+    assert book.moves(board.zobrist_key) == [('c7c5', 2)]
+    assert book.choose(ChessBoard('8/8/8/8/8/8/8/K6k w - - 0 1').zobrist_key, start.parse_uci) is None
+    book.close()
+
+def test_book_castling_falls_back_from_king_takes_rook(tmp_path):
+    board = ChessBoard('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    path = str(tmp_path / 'book.bin')
+    write_book(path, [(board.zobrist_key, encode_move('e1h1'), 1)])
+    book = OpeningBook(path)
+    move = book.choose(board.zobrist_key, board.parse_uci)
+    assert move.uci() == 'e1g1' and move.is_castling
+    book.close()
@@ -0,0 +1,75 @@
+# Incremental Zobrist keys (Polyglot's hashing) and the transposition table
+import pytest
+
+from chess_logic import TT_EXACT, TT_LOWER, ChessBoard, TranspositionTable
+from perft import POSITIONS
+
+# Published examples of the Polyglot book format: moves from the start, key
+POLYGLOT_KEYS = [
+    ('', 0x463b96181691fc9c),
+    ('e2e4', 0x823c9b50fd114196),
+    ('e2e4 d7d5', 0x0756b94461c50fb0),
+    ('e2e4 d7d5 e4e5', 0x662fafb965db29d4),
+    ('e2e4 d7d5 e4e5 f7f5', 0x22a48b5a8e47ff78),
+    ('e2e4 d7d5 e4e5 f7f5 e1e2', 0x652a607ca3f242c1),
+    ('e2e4 d7d5 e4e5 f7f5 e1e2 e8f7', 0x00fdd303c946bdd9),
+    ('a2a4 b7b5 h2h4 b5b4 c2c4', 0x3c8123ea7b067637),
+    ('a2a4 b7b5 h2h4 b5b4 c2c4 b4c3 a1a3', 0x5c3f9b829b279560),
+]
+
+@pytest.mark.parametrize('moves, key', POLYGLOT_KEYS)
+def test_polyglot_keys(moves, key):
+    board = ChessBoard()
+    for uci in moves.split():
+        board.push(board.parse_uci(uci))
+    assert board.zobrist_key == key
+    assert board.compute_zobrist() == key
+    assert ChessBoard(board.fen()).zobrist_key == key
+
+@pytest.mark.parametrize('name, fen', [(name, fen) for name, fen, _ in POSITIONS])
+def test_incremental_key_matches_recomputation(name, fen):
+    board = ChessBoard(fen)
+
+    def walk(depth):
+        assert board.zobrist_key == board.compute_zobrist(), board.fen()
+        if depth:
+            for move in board.move_codes():
+                key = board.zobrist_key
+                board.push(move)
+                walk(depth - 1)
+                board.pop()
+                assert board.zobrist_key == key
+
+    walk(2)
+
+def test_transpositions_share_a_key():
+    a, b = ChessBoard(), ChessBoard()
+    for uci in 'g1f3 g8f6 b1c3'.split():
+        a.push(a.parse_uci(uci))
+    for uci in 'b1c3 g8f6 g1f3'.split():
+        b.push(b.parse_uci(uci))
+    assert a.zobrist_key == b.zobrist_key
+    assert a.zobrist_key != ChessBoard().zobrist_key
+
+def test_transposition_table():
+    tt = TranspositionTable(size_bits=4)
+    assert tt.probe(0x1234) is None
+    tt.store(0x1234, 5, 42, TT_EXACT, 0x0c34)
+    assert tt.probe(0x1234) == (5, 42, TT_EXACT, 0x0c34)
+    # Same slot, other key: a shallower result does not evict a deeper one
+    # from the same search, but replaces it once a new search starts
+    tt.store(0x1234 + 16, 3, 7, TT_LOWER)
+    assert tt.probe(0x1234 + 16) is None and tt.collisions == 1
+    tt.new_search()
+    tt.store(0x1234 + 16, 3, 7, TT_LOWER)
+    assert tt.probe(0x1234 + 16) == (3, 7, TT_LOWER, None)
+    # Storing the same position again without a move keeps the old move
+    tt.store(0x1234 + 16, 4, -9, TT_EXACT, 0x0d35)
+    tt.store(0x1234 + 16, 6, -3, TT_EXACT)
+    assert tt.probe(0x1234 + 16) == (6, -3, TT_EXACT, 0x0d35)
+    # Mate scores and negative scores survive the packing
+    tt.store(0x99, 1, -99990, TT_EXACT)
+    assert tt.probe(0x99)[1] == -99990
+    stats = tt.stats()
+    assert stats['size'] == 16 and stats['used'] == 2
+    assert stats['hits'] == 4 and stats['misses'] == 2
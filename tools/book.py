@@ -0,0 +1,76 @@
+# Livro de aberturas Polyglot (.bin) a partir de partidas PGN locais.
+#
+# Uso:
+#   python tools/book.py build assets/book.bin partidas/*.pgn --plies 20 --jobs 4
+#   python tools/book.py probe assets/book.bin ["<FEN>"]
+#
+# The AI players read assets/book.bin by default (XADREZ_BOOK overrides it):
+# ChessAI in src/, ai_move in app.py and get_ai_hint in model/xadrez.py.
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+def range_stats(task):
+    # book_stats of one byte range of a PGN file, in a worker process
+    from pgn import read_games, read_range
+    from polyglot import book_stats
+    path, start, end, plies = task
+    return book_stats(read_games(read_range(path, start, end)), plies)
+
+def build(args):
+    from pgn import split_pgn
+    from polyglot import book_entries, merge_stats, write_book
+
+    # Each file is cut at game starts; the workers parse their own ranges
+    tasks = [(path, start, end, args.plies) for path in (os.path.abspath(p) for p in args.pgn)
+             for start, end in split_pgn(path)]
+    start = time.perf_counter()
+    stats = {}
+    if args.jobs > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(min(args.jobs, len(tasks))) as pool:
+            for part in pool.imap_unordered(range_stats, tasks):
+                merge_stats(stats, part)
+    else:
+        for task in tasks:
+            merge_stats(stats, range_stats(task))
+    entries = book_entries(stats, args.min_count)
+    write_book(args.book, entries)
+    print(f"{len(entries)} entradas gravadas em {args.book} ({time.perf_counter() - start:.1f}s)")
+    return 0
+
+def probe(args):
+    from polyglot import OpeningBook
+    book = OpeningBook(args.book)
+    from chess_logic import ChessBoard
+    board = ChessBoard(args.fen)
+    moves = book.moves(board.zobrist_key)
+    total = sum(weight for _, weight in moves) or 1
+    print(f"chave {board.zobrist_key:016x}: {len(moves)} lance(s)")
+    for uci, weight in moves:
+        print(f"  {uci:6} {weight:6} {100 * weight / total:5.1f}%")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Livro de aberturas Polyglot")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="compila um livro a partir de arquivos PGN")
+    p.add_argument('book')
+    p.add_argument('pgn', nargs='+')
+    p.add_argument('--plies', type=int, default=20, help="lances por partida (padrão 20)")
+    p.add_argument('--min-count', type=int, default=1, help="vezes que um lance precisa aparecer")
+    p.add_argument('--jobs', type=int, default=os.cpu_count(), help="processos (padrão: núcleos)")
+    p.set_defaults(func=build)
+    p = sub.add_parser('probe', help="lista os lances do livro para uma posição")
+    p.add_argument('book')
+    p.add_argument('fen', nargs='?')
+    p.set_defaults(func=probe)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,466 @@
+# Gerador de tablebases de finais (distância até o mate) por análise retrógrada.
+#
+# Uso:
+#   python tools/build_tablebases.py                    # todos os finais com até 4 peças
+#   python tools/build_tablebases.py --pieces 3 --jobs 4
+#   python tools/build_tablebases.py --table KQKR --table KRK
+#
+# Tables are written to tablebases/ (XADREZ_TABLEBASES or --out overrides)
+# in the format described in src/tablebase.py, which is also the probe code
+# ChessAI uses. Each table is solved with NumPy over the whole index space:
+#   1. legal positions, checks and the number of quiet moves of each one
+#      (counted backwards, from the un-moves of every legal position);
+#   2. exits into already built tables: captures and promotions;
+#   3. retrograde passes, one per ply: predecessors of positions lost in d
+#      plies win in d+1; a position whose moves all reach won positions is
+#      lost in d+1 once the last of them is resolved.
+# Tables only depend on tables with fewer pieces or fewer pawns, so they are
+# built in waves, each wave spread over a multiprocessing pool.
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+from tablebase import (BLOCK_SIZE, DEFAULT_DIR, EXTENSION, HEADER, ILLEGAL, MAGIC, ORDER,
+                       canonical, split_name, table_size)
+
+CHUNK = 1 << 20
+NO_WIN = np.iinfo(np.int16).max
+
+# Move tables, squares row*8 + col (row 0 = rank 8)
+KING_STEPS = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+KNIGHT_STEPS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+ROOK_DIRS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+SLIDER_DIRS = {'Q': ROOK_DIRS + BISHOP_DIRS, 'R': ROOK_DIRS, 'B': BISHOP_DIRS}
+
+def _target(sq, dr, dc):
+    row, col = (sq >> 3) + dr, (sq & 7) + dc
+    return row * 8 + col if 0 <= row < 8 and 0 <= col < 8 else -1
+
+def _step_tables(steps):
+    return [np.array([_target(sq, dr, dc) for sq in range(64)]) for dr, dc in steps]
+
+STEPS = {'K': _step_tables(KING_STEPS), 'N': _step_tables(KNIGHT_STEPS)}
+# RAYS[(dr, dc)][k - 1][sq]: square k steps away, or -1
+RAYS = {d: [np.array([_target(sq, d[0] * k, d[1] * k) for sq in range(64)]) for k in range(1, 8)]
+        for d in ROOK_DIRS + BISHOP_DIRS}
+
+def _geometry():
+    # GEOM[(color, kind)][a, t]: a piece on a attacks t on an empty board
+    geom = {}
+    for color in (0, 1):
+        for kind in ORDER:
+            table = np.zeros((64, 64), dtype=bool)
+            for sq in range(64):
+                if kind in STEPS:
+                    targets = [t[sq] for t in STEPS[kind]]
+                elif kind == 'P':
+                    dr = -1 if color == 0 else 1
+                    targets = [_target(sq, dr, -1), _target(sq, dr, 1)]
+                else:
+                    targets = [ray[sq] for d in SLIDER_DIRS[kind] for ray in RAYS[d]]
+                for t in targets:
+                    if t >= 0:
+                        table[sq, t] = True
+            geom[(color, kind)] = table
+    return geom
+
+GEOM = _geometry()
+# BETWEEN[a*4096 + t*64 + x]: x lies strictly between a and t on a line
+BETWEEN = np.zeros(64 * 64 * 64, dtype=bool)
+for _a in range(64):
+    for _d, _ray in RAYS.items():
+        _path = []
+        for _k in range(7):
+            _t = int(_ray[_k][_a])
+            if _t < 0:
+                break
+            for _x in _path:
+                BETWEEN[_a * 4096 + _t * 64 + _x] = True
+            _path.append(_t)
+
+def all_tables(max_pieces):
+    # Canonical names of every material balance with up to max_pieces pieces
+    names = set()
+    for extra in range(max_pieces - 1):
+        for combo in itertools.combinations_with_replacement('QRBNP', extra):
+            for split in range(extra + 1):
+                for white in set(itertools.combinations(combo, split)):
+                    black = list(combo)
+                    for kind in white:
+                        black.remove(kind)
+                    names.add(canonical('K' + ''.join(white), 'K' + ''.join(black))[0])
+    return names
+
+def dependencies(name):
+    # Tables reached by a capture or a promotion
+    white, black = split_name(name)
+    deps = set()
+    for side, other, flip in ((white, black, False), (black, white, True)):
+        for i, kind in enumerate(side):
+            if kind == 'K':
+                continue
+            rest = side[:i] + side[i+1:]
+            deps.add(canonical(*((other, rest) if flip else (rest, other)))[0])
+            if kind == 'P':
+                for promo in 'QRBN':
+                    deps.add(canonical(*((other, rest + promo) if flip else (rest + promo, other)))[0])
+    return deps
+
+def wave_key(name):
+    return (len(name), name.count('P'))
+
+class Solver:
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        white, black = split_name(name)
+        self.pieces = [(0, k) for k in white] + [(1, k) for k in black]
+        self.n = len(self.pieces)
+        self.size = table_size(self.n)
+        self.half = self.size // 2
+        self.subtables = {}
+
+    def chunks(self):
+        # (index range, side to move) pieces of at most CHUNK positions
+        for stm in (0, 1):
+            for start in range(stm * self.half, (stm + 1) * self.half, CHUNK):
+                yield np.arange(start, min(start + CHUNK, (stm + 1) * self.half), dtype=np.int64), stm
+
+    # Index <-> squares
+    def decode(self, index):
+        squares = []
+        rest = index
+        for _ in range(self.n - 1):
+            squares.append(rest % 64)
+            rest = rest // 64
+        king = rest % 32
+        squares.append((king >> 2) * 8 + (king & 3))
+        return squares[::-1]
+
+    def encode(self, stm, squares):
+        mirror = (squares[0] & 7) > 3
+        squares = [np.where(mirror, sq ^ 7, sq) for sq in squares]
+        index = stm * 32 + (squares[0] >> 3) * 4 + (squares[0] & 7)
+        for sq in squares[1:]:
+            index = index * 64 + sq
+        return index
+
+    # Attacks
+    def attacked(self, squares, target, color):
+        # Piece `target` is attacked by a piece of `color`
+        hit = np.zeros(len(squares[0]), dtype=bool)
+        for j, (c, kind) in enumerate(self.pieces):
+            if c != color or j == target:
+                continue
+            attack = GEOM[(c, kind)][squares[j], squares[target]]
+            if kind in SLIDER_DIRS:
+                base = squares[j] * 4096 + squares[target] * 64
+                for k in range(self.n):
+                    if k != j and k != target:
+                        attack &= ~BETWEEN[base + squares[k]]
+            hit |= attack
+        return hit
+
+    def king(self, color):
+        return next(i for i, (c, kind) in enumerate(self.pieces) if c == color and kind == 'K')
+
+    # Step 1: legality and checks
+    def classify(self):
+        self.legal = np.zeros(self.size, dtype=bool)
+        self.in_check = np.zeros(self.size, dtype=bool)
+        for index, stm in self.chunks():
+            squares = self.decode(index)
+            ok = np.ones(len(index), dtype=bool)
+            for i in range(self.n):
+                for j in range(i + 1, self.n):
+                    ok &= squares[i] != squares[j]
+                if self.pieces[i][1] == 'P':
+                    row = squares[i] >> 3
+                    ok &= (row != 0) & (row != 7)
+            checked = [self.attacked(squares, self.king(color), 1 - color) for color in (0, 1)]
+            self.legal[index] = ok & ~checked[1 - stm]
+            self.in_check[index] = ok & checked[stm]
+
+    # Un-moves: positions one quiet move before the given ones
+    def unmoves(self, index):
+        if not len(index):
+            return index
+        stm = 0 if index[0] < self.half else 1
+        mover = 1 - stm
+        squares = self.decode(index)
+        found = []
+
+        def emit(i, target, mask):
+            if not mask.any():
+                return
+            before = [sq[mask] for sq in squares]
+            before[i] = target[mask]
+            pred = self.encode(mover, before)
+            found.append(pred[self.legal[pred]])
+
+        def empty(target, skip):
+            free = target >= 0
+            for j in range(self.n):
+                if j != skip:
+                    free &= target != squares[j]
+            return free
+
+        for i, (color, kind) in enumerate(self.pieces):
+            if color != mover:
+                continue
+            sq = squares[i]
+            if kind in STEPS:
+                for table in STEPS[kind]:
+                    target = table[sq]
+                    emit(i, target, empty(target, i))
+            elif kind in SLIDER_DIRS:
+                for d in SLIDER_DIRS[kind]:
+                    alive = np.ones(len(sq), dtype=bool)
+                    for ray in RAYS[d]:
+                        target = ray[sq]
+                        alive &= empty(target, i)
+                        if not alive.any():
+                            break
+                        emit(i, target, alive)
+            else:
+                row = sq >> 3
+                step = 8 if color == 0 else -8
+                single = sq + step
+                can = (row <= 5) if color == 0 else (row >= 2)
+                can &= empty(np.where(can, single, -1), i)
+                emit(i, single, can)
+                double = sq + 2 * step
+                can &= row == (4 if color == 0 else 3)
+                can &= empty(np.where(can, double, -1), i)
+                emit(i, double, can)
+        return np.concatenate(found) if found else index[:0]
+
+    # Step 2: exits into other tables
+    def subtable(self, name):
+        if name not in self.subtables:
+            self.subtables[name] = load_table(self.directory, name)
+        return self.subtables[name]
+
+    def lookup(self, pieces, stm):
+        # Raw values of positions given as [(color, kind, squares)], stm to move
+        white = ''.join(kind for color, kind, _ in pieces if color == 0)
+        black = ''.join(kind for color, kind, _ in pieces if color == 1)
+        name, flipped = canonical(white, black)
+        values, illegal = self.subtable(name)
+        if flipped:
+            pieces = [(1 - color, kind, sq ^ 56) for color, kind, sq in pieces]
+            stm = 1 - stm
+        ordered = sorted(pieces, key=lambda p: (p[0], ORDER.index(p[1])))
+        return values[self.encode(stm, [sq for _, _, sq in ordered])], illegal
+
+    def exits(self):
+        self.exit_win = np.full(self.size, NO_WIN, dtype=np.int16)
+        self.exit_loss = np.full(self.size, -1, dtype=np.int16)
+        self.exit_draw = np.zeros(self.size, dtype=bool)
+        self.has_exit = np.zeros(self.size, dtype=bool)
+        for index, stm in self.chunks():
+            index = index[self.legal[index]]
+            if not len(index):
+                continue
+            squares = self.decode(index)
+            for i, (color, kind) in enumerate(self.pieces):
+                if color != stm:
+                    continue
+                last_row = 0 if color == 0 else 7
+                # Captures
+                for j, (c, victim) in enumerate(self.pieces):
+                    if c == stm or victim == 'K':
+                        continue
+                    mask = GEOM[(color, kind)][squares[i], squares[j]]
+                    if kind in SLIDER_DIRS:
+                        base = squares[i] * 4096 + squares[j] * 64
+                        for k in range(self.n):
+                            if k != i and k != j:
+                                mask &= ~BETWEEN[base + squares[k]]
+                    if not mask.any():
+                        continue
+                    at = index[mask]
+                    rest = [(self.pieces[k][0], self.pieces[k][1], squares[k][mask])
+                            for k in range(self.n) if k != i and k != j]
+                    target = squares[j][mask]
+                    if kind != 'P':
+                        self.record(at, rest + [(color, kind, target)], 1 - stm)
+                        continue
+                    promoting = (target >> 3) == last_row
+                    for sel, kinds in ((~promoting, 'P'), (promoting, 'QRBN')):
+                        part = [(c, k, sq[sel]) for c, k, sq in rest]
+                        for promo in kinds:
+                            self.record(at[sel], part + [(color, promo, target[sel])], 1 - stm)
+                # Quiet promotions
+                if kind == 'P':
+                    target = squares[i] + (-8 if color == 0 else 8)
+                    mask = (squares[i] >> 3) == (1 if color == 0 else 6)
+                    for k in range(self.n):
+                        mask &= squares[k] != target
+                    if not mask.any():
+                        continue
+                    rest = [(self.pieces[k][0], self.pieces[k][1], squares[k][mask])
+                            for k in range(self.n) if k != i]
+                    for promo in 'QRBN':
+                        self.record(index[mask], rest + [(color, promo, target[mask])], 1 - stm)
+
+    def record(self, at, pieces, stm):
+        # Exit values for positions `at`, whose move leads to `pieces` with stm to move
+        if not len(at):
+            return
+        values, illegal = self.lookup(pieces, stm)
+        ok = values != illegal
+        at, values = at[ok], values[ok].astype(np.int16)
+        if not len(at):
+            return
+        self.has_exit[at] = True
+        # The opponent's value after the move, from this side: its loss in d
+        # plies is our win in d+1, its win in d plies our loss in d+1
+        win = values < 0
+        np.minimum.at(self.exit_win, at[win], -values[win])
+        self.exit_draw[at[values == 0]] = True
+        lose = values > 0
+        np.maximum.at(self.exit_loss, at[lose], values[lose])
+
+    # Step 3: retrograde passes
+    def solve(self):
+        start_time = time.perf_counter()
+        self.classify()
+        # Quiet moves per position, counted from the un-moves of every legal position
+        self.moves = np.zeros(self.size, dtype=np.int16)
+        for index, _ in self.chunks():
+            preds = self.unmoves(index[self.legal[index]])
+            if len(preds):
+                self.moves += np.bincount(preds, minlength=self.size).astype(np.int16)
+        self.exits()
+        value = np.zeros(self.size, dtype=np.int16)
+        pending_win, pending_loss = {}, {}
+
+        def schedule(pending, positions, plies):
+            for p in np.unique(plies):
+                pending.setdefault(int(p), []).append(positions[plies == p])
+
+        legal = self.legal
+        stuck = legal & (self.moves == 0)
+        mated = np.flatnonzero(stuck & ~self.has_exit & self.in_check)
+        schedule(pending_loss, mated, np.zeros(len(mated), dtype=np.int16))
+        winning = np.flatnonzero(legal & (self.exit_win != NO_WIN))
+        schedule(pending_win, winning, self.exit_win[winning])
+        # Every move leaves the table and loses
+        only_losing = np.flatnonzero(stuck & self.has_exit & (self.exit_win == NO_WIN) & ~self.exit_draw)
+        schedule(pending_loss, only_losing, self.exit_loss[only_losing])
+
+        plies = 0
+        while pending_win or pending_loss:
+            wins = pending_win.pop(plies, [])
+            losses = pending_loss.pop(plies, [])
+            wins = np.unique(np.concatenate(wins)) if wins else np.zeros(0, dtype=np.int64)
+            wins = wins[value[wins] == 0]
+            value[wins] = plies + 1
+            losses = np.unique(np.concatenate(losses)) if losses else np.zeros(0, dtype=np.int64)
+            losses = losses[value[losses] == 0]
+            value[losses] = -(plies + 1)
+            for half in (losses[losses < self.half], losses[losses >= self.half]):
+                preds = self.unmoves(half)
+                preds = preds[value[preds] == 0]
+                if len(preds):
+                    pending_win.setdefault(plies + 1, []).append(preds)
+            for half in (wins[wins < self.half], wins[wins >= self.half]):
+                preds = self.unmoves(half)
+                preds = preds[value[preds] == 0]
+                if not len(preds):
+                    continue
+                preds, counts = np.unique(preds, return_counts=True)
+                self.moves[preds] -= counts.astype(np.int16)
+                done = preds[(self.moves[preds] == 0) & (self.exit_win[preds] == NO_WIN)
+                             & ~self.exit_draw[preds]]
+                schedule(pending_loss, done, np.maximum(self.exit_loss[done], plies + 1))
+            plies += 1
+        width = 1 if np.abs(value).max(initial=0) < 127 else 2
+        dtype = np.int8 if width == 1 else np.int16
+        out = value.astype(dtype)
+        out[~legal] = ILLEGAL[width]
+        write_table(os.path.join(self.directory, self.name + EXTENSION), self.name, self.n, out)
+        longest = int(np.abs(value).max(initial=1)) - 1
+        return {'table': self.name, 'positions': int(legal.sum()), 'wins': int((value > 0).sum()),
+                'losses': int((value < 0).sum()), 'longest': longest,
+                'seconds': round(time.perf_counter() - start_time, 2)}
+
+def write_table(path, name, pieces, values):
+    width = values.dtype.itemsize
+    data = values.astype('<i%d' % width).tobytes()
+    blocks = [zlib.compress(data[start:start + BLOCK_SIZE * width])
+              for start in range(0, len(data), BLOCK_SIZE * width)]
+    offset = HEADER.size + 8 * (len(blocks) + 1)
+    offsets = [offset]
+    for block in blocks:
+        offset += len(block)
+        offsets.append(offset)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, name.encode(), pieces, width, BLOCK_SIZE, len(values), len(blocks)))
+        f.write(np.array(offsets, dtype='<u8').tobytes())
+        for block in blocks:
+            f.write(block)
+    os.replace(path + '.tmp', path)
+
+def load_table(directory, name):
+    # Whole table as a NumPy array, with its illegal marker
+    with open(os.path.join(directory, name + EXTENSION), 'rb') as f:
+        data = f.read()
+    _, _, _, width, _, count, blocks = HEADER.unpack_from(data, 0)
+    offsets = np.frombuffer(data, dtype='<u8', count=blocks + 1, offset=HEADER.size)
+    raw = b''.join(zlib.decompress(data[offsets[i]:offsets[i + 1]]) for i in range(blocks))
+    values = np.frombuffer(raw, dtype='<i%d' % width)
+    assert len(values) == count
+    return values, ILLEGAL[width]
+
+def build(args):
+    name, directory = args
+    return Solver(name, directory).solve()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera tablebases de finais por análise retrógrada")
+    parser.add_argument('--pieces', type=int, default=4, help="máximo de peças, reis incluídos (padrão 4)")
+    parser.add_argument('--table', action='append', help="gera só este final, ex.: KQKR (pode repetir)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="processos (padrão: núcleos)")
+    parser.add_argument('--out', default=DEFAULT_DIR, help="diretório de saída")
+    parser.add_argument('--force', action='store_true', help="refaz tabelas que já existem")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    def exists(name):
+        return os.path.exists(os.path.join(args.out, name + EXTENSION))
+
+    # Missing dependencies are built too; existing tables only with --force
+    todo = set()
+    stack = [canonical(*split_name(name.upper()))[0] for name in args.table or all_tables(args.pieces)]
+    while stack:
+        name = stack.pop()
+        if name not in todo:
+            todo.add(name)
+            stack.extend(dep for dep in dependencies(name) if not exists(dep))
+    if not args.force:
+        todo = {name for name in todo if not exists(name)}
+    start = time.perf_counter()
+    waves = sorted({wave_key(name) for name in todo})
+    with multiprocessing.Pool(max(1, args.jobs)) as pool:
+        for key in waves:
+            names = sorted(name for name in todo if wave_key(name) == key)
+            for stats in pool.imap_unordered(build, [(name, args.out) for name in names]):
+                print(f"{stats['table']:6} {stats['positions']:>10} posições  "
+                      f"{stats['wins']:>10} vitórias  {stats['losses']:>10} derrotas  "
+                      f"mate mais longo em {stats['longest']:>3} meios-lances  {stats['seconds']:7.1f}s")
+    print(f"{len(todo)} tabela(s) em {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# Índice de posições para o explorador de partidas, a partir de PGN locais.
+#
+# Uso:
+#   python tools/explorer.py build assets/explorer.bin partidas/*.pgn --plies 40 --jobs 4
+#   python tools/explorer.py probe assets/explorer.bin ["<FEN>"]
+#
+# Each worker indexes byte ranges of the PGN files (pgn.split_pgn) into
+# sorted run files next to the output; the runs are then merged into the
+# index (see src/explorer.py) and removed. main.py shows the index at
+# assets/explorer.bin (XADREZ_EXPLORER overrides it) while playing.
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+def index_range(task):
+    # (games, run paths) of one byte range of a PGN file, in a worker process
+    from explorer import index_games
+    from pgn import read_games, read_range
+    path, start, end, plies, run_prefix = task
+    return index_games(read_games(read_range(path, start, end)), run_prefix, plies)
+
+def build(args):
+    from explorer import merge_runs
+    from pgn import split_pgn
+
+    out = os.path.abspath(args.index)
+    runs_dir = tempfile.mkdtemp(prefix='explorer-', dir=os.path.dirname(out))
+    try:
+        tasks = []
+        for path in (os.path.abspath(p) for p in args.pgn):
+            for start, end in split_pgn(path):
+                tasks.append((path, start, end, args.plies, os.path.join(runs_dir, f"r{len(tasks):05d}")))
+        start = time.perf_counter()
+        games = 0
+        runs = []
+        if args.jobs > 1 and len(tasks) > 1:
+            with multiprocessing.Pool(min(args.jobs, len(tasks))) as pool:
+                parts = pool.imap_unordered(index_range, tasks)
+                for done, (count, paths) in enumerate(parts, 1):
+                    games += count
+                    runs.extend(paths)
+                    print(f"{done}/{len(tasks)} partes, {games} partidas", flush=True)
+        else:
+            for done, task in enumerate(tasks, 1):
+                count, paths = index_range(task)
+                games += count
+                runs.extend(paths)
+                print(f"{done}/{len(tasks)} partes, {games} partidas", flush=True)
+        records = merge_runs(sorted(runs), out, args.min_count)
+    finally:
+        shutil.rmtree(runs_dir, ignore_errors=True)
+    print(f"{games} partidas, {records} registros gravados em {out} ({time.perf_counter() - start:.1f}s)")
+    return 0
+
+def probe(args):
+    from chess_logic import ChessBoard
+    from explorer import Explorer
+    explorer = Explorer(args.index)
+    board = ChessBoard(args.fen)
+    start = time.perf_counter()
+    moves = explorer.moves(board)
+    elapsed = time.perf_counter() - start
+    total = sum(entry[1] for entry in moves)
+    print(f"chave {board.zobrist_key:016x}: {total} partida(s), {len(moves)} lance(s) ({elapsed * 1e6:.0f} µs)")
+    for move, games, white, draws, black in moves:
+        print(f"  {board.san(move):8} {games:8}  brancas {100 * white / games:5.1f}%  "
+              f"empates {100 * draws / games:5.1f}%  pretas {100 * black / games:5.1f}%")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice de posições para o explorador de partidas")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="indexa arquivos PGN")
+    p.add_argument('index')
+    p.add_argument('pgn', nargs='+')
+    p.add_argument('--plies', type=int, default=40, help="lances por partida (padrão 40, 0 = todos)")
+    p.add_argument('--min-count', type=int, default=1, help="vezes que um lance precisa aparecer")
+    p.add_argument('--jobs', type=int, default=os.cpu_count(), help="processos (padrão: núcleos)")
+    p.set_defaults(func=build)
+    p = sub.add_parser('probe', help="lista os lances jogados numa posição")
+    p.add_argument('index')
+    p.add_argument('fen', nargs='?')
+    p.set_defaults(func=probe)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
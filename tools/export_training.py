@@ -0,0 +1,164 @@
+# Exporta posições de partidas como dados de treino (arrays NumPy .npy).
+#
+# Uso:
+#   python tools/export_training.py dados/ partidas/*.pgn --jobs 4
+#   python tools/export_training.py dados/ --selfplay 200 --nodes 400
+#
+# Every position before a move becomes one record (piece planes, side to
+# move, castling rights, legal move mask, move played and game result; see
+# src/training_data.py). Each worker process writes its own chunks
+# (w00-00000-planes.npy, ...) through memmaps, so neither the input games
+# nor the output are ever held in memory whole; read them back with
+# training_data.load_chunks. Games come from PGN files (results '*' are
+# skipped) or from ChessAI self-play with a node budget per move. PGN files
+# are handed out as byte ranges (pgn.split_pgn) that each worker reads and
+# parses itself.
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+GAMES_PER_TASK = 32
+PGN_TASK_BYTES = 1 << 20
+MAX_PLIES = 300
+RANDOM_PLIES = 4
+
+def selfplay_game(rng, nodes):
+    # (moves, result) of a ChessAI game opened with a few random moves
+    from chess_logic import ChessAI, ChessBoard
+    board = ChessBoard()
+    players = {color: ChessAI(color, time_limit=0, node_limit=nodes) for color in 'wb'}
+    moves = []
+    while len(moves) < MAX_PLIES:
+        legal = board.generate_legal_moves()
+        if not legal:
+            winner = board.get_winner()
+            return moves, {'Brancas': '1-0', 'Pretas': '0-1'}.get(winner, '1/2-1/2')
+        if board.halfmove_clock >= 100 or board.is_repetition():
+            break
+        if len(moves) < RANDOM_PLIES:
+            move = rng.choice(legal)
+        else:
+            move, _ = players[board.turn].search(board)
+        moves.append(move)
+        board.push(move)
+    return moves, '1/2-1/2'
+
+def worker(index, out, chunk_size, tasks, results):
+    from chess_logic import ChessBoard
+    from pgn import read_positions, read_range
+    from training_data import ChunkWriter, RESULTS, game_positions
+    writer = ChunkWriter(out, f"w{index:02d}", chunk_size)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        kind, payload = task
+        before = writer.count
+        if kind == 'pgn':
+            games = 0
+            last = None
+            for headers, board, move, result in read_positions(read_range(*payload)):
+                if headers is not last:
+                    last = headers
+                    games += 1
+                if result in RESULTS:
+                    writer.add(board, move, RESULTS[result] if board.turn == 'w' else -RESULTS[result])
+        else:
+            seed, count, nodes = payload
+            rng = random.Random(seed)
+            games = count
+            for _ in range(count):
+                moves, result = selfplay_game(rng, nodes)
+                for board, move, score in game_positions(ChessBoard(), moves, result):
+                    writer.add(board, move, score)
+        results.put((games, writer.count - before))
+    writer.close()
+    results.put(None)
+
+def tasks_from_args(args):
+    if args.selfplay:
+        for start in range(0, args.selfplay, GAMES_PER_TASK):
+            yield 'selfplay', (args.seed + start, min(GAMES_PER_TASK, args.selfplay - start), args.nodes)
+        return
+    from pgn import split_pgn
+    for path in args.pgn:
+        for start, end in split_pgn(path, PGN_TASK_BYTES):
+            yield 'pgn', (path, start, end)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta posições para treino em arquivos .npy")
+    parser.add_argument('out', help="diretório de saída")
+    parser.add_argument('pgn', nargs='*', help="arquivos PGN")
+    parser.add_argument('--selfplay', type=int, default=0, help="partidas da IA contra ela mesma, em vez de PGN")
+    parser.add_argument('--nodes', type=int, default=400, help="nós por lance na autopartida (padrão 400)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="processos (padrão: núcleos)")
+    parser.add_argument('--chunk', type=int, default=1 << 16, help="posições por arquivo (padrão 65536)")
+    args = parser.parse_args(argv)
+    if not args.pgn and not args.selfplay:
+        parser.error("informe arquivos PGN ou --selfplay")
+
+    args.out = os.path.abspath(args.out)
+    args.pgn = [os.path.abspath(path) for path in args.pgn]
+
+    jobs = max(1, args.jobs)
+    # Bounded, so the games read ahead of the workers stay few
+    tasks = multiprocessing.Queue(2 * jobs)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=worker, args=(i, args.out, args.chunk, tasks, results))
+               for i in range(jobs)]
+    for process in workers:
+        process.start()
+
+    start = time.perf_counter()
+    games = positions = 0
+    running = jobs
+    last_report = start
+
+    def drain(block):
+        nonlocal games, positions, running, last_report
+        try:
+            while True:
+                done = results.get(block)
+                if done is None:
+                    running -= 1
+                else:
+                    games += done[0]
+                    positions += done[1]
+                if block:
+                    break
+        except queue.Empty:
+            pass
+        now = time.perf_counter()
+        if now - last_report >= 2:
+            last_report = now
+            print(f"{games} partidas, {positions} posições, {positions / (now - start):.0f} pos/s", flush=True)
+
+    for task in tasks_from_args(args):
+        while True:
+            try:
+                tasks.put(task, timeout=0.5)
+                break
+            except queue.Full:
+                drain(False)
+        drain(False)
+    for _ in workers:
+        tasks.put(None)
+    while running:
+        drain(True)
+    for process in workers:
+        process.join()
+    seconds = time.perf_counter() - start
+    print(f"{games} partidas, {positions} posições em {args.out} ({seconds:.1f}s, "
+          f"{positions / seconds if seconds else 0:.0f} pos/s)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
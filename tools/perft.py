@@ -0,0 +1,281 @@
+# Perft (move path enumeration) runner for the three rule implementations:
+#   chess_logic   -> src/chess_logic.ChessBoard
+#   app           -> rules.py, app.py's string grid (get_moves / all_legal_moves)
+#   python-chess  -> chess.Board, the rules behind model/xadrez.py
+#
+# Uso:
+#   python tools/perft.py                       # todas as posições, profundidade 3
+#   python tools/perft.py --depth 4 --backend chess_logic
+#   python tools/perft.py --json bench_perft.json
+#   python tools/perft.py --parity --depth 3      # app.py: lances rápidos x caminho antigo
+#
+# Node counts are checked against the published values; the JSON output
+# (nodes, time and nodes/second per backend, position and depth) is meant
+# to be archived to track speed and correctness over time. app.py only
+# promotes to a queen, so it is checked against BACKEND_COUNTS where the
+# published counts include underpromotions.
+# --parity walks the app.py tree and compares, at every node, its attack map
+# legal moves with the original get_moves + valid_move filter, then checks
+# the known, intended differences in PARITY_DIFFERENCES.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+# name, FEN, expected node counts for depth 1, 2, 3, ...
+POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('ep-discovered-check', '3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1',
+     [18, 92, 1670, 10138]),
+    ('ep-pinned-pawn', '8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1',
+     [6, 136, 863, 20471]),
+    ('underpromotion', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+     [9, 40, 472, 2661]),
+    ('promotion-captures', 'n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1',
+     [24, 496, 9483, 182838]),
+    ('castling-rights', 'r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1',
+     [26, 568, 13744, 314346]),
+]
+
+# Expected counts that differ from POSITIONS for one backend: app.py's
+# queen-only promotions (counted with python-chess, underpromotions left out)
+BACKEND_COUNTS = {
+    'app': {
+        'kiwipete': [48, 2039, 97862, 4074224],
+        'position4': [6, 228, 8087, 320802],
+        'position5': [41, 1373, 54007, 1806790],
+        'underpromotion': [6, 28, 248, 1379],
+        'promotion-captures': [15, 210, 3253, 47828],
+    },
+}
+
+# chess_logic.ChessBoard: make/unmake on one board, with move codes as the search does
+def load_chess_logic():
+    from chess_logic import ChessBoard
+
+    def perft(board, depth):
+        if depth == 1:
+            return len(board.move_codes())
+        nodes = 0
+        for move in board.move_codes():
+            board.push(move)
+            nodes += perft(board, depth - 1)
+            board.pop()
+        return nodes
+
+    return lambda fen, depth: perft(ChessBoard(fen), depth)
+
+def app_setup(fen):
+    # app.py position (board, white_turn, en_passant, can_castle) from a FEN
+    fields = fen.split()
+    board = []
+    for rank in fields[0].split('/'):
+        row = []
+        for ch in rank:
+            if ch.isdigit():
+                row += [""] * int(ch)
+            else:
+                row.append(('w' if ch.isupper() else 'b') + ch.upper())
+        board.append(row)
+    can_castle = {"w": {"K": 'K' in fields[2], "Q": 'Q' in fields[2]},
+                  "b": {"K": 'k' in fields[2], "Q": 'q' in fields[2]}}
+    en_passant = None
+    if fields[3] != '-':
+        en_passant = (8 - int(fields[3][1]), 'abcdefgh'.index(fields[3][0]))
+    return board, fields[1] == 'w', en_passant, can_castle
+
+def app_children(board, en_passant, can_castle, moves):
+    # (move, board, en_passant, can_castle) after each move, on copies
+    import copy
+    import rules
+    for sr, sc, dr, dc in moves:
+        new_board = [row[:] for row in board]
+        new_castle = copy.deepcopy(can_castle)
+        piece = new_board[sr][sc]
+        rules.do_move(new_board, sr, sc, dr, dc, piece, en_passant, new_castle)
+        yield (sr, sc, dr, dc), new_board, rules.get_en_passant(sr, sc, dr, dc, piece, new_board), new_castle
+
+# app.py: string grid, copied per move like game_loop does
+def load_app():
+    import rules
+
+    def perft(board, white_turn, en_passant, can_castle, depth):
+        moves = rules.all_legal_moves(board, white_turn, en_passant, can_castle)
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for _, new_board, new_ep, new_castle in app_children(board, en_passant, can_castle, moves):
+            nodes += perft(new_board, not white_turn, new_ep, new_castle, depth - 1)
+        return nodes
+
+    return lambda fen, depth: perft(*app_setup(fen), depth)
+
+# Positions where the attack map path is meant to differ from the original
+# filter, checked at the root by --parity: name, FEN, moves only the fast
+# path has, moves only the original has (as (row, col, row, col))
+PARITY_DIFFERENCES = [
+    # valid_move's is_attacked counts pawn pushes, not pawn captures, so the
+    # old path castles through f1, which the e2 pawn attacks
+    ('castle-through-pawn', '4k3/8/8/8/8/8/4p3/4K2R w K - 0 1', [], [(7, 4, 7, 6)]),
+]
+
+def parity(positions, depth):
+    # Differences between rules.all_legal_moves and the original filter
+    # (every pseudo move of get_moves through valid_move), node by node
+    import rules
+
+    def reference(board, white_turn, en_passant, can_castle):
+        moves = []
+        for r in range(8):
+            for c in range(8):
+                piece = board[r][c]
+                if piece and (piece[0] == "w") == white_turn:
+                    for mr, mc in rules.get_moves(board, r, c, en_passant, can_castle):
+                        if rules.valid_move(board, r, c, mr, mc, white_turn, en_passant, can_castle):
+                            moves.append((r, c, mr, mc))
+        return moves
+
+    def walk(board, white_turn, en_passant, can_castle, depth, path, stats):
+        fast = rules.all_legal_moves(board, white_turn, en_passant, can_castle)
+        start = time.perf_counter()
+        slow = reference(board, white_turn, en_passant, can_castle)
+        stats['reference'] += time.perf_counter() - start
+        stats['nodes'] += 1
+        if sorted(fast) != sorted(slow):
+            stats['errors'] += 1
+            if stats['errors'] <= 10:
+                print(f"  diferença após {' '.join(path) or '(início)'}: "
+                      f"só rápido {sorted(set(fast) - set(slow))}, só antigo {sorted(set(slow) - set(fast))}")
+        if depth > 1:
+            for move, new_board, new_ep, new_castle in app_children(board, en_passant, can_castle, slow):
+                sr, sc, dr, dc = move
+                name = 'abcdefgh'[sc] + str(8 - sr) + 'abcdefgh'[dc] + str(8 - dr)
+                walk(new_board, not white_turn, new_ep, new_castle, depth - 1, path + [name], stats)
+
+    errors = 0
+    for pos_name, fen, _ in positions:
+        stats = {'nodes': 0, 'errors': 0, 'reference': 0.0}
+        start = time.perf_counter()
+        walk(*app_setup(fen), depth, [], stats)
+        elapsed = time.perf_counter() - start
+        print(f"{pos_name:20} d{depth} {stats['nodes']:>8} nós  {stats['errors']} diferença(s)  "
+              f"antigo {stats['reference']:.3f}s  rápido {elapsed - stats['reference']:.3f}s")
+        errors += stats['errors']
+    for pos_name, fen, fast_only, slow_only in PARITY_DIFFERENCES:
+        board, white_turn, en_passant, can_castle = app_setup(fen)
+        fast = set(rules.all_legal_moves(board, white_turn, en_passant, can_castle))
+        slow = set(reference(board, white_turn, en_passant, can_castle))
+        expected = (sorted(fast - slow), sorted(slow - fast)) == (sorted(fast_only), sorted(slow_only))
+        print(f"{pos_name:20} diferença esperada: só rápido {sorted(fast - slow)}, só antigo "
+              f"{sorted(slow - fast)}  {'ok' if expected else 'ERRO'}")
+        errors += not expected
+    return errors
+
+# python-chess, as used by model/xadrez.py
+def load_python_chess():
+    import chess
+
+    def perft(board, depth):
+        if depth == 1:
+            return board.legal_moves.count()
+        nodes = 0
+        for move in board.legal_moves:
+            board.push(move)
+            nodes += perft(board, depth - 1)
+            board.pop()
+        return nodes
+
+    return lambda fen, depth: perft(chess.Board(fen), depth)
+
+BACKENDS = {
+    'chess_logic': load_chess_logic,
+    'app': load_app,
+    'python-chess': load_python_chess,
+}
+
+def run(backends, positions, max_depth, time_budget):
+    results = []
+    for name in backends:
+        try:
+            perft = BACKENDS[name]()
+        except ImportError as e:
+            print(f"{name}: não disponível ({e})")
+            continue
+        for pos_name, fen, expected in positions:
+            expected = BACKEND_COUNTS.get(name, {}).get(pos_name, expected)
+            for depth in range(1, min(max_depth, len(expected)) + 1):
+                start = time.perf_counter()
+                nodes = perft(fen, depth)
+                elapsed = time.perf_counter() - start
+                ok = nodes == expected[depth-1]
+                nps = nodes / elapsed if elapsed > 0 else 0.0
+                results.append({'backend': name, 'position': pos_name, 'depth': depth,
+                                'nodes': nodes, 'expected': expected[depth-1], 'ok': ok,
+                                'seconds': round(elapsed, 6), 'nps': round(nps, 1)})
+                print(f"{name:13} {pos_name:20} d{depth} {nodes:>10} "
+                      f"{'ok' if ok else 'ERRO (esperado %d)' % expected[depth-1]:>22} "
+                      f"{elapsed:9.3f}s {nps:12.0f} nps")
+                # Deeper levels grow ~30x; stop before blowing the budget
+                if time_budget and elapsed * 30 > time_budget:
+                    break
+    return results
+
+def summarize(results):
+    summary = {}
+    for r in results:
+        s = summary.setdefault(r['backend'], {'nodes': 0, 'seconds': 0.0, 'errors': 0})
+        s['nodes'] += r['nodes']
+        s['seconds'] += r['seconds']
+        s['errors'] += 0 if r['ok'] else 1
+    for s in summary.values():
+        s['nps'] = round(s['nodes'] / s['seconds'], 1) if s['seconds'] else 0.0
+        s['seconds'] = round(s['seconds'], 6)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft e velocidade dos geradores de lances")
+    parser.add_argument('--depth', type=int, default=3, help="profundidade máxima (padrão 3)")
+    parser.add_argument('--backend', action='append', choices=list(BACKENDS),
+                        help="backend a testar (pode repetir; padrão: todos)")
+    parser.add_argument('--position', action='append', choices=[p[0] for p in POSITIONS],
+                        help="posição a testar (pode repetir; padrão: todas)")
+    parser.add_argument('--budget', type=float, default=60.0,
+                        help="segundos por posição antes de parar de aprofundar (0 = sem limite)")
+    parser.add_argument('--json', help="grava os resultados em JSON neste arquivo")
+    parser.add_argument('--parity', action='store_true',
+                        help="compara os lances rápidos do app.py com o caminho antigo (valid_move)")
+    args = parser.parse_args(argv)
+
+    positions = [p for p in POSITIONS if not args.position or p[0] in args.position]
+    if args.parity:
+        return 1 if parity(positions, args.depth) else 0
+    results = run(args.backend or list(BACKENDS), positions, args.depth, args.budget)
+    summary = summarize(results)
+    for name, s in summary.items():
+        print(f"{name:13} total {s['nodes']} nós em {s['seconds']:.3f}s = {s['nps']:.0f} nps, "
+              f"{s['errors']} erro(s)")
+    if args.json:
+        report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  'python': platform.python_version(), 'machine': platform.machine(),
+                  'summary': summary, 'results': results}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(s['errors'] for s in summary.values()) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
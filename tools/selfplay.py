@@ -0,0 +1,211 @@
+# Partidas sem janela entre jogadores configuráveis, em vários processos.
+#
+# Uso:
+#   python tools/selfplay.py ai:nodes=2000 agressivo --games 1000 --jobs 4 --pgn partidas.pgn
+#   python tools/selfplay.py ai:time=0.1 ai:time=0.05,book=0 --games 200
+#   python tools/selfplay.py xadrez:depth=3 centralizador --games 100
+#
+# Players (name:option=value,...):
+#   ai             ChessAI from src/chess_logic.py; time (s per move, 0 = no
+#                  limit), nodes, depth, book and tablebase (1/0)
+#   aleatorio, agressivo, centralizador
+#                  the app.py assistants (rules.ai_move)
+#   xadrez         get_ai_hint from model/xadrez.py (book, analysis cache,
+#                  UCI engine pool or its capture heuristic); depth, time
+# ChessBoard referees every game: mate, stalemate, threefold repetition,
+# fifty moves, insufficient material, or a draw after --max-plies. Colours
+# alternate between games and each game opens with --random-plies random
+# moves. Finished games are appended to the PGN as they come in.
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+# model/xadrez.py imports pygame (no window); skip its banner in every worker
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+APP_ASSISTANTS = {'aleatorio': "Aleatório", 'agressivo': "Agressivo", 'centralizador': "Centralizador"}
+
+def parse_player(spec):
+    # 'ai:nodes=2000,book=0' -> ('ai', {'nodes': '2000', 'book': '0'})
+    name, _, options = spec.partition(':')
+    name = name.lower().replace('ó', 'o')
+    if name not in ('ai', 'xadrez') and name not in APP_ASSISTANTS:
+        raise argparse.ArgumentTypeError(f"jogador desconhecido: {spec}")
+    return name, dict(option.split('=', 1) for option in options.split(',') if option)
+
+class ChessAIPlayer:
+    def __init__(self, options):
+        from chess_logic import ChessAI
+        from polyglot import default_book
+        from tablebase import default_tablebase
+        # Only the node budget when one is given, unless a time is given too
+        self.ai = ChessAI('w', time_limit=float(options.get('time', 0 if 'nodes' in options else 0.1)),
+                          max_depth=int(options.get('depth', 32)),
+                          node_limit=int(options['nodes']) if 'nodes' in options else None,
+                          book=default_book() if options.get('book', '1') != '0' else None,
+                          tablebase=default_tablebase() if options.get('tablebase', '1') != '0' else None)
+
+    def choose(self, board):
+        self.ai.color = board.turn
+        return self.ai.choose_move(board)
+
+class AppPlayer:
+    # app.py plays on its own string grid, rebuilt from the ChessBoard
+    def __init__(self, assistant):
+        import rules
+        self.rules = rules
+        self.assistant = assistant
+
+    def choose(self, board):
+        grid = [[(p.color + p.kind) if p else "" for p in (board.piece_at(r, c) for c in range(8))]
+                for r in range(8)]
+        can_castle = {"w": {"K": bool(board.castling & 1), "Q": bool(board.castling & 2)},
+                      "b": {"K": bool(board.castling & 4), "Q": bool(board.castling & 8)}}
+        en_passant = divmod(board.ep_square, 8) if board.ep_square is not None else None
+        sr, sc, dr, dc = self.rules.ai_move(grid, board.turn == 'w', en_passant, can_castle, self.assistant)
+        # app.py always promotes to a queen
+        for move in board.generate_legal_moves():
+            if (move.from_row, move.from_col, move.to_row, move.to_col) == (sr, sc, dr, dc) \
+                    and move.promotion in (None, 'Q'):
+                return move
+        raise RuntimeError(f"app.py jogou um lance ilegal: {(sr, sc, dr, dc)}")
+
+class XadrezPlayer:
+    # get_ai_hint works on a python-chess board, replayed from the game moves
+    def __init__(self, options):
+        sys.path.insert(0, os.path.join(ROOT, 'model'))
+        import xadrez
+        self.xadrez = xadrez
+        self.depth = int(options.get('depth', xadrez.HINT_DEPTH))
+        self.time = float(options.get('time', xadrez.HINT_TIME))
+
+    def choose(self, board):
+        import chess
+        replay = chess.Board()
+        for entry in board.history:
+            replay.push_uci(entry[0].uci())
+        move = self.xadrez.get_ai_hint(replay, self.depth, self.time)
+        return board.parse_uci(move.uci()) if move else None
+
+def make_player(name, options):
+    if name == 'ai':
+        return ChessAIPlayer(options)
+    if name == 'xadrez':
+        return XadrezPlayer(options)
+    return AppPlayer(APP_ASSISTANTS[name])
+
+_players = None
+
+def init_worker(specs):
+    global _players
+    _players = [make_player(name, options) for name, options in specs]
+    for player in _players:
+        if isinstance(player, XadrezPlayer):
+            # The engine threads are not daemons: close the pool when the worker exits
+            from multiprocessing.util import Finalize
+            Finalize(None, player.xadrez.close_engine_pool, exitpriority=10)
+            break
+
+def play_game(task):
+    # (game number, white index, SAN moves, result, termination)
+    number, white, seed, random_plies, max_plies = task
+    from chess_logic import ChessBoard
+    rng = random.Random(seed)
+    board = ChessBoard()
+    players = {'w': _players[white], 'b': _players[1 - white]}
+    seen = {board.zobrist_key: 1}
+    sans = []
+    while True:
+        moves = board.generate_legal_moves()
+        if not moves:
+            if board.in_check(board.turn):
+                return number, white, sans, '0-1' if board.turn == 'w' else '1-0', "mate"
+            return number, white, sans, '1/2-1/2', "afogamento"
+        if seen[board.zobrist_key] >= 3:
+            return number, white, sans, '1/2-1/2', "repetição"
+        if board.halfmove_clock >= 100:
+            return number, white, sans, '1/2-1/2', "50 lances"
+        if board.is_insufficient_material():
+            return number, white, sans, '1/2-1/2', "material insuficiente"
+        if len(sans) >= max_plies:
+            return number, white, sans, '1/2-1/2', "limite de lances"
+        if len(sans) < random_plies:
+            move = rng.choice(moves)
+        else:
+            move = players[board.turn].choose(board)
+        sans.append(board.san(move))
+        board.push(move)
+        seen[board.zobrist_key] = seen.get(board.zobrist_key, 0) + 1
+
+def pgn_game(number, white, black, sans, result, termination):
+    from pgn import format_game
+    headers = [('Event', "Autopartida"), ('Site', "tools/selfplay.py"), ('Date', time.strftime('%Y.%m.%d')),
+               ('Round', str(number)), ('White', white), ('Black', black), ('Result', result),
+               ('PlyCount', str(len(sans))), ('Termination', termination)]
+    return format_game(headers, sans, result)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partidas sem janela entre jogadores, em vários processos")
+    parser.add_argument('player1', type=parse_player)
+    parser.add_argument('player2', type=parse_player)
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="processos (padrão: núcleos)")
+    parser.add_argument('--pgn', help="grava as partidas neste arquivo PGN (acrescenta)")
+    parser.add_argument('--random-plies', type=int, default=2, help="lances aleatórios na abertura (padrão 2)")
+    parser.add_argument('--max-plies', type=int, default=400, help="empate depois de tantos meios-lances")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    specs = [args.player1, args.player2]
+    names = [name + (':' + ','.join(f"{k}={v}" for k, v in options.items()) if options else '')
+             for name, options in specs]
+    if names[0] == names[1]:
+        names = [names[0] + ' (1)', names[1] + ' (2)']
+    pgn_path = os.path.abspath(args.pgn) if args.pgn else None
+    tasks = [(number, (number - 1) % 2, args.seed * 1000003 + number, args.random_plies, args.max_plies)
+             for number in range(1, args.games + 1)]
+
+    # Tally from player 1's side, plus how games ended
+    score = {'vitórias': 0, 'empates': 0, 'derrotas': 0}
+    endings = {}
+    plies = 0
+    start = time.perf_counter()
+    pgn = open(pgn_path, 'a', encoding='utf-8') if pgn_path else None
+    try:
+        with multiprocessing.Pool(max(1, args.jobs), init_worker, (specs,)) as pool:
+            for done, (number, white, sans, result, termination) in \
+                    enumerate(pool.imap_unordered(play_game, tasks), 1):
+                plies += len(sans)
+                endings[termination] = endings.get(termination, 0) + 1
+                if result == '1/2-1/2':
+                    score['empates'] += 1
+                elif (result == '1-0') == (white == 0):
+                    score['vitórias'] += 1
+                else:
+                    score['derrotas'] += 1
+                if pgn:
+                    pgn.write(pgn_game(number, names[white], names[1 - white], sans, result, termination))
+                    pgn.flush()
+                elapsed = time.perf_counter() - start
+                if done % 10 == 0 or done == len(tasks):
+                    print(f"{done}/{len(tasks)} partidas  {done / elapsed:.2f} partidas/s  "
+                          f"{plies / elapsed:.0f} lances/s  {names[0]}: +{score['vitórias']} "
+                          f"={score['empates']} -{score['derrotas']}", flush=True)
+    finally:
+        if pgn:
+            pgn.close()
+    elapsed = time.perf_counter() - start
+    print(f"{names[0]} contra {names[1]}: {score['vitórias']} vitória(s), {score['empates']} empate(s), "
+          f"{score['derrotas']} derrota(s) em {len(tasks)} partidas")
+    print("fins: " + ', '.join(f"{k} {v}" for k, v in sorted(endings.items(), key=lambda e: -e[1])))
+    print(f"{elapsed:.1f}s, {len(tasks) / elapsed:.2f} partidas/s, {plies / elapsed:.0f} lances/s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())